@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+"""
+air_cache.py — caché binaria compacta de AirFile ya parseados (Python 2.7)
+
+parse_air() decodifica, limpia comentarios y prueba varios regex por línea.
+Aquí el resultado (acciones, frames, cajas, loopstart, defaults, tags y
+warnings) se serializa con struct a un archivo .airc cuyo nombre es el hash
+del contenido del .AIR (+ encoding, DEFAULT_BOX_VFLIP y versión del formato).
+Cargarlo es un único read + struct.unpack_from, sin regex.
+
+    from air_cache import parse_air_cached
+    air = parse_air_cached("kfm.air")            # caché del usuario (default_cache_dir)
+    air = parse_air_cached("kfm.air", cache_dir="cache/air")
+
+Formato (little-endian):
+    'AIRC' u16 version  u32 n_actions  u32 n_warnings
+    warnings: u16 len + utf-8
+    acción : i32 number  i32 loopstart(-1 = None)  u16 nd1  u16 nd2  u32 n_frames
+             cajas default (nd1+nd2) ; frames
+    frame  : i32 g,i,xoff,yoff,time  u8 len(flip)  u8 len(trans)  u16 n1  u16 n2  u16 n_tags
+             flip, trans, cajas (n1+n2), tags (u16 len + utf-8)
+    caja   : i8 kind  i32 x1,y1,x2,y2
+"""
+
+import os, sys, struct, hashlib
+
+import air_parser
+from air_parser import parse_air, AirFile, Animation, AnimFrame, CollisionSet, HitBox
+
+CACHE_FORMAT_VERSION = 1
+_MAGIC = b'AIRC'
+
+_S_HEAD   = struct.Struct('<4sHII')
+_S_ACTION = struct.Struct('<iiHHI')
+_S_FRAME  = struct.Struct('<iiiiiBBHHH')
+_S_BOX    = struct.Struct('<biiii')
+_S_LEN    = struct.Struct('<H')
+
+# ----------------------------------------------------------------------------
+#  Serialización
+# ----------------------------------------------------------------------------
+
+def _put_str(out, s):
+    b = (s or u'').encode('utf-8')
+    out.append(_S_LEN.pack(len(b)))
+    out.append(b)
+
+def _put_boxes(out, boxes):
+    for b in boxes:
+        out.append(_S_BOX.pack(b.kind, b.x1, b.y1, b.x2, b.y2))
+
+def dump_air(af):
+    """AirFile -> bytes (formato .airc)."""
+    out = [_S_HEAD.pack(_MAGIC, CACHE_FORMAT_VERSION, len(af.actions), len(af.warnings))]
+    for w in af.warnings:
+        _put_str(out, w)
+    for num in sorted(af.actions.keys()):
+        an = af.actions[num]
+        d = an.defaults
+        loop = an.loopstart_idx if an.loopstart_idx is not None else -1
+        out.append(_S_ACTION.pack(an.number, loop, len(d.clsn1), len(d.clsn2), len(an.frames)))
+        _put_boxes(out, d.clsn1)
+        _put_boxes(out, d.clsn2)
+        for f in an.frames:
+            flip = f.flip.encode('utf-8')
+            trans = f.trans.encode('utf-8')
+            out.append(_S_FRAME.pack(f.group, f.image, f.xoff, f.yoff, f.time,
+                                     len(flip), len(trans),
+                                     len(f.boxes.clsn1), len(f.boxes.clsn2), len(f.tags)))
+            out.append(flip)
+            out.append(trans)
+            _put_boxes(out, f.boxes.clsn1)
+            _put_boxes(out, f.boxes.clsn2)
+            for t in f.tags:
+                _put_str(out, u'%s' % (t,))
+    return b''.join(out)
+
+def _get_boxes(data, pos, n):
+    lst = []
+    unpack = _S_BOX.unpack_from
+    size = _S_BOX.size
+    for _ in range(n):
+        k, x1, y1, x2, y2 = unpack(data, pos)
+        lst.append(HitBox(k, x1, y1, x2, y2))
+        pos += size
+    return lst, pos
+
+def _get_str(data, pos):
+    n = _S_LEN.unpack_from(data, pos)[0]
+    pos += _S_LEN.size
+    return data[pos:pos+n].decode('utf-8'), pos + n
+
+def load_air_bytes(data):
+    """bytes (formato .airc) -> AirFile. Lanza ValueError si no es válido."""
+    if len(data) < _S_HEAD.size:
+        raise ValueError("airc truncado")
+    magic, ver, n_actions, n_warn = _S_HEAD.unpack_from(data, 0)
+    if magic != _MAGIC or ver != CACHE_FORMAT_VERSION:
+        raise ValueError("airc incompatible (magic=%r ver=%r)" % (magic, ver))
+    pos = _S_HEAD.size
+    af = AirFile()
+    for _ in range(n_warn):
+        w, pos = _get_str(data, pos)
+        af.warnings.append(w)
+
+    frame_unpack = _S_FRAME.unpack_from
+    frame_size = _S_FRAME.size
+    for _ in range(n_actions):
+        number, loop, nd1, nd2, n_frames = _S_ACTION.unpack_from(data, pos)
+        pos += _S_ACTION.size
+        c1, pos = _get_boxes(data, pos, nd1)
+        c2, pos = _get_boxes(data, pos, nd2)
+        an = Animation(number, loopstart_idx=(loop if loop >= 0 else None),
+                       defaults=CollisionSet(c1, c2))
+        frames = an.frames
+        for _ in range(n_frames):
+            g, i, xo, yo, t, lf, lt, n1, n2, ntags = frame_unpack(data, pos)
+            pos += frame_size
+            flip = data[pos:pos+lf].decode('utf-8'); pos += lf
+            trans = data[pos:pos+lt].decode('utf-8'); pos += lt
+            boxes = None
+            if n1 or n2:
+                b1, pos = _get_boxes(data, pos, n1)
+                b2, pos = _get_boxes(data, pos, n2)
+                boxes = CollisionSet(b1, b2)
+            tags = None
+            if ntags:
+                tags = []
+                for _ in range(ntags):
+                    s, pos = _get_str(data, pos)
+                    tags.append(s)
+            frames.append(AnimFrame(g, i, xo, yo, t, flip, trans, boxes, tags))
+        af.actions[number] = an
+    return af
+
+# ----------------------------------------------------------------------------
+#  Caché en disco
+# ----------------------------------------------------------------------------
+
+def source_key(raw, encoding='utf-8'):
+    """Hash del contenido + parámetros que afectan al resultado del parseo."""
+    h = hashlib.sha1()
+    h.update(raw)
+    h.update(('|%s|%d|%d' % (encoding, int(bool(air_parser.DEFAULT_BOX_VFLIP)),
+                             CACHE_FORMAT_VERSION)).encode('ascii'))
+    return h.hexdigest()
+
+def default_cache_dir():
+    """
+    %LOCALAPPDATA%\\mugen_cns\\air en Windows; $XDG_CACHE_HOME/mugen_cns/air
+    (o ~/.cache/mugen_cns/air) en el resto. La clave es el hash del contenido:
+    un solo directorio sirve a todos los personajes y la carpeta del personaje
+    (puede ser de solo lectura) no se toca.
+    """
+    base = os.environ.get('LOCALAPPDATA' if os.name == 'nt' else 'XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'mugen_cns', 'air')
+
+def parse_air_cached(path, encoding='utf-8', cache_dir=None):
+    """
+    Igual que parse_air(path, encoding) pero usando la caché binaria.
+    Si la caché no existe o es inválida, parsea normal y la (re)escribe.
+    Errores de escritura de la caché se ignoran (se devuelve el AirFile igual).
+    """
+    if not os.path.exists(path):
+        raise IOError("No existe: %s" % path)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    cache_dir = cache_dir or default_cache_dir()
+    cpath = os.path.join(cache_dir, source_key(raw, encoding) + '.airc')
+
+    if os.path.exists(cpath):
+        try:
+            with open(cpath, 'rb') as f:
+                return load_air_bytes(f.read())
+        except Exception:
+            pass  # caché corrupta: re-parsear
+
+    af = parse_air(path, encoding=encoding)
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        tmp = cpath + '.tmp%d' % os.getpid()
+        with open(tmp, 'wb') as f:
+            f.write(dump_air(af))
+        if os.path.exists(cpath):
+            os.remove(cpath)
+        os.rename(tmp, cpath)
+    except Exception:
+        pass
+    return af
+
+# ----------------------------------------------------------------------------
+if __name__ == '__main__':
+    import time
+    if len(sys.argv) < 2:
+        print("Uso: python air_cache.py <archivo.air> [encoding]"); sys.exit(1)
+    path = sys.argv[1]; enc = sys.argv[2] if len(sys.argv) > 2 else 'utf-8'
+    _clock = getattr(time, "perf_counter", time.time)
+
+    t0 = _clock(); a = parse_air(path, encoding=enc); t1 = _clock()
+    blob = dump_air(a)
+    t2 = _clock(); b = load_air_bytes(blob); t3 = _clock()
+    print("Acciones: %d  airc: %d bytes" % (len(a.actions), len(blob)))
+    print("parse_air : %.2f ms" % ((t1 - t0) * 1000.0))
+    print("airc load : %.2f ms" % ((t3 - t2) * 1000.0))
+    print("Equivalente:", repr(sorted(a.actions.items())) == repr(sorted(b.actions.items()))
+          and a.warnings == b.warnings)
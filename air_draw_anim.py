@@ -2,10 +2,11 @@
 from __future__ import print_function
 
 import pygame
+from collections import OrderedDict
 
 try:
     # Estructuras del parser
-    from air_parser import CollisionSet
+    from air_parser import CollisionSet, parse_trans
 except Exception:
     # Fallback mínimo si no se importó (para evitar crash al leer este módulo solo)
     class CollisionSet(object):
@@ -13,6 +14,9 @@ except Exception:
         def __init__(self, clsn1=None, clsn2=None):
             self.clsn1 = clsn1 or []
             self.clsn2 = clsn2 or []
+    def parse_trans(trans):
+        mode, a_src, a_dst = _parse_trans_alpha(trans)
+        return (mode, 255 if a_src is None else a_src, 255 if a_dst is None else a_dst)
 
 """
 air_draw_anim.py
@@ -29,6 +33,9 @@ Provee:
 - Animator: reproducción a 60 ticks/s (o por conversión desde ms)
 - Dibujo con blit, flip, trans (A=add, S=sub, ASxxDyy/A1 ~ alpha), overlay de boxes:
   Clsn1 en ROJO translúcido, Clsn2 en AZUL translúcido.
+- TransformCache (LRU de variantes flip/escala), BlendCache (variantes
+  premultiplicadas + máscara de destino para src*A + dst*D) y AnimDrawPlan
+  (registros de dibujo precalculados por frame: el loop solo hace blit).
 """
 
 # --------------------------- Sprite Sources ----------------------------------
@@ -143,15 +150,59 @@ class SpriteRouter(object):
 # ------------------------------ Animator -------------------------------------
 
 class Animator(object):
+    """
+    Reproductor de una Animation. frame_idx/tick_in_frame son la posición
+    (se pueden fijar a mano, p. ej. al paso a paso del viewer); elapsed son
+    los ticks desde reset()/seek() y alimenta AnimTime.
+    Si la animación expone timeline() (air_parser.Animation) todo se resuelve
+    con bisect sobre sumas prefijas; si no, se usa el avance frame a frame.
+    """
     TICKS_PER_SEC = 60
     def __init__(self, animation):
         self.anim = animation
         self.frame_idx = 0
         self.tick_in_frame = 0
+        self.elapsed = 0
+    def _timeline(self):
+        tl = getattr(self.anim, 'timeline', None)
+        return tl() if tl is not None else None
     def reset(self, i=0):
         self.frame_idx = int(i)
         self.tick_in_frame = 0
+        tl = self._timeline()
+        self.elapsed = tl.starts[self.frame_idx] if tl is not None and 0 <= self.frame_idx < tl.n else 0
+    def seek(self, tick):
+        """Posiciona en el tick absoluto 'tick' desde el inicio de la animación."""
+        tl = self._timeline()
+        if tl is None:
+            self.reset(0)
+            self.update_ticks(tick)
+            return
+        self.frame_idx, self.tick_in_frame = tl.locate(tick)
+        self.elapsed = max(0, int(tick))
+    def frame_at(self, tick):
+        """Índice de frame en el tick absoluto 'tick' (sin mover el Animator)."""
+        return self._timeline().locate(tick)[0]
+    def anim_time(self):
+        """AnimTime estilo M.U.G.E.N (<= 0; 0 = la animación terminó)."""
+        return self._timeline().anim_time(self.elapsed)
+    def ticks_left(self):
+        return -self.anim_time()
+    def elem_time(self, n):
+        """Ticks desde que empezó el elemento n (1-based) en el ciclo actual; negativo si aún no llega."""
+        tl = self._timeline()
+        n = int(n)
+        if n < 1 or n > tl.n or not (0 <= self.frame_idx < tl.n):
+            return None
+        return tl.starts[self.frame_idx] + self.tick_in_frame - tl.starts[n - 1]
     def update_ticks(self, ticks):
+        if ticks <= 0:
+            return
+        self.elapsed += ticks
+        tl = self._timeline()
+        if tl is not None:
+            self.frame_idx, self.tick_in_frame = tl.advance(self.frame_idx, self.tick_in_frame, ticks)
+            return
         while ticks > 0 and self.anim.frame_count() > 0:
             cur = self.anim.frames[self.frame_idx]
             if cur.time == -1:
@@ -263,54 +314,207 @@ def _parse_trans_alpha(trans_str):
             return 'A', None, None
     return '', None, None
 
-def _blit_with_trans(dst, surf, pos, trans):
+def _blit_with_trans(dst, surf, pos, trans, cache=None):
     """
-    Aplica trans: 'A' -> add, 'S' -> sub. Si trae alpha, ajusta set_alpha.
+    Aplica trans: 'A' -> add, 'S' -> sub, ASxxxDyyy -> src*xxx + dst*yyy.
+    Usa variantes precalculadas de BlendCache (no toca el alpha de 'surf').
     """
-    mode, a_src, a_dst = _parse_trans_alpha(trans)
-    if mode == 'A':
-        if a_src is not None:
-            try:
-                old_alpha = surf.get_alpha()
-                surf.set_alpha(a_src)
-                dst.blit(surf, pos, special_flags=pygame.BLEND_ADD)
-                surf.set_alpha(old_alpha)
-                return
-            except:
-                pass
-        dst.blit(surf, pos, special_flags=pygame.BLEND_ADD)
-        return
-    if mode == 'S':
-        dst.blit(surf, pos, special_flags=pygame.BLEND_SUB)
+    _blit_blend(dst, surf, pos, parse_trans(trans), cache)
+
+# --------------------------- Cachés de surfaces ------------------------------
+
+class _SurfaceLRU(object):
+    """
+    LRU de surfaces derivadas. Clave: (id(surface),) + params; se guarda
+    también la surface original para descartar entradas si el id se
+    reutiliza tras un GC.
+    """
+    def __init__(self, max_items=512):
+        self.max_items = int(max_items)
+        self._d = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, surf, params, make):
+        key = (id(surf),) + params
+        ent = self._d.get(key)
+        if ent is not None and ent[0] is surf:
+            self.hits += 1
+            # mover al final (más reciente)
+            del self._d[key]
+            self._d[key] = ent
+            return ent[1]
+        self.misses += 1
+        val = make(surf, *params)
+        self._d[key] = (surf, val)
+        while len(self._d) > self.max_items:
+            self._d.popitem(last=False)
+        return val
+
+    def clear(self):
+        self._d.clear()
+
+    def __len__(self):
+        return len(self._d)
+
+def _make_transform(surf, flip_h, flip_v, scale):
+    spr = surf
+    if flip_h or flip_v:
+        spr = pygame.transform.flip(spr, flip_h, flip_v)
+    if scale != 1.0:
+        w, h = spr.get_width(), spr.get_height()
+        spr = pygame.transform.smoothscale(spr, (int(w*scale), int(h*scale)))
+    return spr
+
+class TransformCache(_SurfaceLRU):
+    """LRU de variantes flip/escala. Clave: (id(surface), flip_h, flip_v, scale)."""
+    def get(self, surf, flip_h=False, flip_v=False, scale=1.0):
+        scale = float(scale or 1.0)
+        flip_h = bool(flip_h); flip_v = bool(flip_v)
+        if not flip_h and not flip_v and scale == 1.0:
+            return surf
+        return self._get(surf, (flip_h, flip_v, scale), _make_transform)
+
+def _make_blend(surf, mode, a_src, a_dst):
+    """
+    (src, mask) listos para blit:
+    - src: RGB premultiplicado por el alpha del sprite (y por a_src/255) sobre
+      negro, así las zonas transparentes no suman ni restan.
+    - mask: multiplicador del destino (255 fuera del sprite, a_dst dentro) o
+      None si a_dst == 255.
+    Dibujo: dst *= mask (BLEND_RGB_MULT) ; dst +/-= src (BLEND_RGB_ADD/SUB).
+    """
+    size = surf.get_size()
+    src = pygame.Surface(size)
+    src.fill((0, 0, 0))
+    src.blit(surf, (0, 0))
+    if a_src < 255:
+        src.fill((a_src, a_src, a_src), special_flags=pygame.BLEND_RGB_MULT)
+    mask = None
+    if a_dst < 255:
+        # silueta blanca con la cobertura (alpha/colorkey) del sprite
+        white = pygame.Surface(size, pygame.SRCALPHA, 32)
+        white.fill((0, 0, 0, 0))
+        white.blit(surf, (0, 0))
+        white.fill((255, 255, 255), special_flags=pygame.BLEND_RGB_MAX)
+        cov = pygame.Surface(size)
+        cov.fill((0, 0, 0))
+        cov.blit(white, (0, 0))
+        k = 255 - a_dst
+        cov.fill((k, k, k), special_flags=pygame.BLEND_RGB_MULT)
+        mask = pygame.Surface(size)
+        mask.fill((255, 255, 255))
+        mask.blit(cov, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+    return src, mask
+
+class BlendCache(_SurfaceLRU):
+    """LRU de variantes de mezcla. Clave: (id(surface), mode, alpha_src, alpha_dst)."""
+    def get(self, surf, blend):
+        mode, a_src, a_dst = blend
+        return self._get(surf, (mode, int(a_src), int(a_dst)), _make_blend)
+
+_DEFAULT_TRANSFORM_CACHE = TransformCache()
+_DEFAULT_BLEND_CACHE = BlendCache()
+
+def _blit_blend(dst, surf, pos, blend, cache=None):
+    mode = blend[0]
+    if not mode:
+        dst.blit(surf, pos)
         return
-    dst.blit(surf, pos)
+    src, mask = (cache if cache is not None else _DEFAULT_BLEND_CACHE).get(surf, blend)
+    if mask is not None:
+        dst.blit(mask, pos, special_flags=pygame.BLEND_RGB_MULT)
+    dst.blit(src, pos, special_flags=pygame.BLEND_RGB_SUB if mode == 'S' else pygame.BLEND_RGB_ADD)
 
-def draw_anim_frame(screen, x, y, animation, router, frame_idx, scale=1.0, draw_boxes=True):
+class FrameDrawRecord(object):
+    """
+    Todo lo necesario para dibujar un frame: surface final (ya con flip/escala
+    y, si hay trans, premultiplicada), máscara del destino, offset escalado y
+    flag de blit.
+    """
+    __slots__ = ('surface', 'mask', 'dx', 'dy', 'flags')
+    def __init__(self, surface, mask, dx, dy, flags):
+        self.surface = surface
+        self.mask = mask
+        self.dx = dx; self.dy = dy
+        self.flags = flags
+
+    def blit(self, dst, x, y):
+        pos = (x + self.dx, y + self.dy)
+        if self.mask is not None:
+            dst.blit(self.mask, pos, special_flags=pygame.BLEND_RGB_MULT)
+        dst.blit(self.surface, pos, special_flags=self.flags)
+
+def make_draw_record(frame, router, scale=1.0, cache=None, blend_cache=None):
+    """FrameDrawRecord de un AnimFrame (None si el router no tiene el sprite)."""
+    surf = router.get_surface(frame.group, frame.image)
+    if not surf:
+        return None
+    cache = cache if cache is not None else _DEFAULT_TRANSFORM_CACHE
+    flip = frame.flip or ''
+    spr = cache.get(surf, 'H' in flip, 'V' in flip, scale or 1.0)
+    blend = getattr(frame, 'blend', None) or parse_trans(frame.trans)
+    mask = None
+    flags = 0
+    if blend[0]:
+        spr, mask = (blend_cache if blend_cache is not None else _DEFAULT_BLEND_CACHE).get(spr, blend)
+        flags = pygame.BLEND_RGB_SUB if blend[0] == 'S' else pygame.BLEND_RGB_ADD
+    return FrameDrawRecord(spr, mask, int(frame.xoff * scale), int(frame.yoff * scale), flags)
+
+class AnimDrawPlan(object):
+    """
+    Registros de dibujo precalculados por frame para una animación a una escala.
+    Se construyen al primer uso de cada frame; draw() solo hace el blit.
+    Llamar invalidate() si cambian los sprites del router o los frames.
+    """
+    def __init__(self, animation, router, scale=1.0, cache=None, blend_cache=None):
+        self.anim = animation
+        self.router = router
+        self.scale = scale
+        self.cache = cache if cache is not None else _DEFAULT_TRANSFORM_CACHE
+        self.blend_cache = blend_cache if blend_cache is not None else _DEFAULT_BLEND_CACHE
+        self._records = {}
+
+    def invalidate(self):
+        self._records.clear()
+
+    def record(self, frame_idx):
+        rec = self._records.get(frame_idx, False)
+        if rec is False:
+            rec = make_draw_record(self.anim.frames[frame_idx], self.router, self.scale,
+                                   self.cache, self.blend_cache)
+            self._records[frame_idx] = rec
+        return rec
+
+    def draw(self, screen, x, y, frame_idx, draw_boxes=False):
+        if self.anim.frame_count() == 0:
+            return
+        rec = self.record(frame_idx)
+        if rec is not None:
+            rec.blit(screen, x, y)
+        if draw_boxes:
+            f = self.anim.frames[frame_idx]
+            draw_collision_boxes(screen, x, y, self.anim.resolve_boxes_for(frame_idx),
+                                 xoff=int(f.xoff*self.scale), yoff=int(f.yoff*self.scale),
+                                 flip=f.flip, scale=self.scale)
+
+def draw_anim_frame(screen, x, y, animation, router, frame_idx, scale=1.0, draw_boxes=True, cache=None):
     """
     Dibuja un frame de 'animation' en (x,y) usando 'router'.
     - Respeta flip/trans/xoff/yoff.
     - scale: escala sprite y cajas
     - draw_boxes: True para overlay de colisiones
+    - cache: TransformCache para las variantes flip/escala (por defecto una global)
+    Para dibujar la misma animación cada tick conviene AnimDrawPlan.
     """
     if animation.frame_count() == 0:
         return
     f = animation.frames[frame_idx]
-    surf = router.get_surface(f.group, f.image)
-    if not surf:
+    rec = make_draw_record(f, router, scale, cache)
+    if rec is None:
         return
 
-    spr = surf
-    if f.flip:
-        h = ('H' in f.flip)
-        v = ('V' in f.flip)
-        spr = pygame.transform.flip(spr, h, v)
-
-    pos = (x + int(f.xoff * scale), y + int(f.yoff * scale))
-    if scale and scale != 1.0:
-        w,h = spr.get_width(), spr.get_height()
-        spr = pygame.transform.smoothscale(spr, (int(w*scale), int(h*scale)))
-
-    _blit_with_trans(screen, spr, pos, f.trans)
+    rec.blit(screen, x, y)
 
     if draw_boxes:
         boxes = animation.resolve_boxes_for(frame_idx)
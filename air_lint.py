@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+"""
+air_lint.py — verificación cruzada AIR vs SFF para librerías de personajes (Python 2.7)
+
+Por personaje (en paralelo con multiprocessing) carga parse_air y el índice
+de sprites del SFF (read_sprite_index: solo cabeceras, sin decodificar
+píxeles) y reporta:
+
+- missing      : frames AIR que apuntan a un (group,image) que no está en el SFF  [error]
+- zero_loops   : acciones cuyo ciclo de loop suma 0 ticks y no tiene hold (-1)  [error]
+- errors       : .AIR/.SFF ausente o ilegible                                   [error]
+- air_warnings : AirFile.warnings (p. ej. cantidad de cajas Clsn que no cuadra) [warning]
+- unused       : sprites del SFF que ninguna acción usa                         [info]
+
+Salida JSON por stdout; código de salida 1 si hay errores (o warnings con --strict).
+
+Uso:
+    python air_lint.py <carpeta_chars> [procesos] [--strict]
+"""
+
+import sys, json
+
+from char_def import find_characters
+from air_parser import parse_air
+from sff_index import read_sprite_index
+
+# grupos que el engine usa fuera del AIR (retratos, etc.): no cuentan como "unused"
+SYSTEM_GROUPS = (9000,)
+# group -1 en el AIR = frame en blanco (no referencia sprite)
+BLANK_GROUP = -1
+
+def lint_character(ch):
+    """Dict de resultados para un CharacterFiles (nunca lanza)."""
+    rep = dict(name=ch.name, def_path=ch.def_path, air=ch.anim, sff=ch.sprite,
+               missing=[], zero_loops=[], air_warnings=[], unused=[], errors=[])
+    air = None
+    keys = None
+    if not ch.anim:
+        rep["errors"].append("AIR no encontrado")
+    else:
+        try:
+            air = parse_air(ch.anim)
+        except Exception as e:
+            rep["errors"].append("AIR ilegible: %s" % (e,))
+    if not ch.sprite:
+        rep["errors"].append("SFF no encontrado")
+    else:
+        try:
+            keys = set((r.group, r.image) for r in read_sprite_index(ch.sprite))
+        except Exception as e:
+            rep["errors"].append("SFF ilegible: %s" % (e,))
+    if air is None:
+        return rep
+
+    rep["air_warnings"] = list(air.warnings)
+    used = set()
+    for num in sorted(air.actions.keys()):
+        an = air.actions[num]
+        for idx, f in enumerate(an.frames):
+            if f.group == BLANK_GROUP:
+                continue
+            key = (f.group, f.image)
+            used.add(key)
+            if keys is not None and key not in keys:
+                rep["missing"].append(dict(action=num, frame=idx, group=f.group, image=f.image))
+        tl = an.timeline()
+        if tl.n and not tl.holds and tl.period <= 0:
+            rep["zero_loops"].append(num)
+
+    if keys is not None:
+        rep["unused"] = sorted([g, i] for (g, i) in keys - used if g not in SYSTEM_GROUPS)
+    return rep
+
+def _job(ch):
+    return lint_character(ch)
+
+def lint_roster(chars, processes=None):
+    """Lista de reportes (mismo orden que chars). processes=1 -> en serie."""
+    if processes == 1 or len(chars) <= 1:
+        return [lint_character(c) for c in chars]
+    import multiprocessing
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_job, chars, max(1, len(chars) // ((processes or multiprocessing.cpu_count()) * 4)))
+    finally:
+        pool.close()
+        pool.join()
+
+def summarize(reports):
+    s = dict(characters=len(reports), missing=0, zero_loops=0, errors=0,
+             air_warnings=0, unused=0)
+    for r in reports:
+        for k in ("missing", "zero_loops", "errors", "air_warnings", "unused"):
+            s[k] += len(r[k])
+    return s
+
+# ----------------------------------------------------------------------------
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    strict = "--strict" in sys.argv[1:]
+    if not args:
+        print("Uso: python air_lint.py <carpeta_chars> [procesos] [--strict]")
+        sys.exit(2)
+    procs = int(args[1]) if len(args) > 1 else None
+    reports = lint_roster(find_characters(args[0]), processes=procs)
+    summary = summarize(reports)
+    json.dump(dict(summary=summary, characters=reports), sys.stdout, indent=1, sort_keys=True)
+    print()
+    failed = summary["missing"] or summary["zero_loops"] or summary["errors"]
+    if strict and summary["air_warnings"]:
+        failed = True
+    sys.exit(1 if failed else 0)
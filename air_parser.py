@@ -9,6 +9,7 @@ air_parser.py — lector/Parser de archivos .AIR de M.U.G.E.N (Python 2.7)
 """
 
 import re, os, sys
+from bisect import bisect_left, bisect_right
 
 # --------------------------------------------------------------------------
 class HitBox(object):
@@ -29,34 +30,153 @@ class CollisionSet(object):
     def __repr__(self):
         return u"CollisionSet(clsn1=%d,clsn2=%d)"%(len(self.clsn1),len(self.clsn2))
 
+_TRANS_MEMO={}
+
+def parse_trans(trans):
+    """
+    Campo trans del AIR -> (mode, alpha_src, alpha_dst), alphas en 0..255.
+      ''        -> ('',  255, 255)  normal
+      A         -> ('A', 255, 255)  add
+      A1        -> ('A', 255, 128)
+      ASxxxDyyy -> ('A', xxx, yyy)  src*xxx + dst*yyy
+      S         -> ('S', 255, 255)  sub
+    """
+    t=(trans or '').upper().strip()
+    r=_TRANS_MEMO.get(t)
+    if r is not None: return r
+    if t=='A': r=('A',255,255)
+    elif t=='S': r=('S',255,255)
+    elif t=='A1': r=('A',255,128)
+    elif t.startswith('AS') and 'D' in t:
+        try:
+            a_s,a_d=t[2:].split('D',1)
+            r=('A',max(0,min(int(a_s),255)),max(0,min(int(a_d),255)))
+        except ValueError:
+            r=('A',255,255)
+    else: r=('',255,255)
+    _TRANS_MEMO[t]=r
+    return r
+
 class AnimFrame(object):
-    __slots__=('group','image','xoff','yoff','time','flip','trans','boxes','tags')
+    __slots__=('group','image','xoff','yoff','time','flip','trans','blend','boxes','tags')
     def __init__(self,g,i,xo,yo,t,flip='',trans='',boxes=None,tags=None):
         self.group=int(g);self.image=int(i)
         self.xoff=int(xo);self.yoff=int(yo)
         self.time=int(t)
         self.flip=(flip or '').upper()
         self.trans=(trans or '').upper()
+        self.blend=parse_trans(self.trans)   # parseado una sola vez (ver parse_trans)
         self.boxes=boxes if boxes else CollisionSet()
         self.tags=list(tags) if tags else []
     def __repr__(self):
         return u"AnimFrame(g=%d,i=%d,off=(%d,%d),t=%d,flip=%s,trans=%s)"%(
             self.group,self.image,self.xoff,self.yoff,self.time,self.flip,self.trans)
 
+class AnimTimeline(object):
+    """
+    Línea de tiempo precalculada de una Animation (sumas prefijas).
+    - starts[i]: tick en que empieza el frame i (starts[n] = suma total).
+      Frames con time 0 duran 0 ticks; frames con time<0 (-1) congelan.
+    - holds: índices de frames con time<0 (ordenados).
+    - loop_idx: loopstart efectivo (sin Loopstart se repite el último frame,
+      igual que Animator._next_index_compat).
+    - total: ticks hasta el final de la primera pasada (o hasta el primer hold).
+    - period: ticks de un ciclo [loop_idx, n) (0 si hay hold en el ciclo).
+    Todas las consultas son bisect + aritmética modular.
+    """
+    __slots__=('n','starts','holds','loop_idx','total','period')
+    def __init__(self,frames,loopstart_idx=None):
+        starts=[];holds=[];acc=0
+        for i,f in enumerate(frames):
+            starts.append(acc)
+            if f.time<0: holds.append(i)
+            elif f.time>0: acc+=f.time
+        starts.append(acc)
+        n=len(frames)
+        self.n=n;self.starts=starts;self.holds=holds
+        if loopstart_idx is not None and 0<=loopstart_idx<n: self.loop_idx=loopstart_idx
+        else: self.loop_idx=max(0,n-1)
+        self.total=starts[holds[0]] if holds else acc
+        if n==0 or self._hold_from(self.loop_idx) is not None: self.period=0
+        else: self.period=acc-starts[self.loop_idx]
+
+    def _hold_from(self,idx):
+        k=bisect_left(self.holds,idx)
+        return self.holds[k] if k<len(self.holds) else None
+
+    def _find(self,t,lo,hi):
+        """Frame i en [lo,hi) con starts[i] <= t < starts[i+1] (salta frames de 0 ticks)."""
+        i=bisect_right(self.starts,t,lo,hi)-1
+        return i if i>=lo else lo
+
+    def _in_loop(self,r):
+        """(frame, tick) tras r ticks pasados el final de la animación."""
+        L=self.loop_idx;base=self.starts[L]
+        h=self._hold_from(L)
+        if h is not None:
+            if r>=self.starts[h]-base: return h,0
+            t=base+r;i=self._find(t,L,h)
+            return i,t-self.starts[i]
+        if self.period<=0: return self.n-1,0
+        t=base+r%self.period;i=self._find(t,L,self.n)
+        return i,t-self.starts[i]
+
+    def advance(self,idx,tick,ticks):
+        """Avanza 'ticks' desde (idx, tick) -> (frame, tick_en_frame)."""
+        n=self.n
+        if n==0: return 0,0
+        if idx<0 or idx>=n: idx,tick=0,0
+        h=self._hold_from(idx)
+        if h==idx: return idx,tick
+        t=self.starts[idx]+tick+ticks
+        end=self.starts[h] if h is not None else self.starts[n]
+        if t<end:
+            i=self._find(t,idx,h if h is not None else n)
+            return i,t-self.starts[i]
+        if h is not None: return h,0
+        return self._in_loop(t-end)
+
+    def locate(self,elapsed):
+        """(frame, tick_en_frame) tras 'elapsed' ticks desde el inicio."""
+        return self.advance(0,0,max(0,int(elapsed)))
+
+    def anim_time(self,elapsed):
+        """
+        Equivalente a AnimTime de M.U.G.E.N: negativo mientras falta para el
+        final, 0 en el tick en que termina (y al cerrar cada ciclo del loop).
+        """
+        d=elapsed-self.total
+        if d<=0: return d
+        if self.holds or self.period<=0: return 0
+        r=d%self.period
+        return 0 if r==0 else r-self.period
+
 class Animation(object):
-    __slots__=('number','frames','loopstart_idx','defaults')
+    __slots__=('number','frames','loopstart_idx','defaults','_timeline')
     def __init__(self,n,frames=None,loopstart_idx=None,defaults=None):
         self.number=int(n)
         self.frames=list(frames) if frames else []
         self.loopstart_idx=loopstart_idx
         self.defaults=defaults if defaults else CollisionSet()
+        self._timeline=None
     def frame_count(self): return len(self.frames)
     def resolve_boxes_for(self,idx):
         f=self.frames[idx]
         if not f.boxes.clsn1 and not f.boxes.clsn2: return self.defaults.copy()
         return f.boxes
+    def timeline(self):
+        """AnimTimeline cacheada; se recalcula si cambia la cantidad de frames o el loopstart.
+        Si se editan tiempos de frames ya existentes, llamar invalidate_timeline()."""
+        tl=self._timeline
+        if tl is None or tl.n!=len(self.frames) or tl.loop_idx!=self._loop_key():
+            tl=self._timeline=AnimTimeline(self.frames,self.loopstart_idx)
+        return tl
+    def _loop_key(self):
+        n=len(self.frames);ls=self.loopstart_idx
+        return ls if ls is not None and 0<=ls<n else max(0,n-1)
+    def invalidate_timeline(self): self._timeline=None
     def total_ticks(self):
-        return sum([f.time for f in self.frames if f.time>0])
+        return self.timeline().starts[-1]
     def __repr__(self):
         return u"Animation(%d,frames=%d,loop=%r)"%(self.number,len(self.frames),self.loopstart_idx)
 
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+"""
+char_def.py — lectura mínima de .DEF de personajes M.U.G.E.N (Python 2.7)
+
+- parse_def(path)          -> {seccion_lower: {clave_lower: valor_str}}
+- character_files(def)     -> CharacterFiles (rutas absolutas de sprite/anim/snd/cns/act)
+- find_characters(dir)     -> lista de CharacterFiles (una por subcarpeta con .def)
+
+No interpreta nada más allá de [Info] y [Files]; el resto de secciones se
+devuelven crudas por si otro módulo las necesita.
+"""
+
+import io, os, collections
+
+CharacterFiles = collections.namedtuple("CharacterFiles", [
+    "name", "char_dir", "def_path", "sprite", "anim", "sound", "cns", "pals"
+])
+
+def _strip_comment(l):
+    s = l.find(';')
+    return l[:s] if s >= 0 else l
+
+def _read_lines(path):
+    try:
+        with io.open(path, 'r', encoding='utf-8') as f:
+            return f.read().splitlines()
+    except Exception:
+        with io.open(path, 'r', encoding='cp1252', errors='replace') as f:
+            return f.read().splitlines()
+
+def parse_def(path):
+    """
+    Parser tolerante de .DEF: secciones [X] y líneas clave = valor.
+    Claves y secciones en minúsculas; valores sin comillas externas.
+    """
+    out = {}
+    cur = None
+    for raw in _read_lines(path):
+        line = _strip_comment(raw).strip()
+        if not line:
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            cur = out.setdefault(line[1:-1].strip().lower(), {})
+            continue
+        if cur is None or '=' not in line:
+            continue
+        k, v = line.split('=', 1)
+        v = v.strip()
+        if len(v) >= 2 and v[0] == '"' and v[-1] == '"':
+            v = v[1:-1]
+        cur[k.strip().lower()] = v
+    return out
+
+def _resolve(char_dir, rel):
+    """Ruta relativa al directorio del personaje (o None si no existe)."""
+    if not rel:
+        return None
+    p = os.path.normpath(os.path.join(char_dir, rel.replace('\\', '/')))
+    return p if os.path.exists(p) else None
+
+def character_files(def_path):
+    """
+    Devuelve CharacterFiles a partir de un .DEF.
+    cns: [cns, st, st0..st9, stcommon] existentes (en ese orden, sin duplicados).
+    pals: pal1..pal12 existentes.
+    """
+    data = parse_def(def_path)
+    char_dir = os.path.dirname(os.path.abspath(def_path))
+    info = data.get('info', {})
+    files = data.get('files', {})
+
+    cns = []
+    for key in ['cns', 'st'] + ['st%d' % i for i in range(10)] + ['stcommon']:
+        p = _resolve(char_dir, files.get(key))
+        if p and p not in cns:
+            cns.append(p)
+
+    pals = []
+    for i in range(1, 13):
+        p = _resolve(char_dir, files.get('pal%d' % i))
+        if p:
+            pals.append(p)
+
+    name = info.get('displayname') or info.get('name') or os.path.basename(char_dir)
+    return CharacterFiles(
+        name=name, char_dir=char_dir, def_path=os.path.abspath(def_path),
+        sprite=_resolve(char_dir, files.get('sprite')),
+        anim=_resolve(char_dir, files.get('anim')),
+        sound=_resolve(char_dir, files.get('sound')),
+        cns=cns, pals=pals,
+    )
+
+def find_characters(chars_dir):
+    """
+    Recorre chars_dir/<personaje>/ y devuelve CharacterFiles por cada .DEF
+    cuyo nombre coincide con la carpeta (convención M.U.G.E.N); si no hay
+    coincidencia, usa el primer .DEF encontrado en la carpeta.
+    """
+    out = []
+    for entry in sorted(os.listdir(chars_dir)):
+        d = os.path.join(chars_dir, entry)
+        if not os.path.isdir(d):
+            continue
+        defs = sorted(f for f in os.listdir(d) if f.lower().endswith('.def'))
+        if not defs:
+            continue
+        pick = None
+        for f in defs:
+            if os.path.splitext(f)[0].lower() == entry.lower():
+                pick = f
+                break
+        if pick is None:
+            pick = defs[0]
+        try:
+            out.append(character_files(os.path.join(d, pick)))
+        except Exception:
+            # .DEF ilegible: se omite el personaje
+            pass
+    return out
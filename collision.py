@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+"""
+collision.py — detección de golpes con cajas Clsn de AIR (Python 2.7)
+
+- BoxCache: cajas del frame actual ya resueltas (defaults), con flip del
+  frame y del facing aplicados, como array('i') plano [x1,y1,x2,y2, ...]
+  normalizado (x1<=x2, y1<=y2). Se calcula una vez por (anim, frame, facing).
+- Collider: entidad activa (player / helper / proyectil) con posición,
+  facing, team y owner.
+- CollisionWorld.step(): broad phase sweep-and-prune sobre X de los AABB de
+  cada entidad y luego test AABB exacto Clsn1 (ataque) vs Clsn2 (cuerpo).
+  Devuelve la lista de Hit del tick.
+
+Las coordenadas de las cajas son las de air_parser (ya afectadas por
+DEFAULT_BOX_VFLIP); la posición del Collider se suma tal cual, así que solo
+hace falta que todas las entidades usen el mismo convenio.
+
+Benchmark:
+    python collision.py [n_entidades] [ticks]
+"""
+
+import sys, collections
+from array import array
+
+Hit = collections.namedtuple("Hit", ["attacker", "defender", "clsn1_index", "clsn2_index"])
+
+_EMPTY = array('i')
+
+# ----------------------------------------------------------------------------
+#  Cajas planas por frame
+# ----------------------------------------------------------------------------
+
+def _flat_boxes(lst, mirror_x):
+    out = array('i')
+    for b in lst:
+        x1, x2 = (-b.x2, -b.x1) if mirror_x else (b.x1, b.x2)
+        y1, y2 = b.y1, b.y2
+        if x1 > x2: x1, x2 = x2, x1
+        if y1 > y2: y1, y2 = y2, y1
+        out.extend((x1, y1, x2, y2))
+    return out
+
+def _bounds(arr):
+    """(minx, miny, maxx, maxy) de un array plano o None si está vacío."""
+    if not arr:
+        return None
+    return (min(arr[0::4]), min(arr[1::4]), max(arr[2::4]), max(arr[3::4]))
+
+class FrameBoxes(object):
+    """Clsn1/Clsn2 de un frame en coords locales + AABB de cada grupo."""
+    __slots__ = ('clsn1', 'clsn2', 'bounds1', 'bounds2')
+    def __init__(self, clsn1, clsn2):
+        self.clsn1 = clsn1
+        self.clsn2 = clsn2
+        self.bounds1 = _bounds(clsn1)
+        self.bounds2 = _bounds(clsn2)
+
+_NO_BOXES = FrameBoxes(_EMPTY, _EMPTY)
+
+class BoxCache(object):
+    """
+    Caché (id(anim), frame_idx, facing) -> FrameBoxes.
+    Guarda la referencia a la Animation para descartar ids reutilizados.
+    """
+    def __init__(self):
+        self._d = {}
+
+    def get(self, anim, frame_idx, facing=1):
+        if anim is None or not (0 <= frame_idx < anim.frame_count()):
+            return _NO_BOXES
+        key = (id(anim), frame_idx, 1 if facing >= 0 else -1)
+        ent = self._d.get(key)
+        if ent is not None and ent[0] is anim:
+            return ent[1]
+        f = anim.frames[frame_idx]
+        boxes = anim.resolve_boxes_for(frame_idx)
+        # flip H del frame y facing -1 se combinan (dos espejos = identidad)
+        mirror = ('H' in (f.flip or '')) != (facing < 0)
+        fb = FrameBoxes(_flat_boxes(boxes.clsn1, mirror), _flat_boxes(boxes.clsn2, mirror))
+        self._d[key] = (anim, fb)
+        return fb
+
+    def clear(self):
+        self._d.clear()
+
+# ----------------------------------------------------------------------------
+#  Entidades
+# ----------------------------------------------------------------------------
+
+class Collider(object):
+    """
+    Entidad que participa en la detección.
+    kind: 'player' | 'helper' | 'projectile' (informativo)
+    team: entidades del mismo team no se golpean (None = sin team)
+    owner: Collider raíz; una entidad nunca golpea a su owner ni a otras del mismo owner
+    """
+    __slots__ = ('name', 'kind', 'team', 'owner', 'anim', 'frame_idx',
+                 'x', 'y', 'facing', 'active', 'can_hit', 'can_be_hit', '_fb')
+    def __init__(self, name, kind='player', team=None, owner=None,
+                 anim=None, frame_idx=0, x=0.0, y=0.0, facing=1):
+        self.name = name
+        self.kind = kind
+        self.team = team
+        self.owner = owner
+        self.anim = anim
+        self.frame_idx = int(frame_idx)
+        self.x = float(x); self.y = float(y)
+        self.facing = 1 if facing >= 0 else -1
+        self.active = True
+        self.can_hit = True        # usa Clsn1
+        self.can_be_hit = True     # usa Clsn2
+        self._fb = _NO_BOXES
+
+    def set_frame(self, anim, frame_idx):
+        self.anim = anim
+        self.frame_idx = int(frame_idx)
+
+    def sync(self, animator):
+        """Toma anim/frame de un air_draw_anim.Animator."""
+        self.anim = animator.anim
+        self.frame_idx = animator.frame_idx
+
+    def root(self):
+        o = self
+        while o.owner is not None:
+            o = o.owner
+        return o
+
+    def __repr__(self):
+        return "Collider(%r,%s,pos=(%g,%g))" % (self.name, self.kind, self.x, self.y)
+
+# ----------------------------------------------------------------------------
+#  Mundo
+# ----------------------------------------------------------------------------
+
+def _overlap_boxes(a, ax, ay, b, bx, by):
+    """Primer par (i, j) de cajas que se tocan entre arrays planos a y b, o None."""
+    na = len(a); nb = len(b)
+    for i in range(0, na, 4):
+        l1 = a[i] + ax; t1 = a[i+1] + ay; r1 = a[i+2] + ax; d1 = a[i+3] + ay
+        for j in range(0, nb, 4):
+            if (l1 <= b[j+2] + bx and b[j] + bx <= r1 and
+                    t1 <= b[j+3] + by and b[j+1] + by <= d1):
+                return i // 4, j // 4
+    return None
+
+class CollisionWorld(object):
+    """
+    world = CollisionWorld()
+    world.add(p1); world.add(p2); world.add(fireball)
+    hits = world.step()    # [Hit(attacker, defender, i, j)]
+    """
+    def __init__(self, box_cache=None):
+        self.colliders = []
+        self.boxes = box_cache or BoxCache()
+        self.last_pairs_tested = 0
+
+    def add(self, c):
+        self.colliders.append(c)
+        return c
+
+    def remove(self, c):
+        try:
+            self.colliders.remove(c)
+        except ValueError:
+            pass
+
+    def _can_interact(self, a, b):
+        if a.team is not None and a.team == b.team:
+            return False
+        return a.root() is not b.root()
+
+    def step(self):
+        """Detecta golpes del tick actual (no modifica las entidades)."""
+        # AABB mundial por entidad (unión de Clsn1 si ataca y Clsn2 si es golpeable)
+        spans = []
+        for c in self.colliders:
+            if not c.active:
+                continue
+            fb = c._fb = self.boxes.get(c.anim, c.frame_idx, c.facing)
+            b1 = fb.bounds1 if c.can_hit else None
+            b2 = fb.bounds2 if c.can_be_hit else None
+            if b1 is None and b2 is None:
+                continue
+            if b1 is None: bb = b2
+            elif b2 is None: bb = b1
+            else: bb = (min(b1[0], b2[0]), min(b1[1], b2[1]), max(b1[2], b2[2]), max(b1[3], b2[3]))
+            spans.append((bb[0] + c.x, bb[2] + c.x, bb[1] + c.y, bb[3] + c.y, c))
+
+        # Sweep-and-prune en X
+        spans.sort(key=lambda s: s[0])
+        hits = []
+        active = []
+        tested = 0
+        for s in spans:
+            x0 = s[0]
+            active = [a for a in active if a[1] >= x0]
+            for a in active:
+                if a[3] < s[2] or s[3] < a[2]:
+                    continue   # sin solape en Y
+                ca, cb = a[4], s[4]
+                if not self._can_interact(ca, cb):
+                    continue
+                tested += 1
+                self._test_pair(ca, cb, hits)
+                self._test_pair(cb, ca, hits)
+            active.append(s)
+        self.last_pairs_tested = tested
+        return hits
+
+    def _test_pair(self, att, dfn, hits):
+        if not att.can_hit or not dfn.can_be_hit:
+            return
+        c1 = att._fb.clsn1; c2 = dfn._fb.clsn2
+        if not c1 or not c2:
+            return
+        r = _overlap_boxes(c1, att.x, att.y, c2, dfn.x, dfn.y)
+        if r is not None:
+            hits.append(Hit(att, dfn, r[0], r[1]))
+
+# ----------------------------------------------------------------------------
+if __name__ == '__main__':
+    import random, time
+    from air_parser import Animation, AnimFrame, CollisionSet, HitBox
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    _clock = getattr(time, "perf_counter", time.time)
+
+    def _anim(num, c1, c2):
+        a = Animation(num, defaults=CollisionSet(
+            [HitBox(1, *b) for b in c1], [HitBox(2, *b) for b in c2]))
+        a.frames.append(AnimFrame(0, 0, 0, 0, -1))
+        return a
+
+    body = _anim(0, [(0, -60, 40, -50)], [(-15, -80, 15, 0)])
+    shot = _anim(1, [(-8, -8, 8, 8)], [(-6, -6, 6, 6)])
+
+    world = CollisionWorld()
+    p1 = world.add(Collider("p1", team=1, anim=body, x=100, y=0))
+    p2 = world.add(Collider("p2", team=2, anim=body, x=130, y=0, facing=-1))
+    rnd = random.Random(1)
+    shots = []
+    for k in range(n):
+        owner = p1 if k % 2 == 0 else p2
+        shots.append(world.add(Collider("shot%d" % k, kind='projectile', team=owner.team,
+                                        owner=owner, anim=shot,
+                                        x=rnd.uniform(0, 2000), y=rnd.uniform(-100, 0))))
+
+    total = 0
+    t0 = _clock()
+    for _ in range(ticks):
+        for s in shots:
+            s.x += s.root().facing * 3
+        total += len(world.step())
+    dt = _clock() - t0
+    print("Entidades: %d  ticks: %d  hits: %d" % (len(world.colliders), ticks, total))
+    print("%.3f ms/tick  (pares testeados último tick: %d de %d posibles)" % (
+        1000.0 * dt / ticks, world.last_pairs_tested,
+        len(world.colliders) * (len(world.colliders) - 1) // 2))
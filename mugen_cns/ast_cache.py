@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, print_function
+"""
+ast_cache.py — caché en disco de PlayerCNS ya parseados (Python 2.7)
+
+load_cns_files() relee, tokeniza y parsea cada .CNS (common1.cns incluido)
+en cada carga. Aquí el AST de cada archivo (statedefs, states, controllers y
+árboles de expresión) se codifica como tuplas anidadas y se guarda con
+marshal en <dir>/<clave>.cnsc. La clave es el hash del contenido
++ PARSER_VERSION + versión de marshal/Python, así que cambiar el parser o el
+intérprete invalida la caché sola y un mismo directorio sirve a todos los
+personajes. Por defecto <dir> es la caché del usuario (default_cache_dir()),
+no la carpeta del personaje (puede ser de solo lectura). Una carga "caliente" es un read +
+marshal.loads + reconstrucción de nodos: sin lexer ni parser.
+
+    from mugen_cns.ast_cache import load_cns_files
+    ast = load_cns_files(["common1.cns", "kfm.cns"])           # caché del usuario
+    ast = load_cns_files(paths, cache_dir="cache/cns")
+
+Codificación de expresiones:
+    Num   -> (0, value, is_float)      Var   -> (1, name)
+    Call  -> (2, name, (args...))      Unary -> (3, op, rhs)
+    Bin   -> (4, op, lhs, rhs)         Temp  -> (5, key, expr)
+    Tuple -> (6, (items...))           None  -> None
+"""
+
+import os, sys, marshal, hashlib
+
+from .ast_nodes import Num, Var, Call, Unary, Bin, Temp, Tuple, StateDef, Controller, PlayerCNS
+from .parser import Parser, PARSER_VERSION
+from .lexer import lex
+from .loader import _read_bytes, _decode_text, merge_cns
+
+CACHE_FORMAT_VERSION = 1
+_MAGIC = 'CNSC'
+
+# ----------------------------------------------------------------------------
+#  Codificación
+# ----------------------------------------------------------------------------
+
+def _enc(node):
+    if node is None:
+        return None
+    if isinstance(node, Num):
+        return (0, node.value, bool(node.is_float))
+    if isinstance(node, Var):
+        return (1, node.name)
+    if isinstance(node, Call):
+        return (2, node.name, tuple(_enc(a) for a in node.args))
+    if isinstance(node, Unary):
+        return (3, node.op, _enc(node.rhs))
+    if isinstance(node, Bin):
+        return (4, node.op, _enc(node.lhs), _enc(node.rhs))
+    if isinstance(node, Temp):
+        return (5, node.key, _enc(node.expr))
+    if isinstance(node, Tuple):
+        return (6, tuple(_enc(i) for i in node.items))
+    raise TypeError("Nodo no serializable: %r" % (node,))
+
+def _dec(t):
+    if t is None:
+        return None
+    k = t[0]
+    if k == 0:
+        return Num(t[1], t[2])
+    if k == 1:
+        return Var(t[1])
+    if k == 2:
+        return Call(t[1], [_dec(a) for a in t[2]])
+    if k == 3:
+        return Unary(t[1], _dec(t[2]))
+    if k == 4:
+        return Bin(t[1], _dec(t[2]), _dec(t[3]))
+    if k == 5:
+        return Temp(t[1], _dec(t[2]))
+    if k == 6:
+        return Tuple([_dec(i) for i in t[1]])
+    raise ValueError("Tag de nodo inválido: %r" % (k,))
+
+def _enc_params(params):
+    return tuple((k, _enc(v)) for k, v in params.items())
+
+def _dec_params(items):
+    d = {}
+    for k, v in items:
+        d[k] = _dec(v)
+    return d
+
+def encode_cns(ast):
+    """PlayerCNS -> tuplas anidadas (solo tipos de marshal)."""
+    sdefs = tuple((num, sd.number, _enc_params(sd.params))
+                  for num, sd in ast.statedefs.items())
+    states = []
+    for st_no, ctrls in ast.states.items():
+        states.append((st_no, tuple(
+            (c.state_no, c.index, c.ctype, _enc_params(c.params),
+             tuple(_enc(t) for t in c.triggers), _enc(c.triggerall))
+            for c in ctrls)))
+    globs = tuple((sec, _enc_params(p)) for sec, p in ast.globals.items())
+    return (sdefs, tuple(states), globs)
+
+def decode_cns(data):
+    """Inversa de encode_cns."""
+    sdefs, states, globs = data
+    ast = PlayerCNS()
+    for num, number, params in sdefs:
+        sd = StateDef(number)
+        sd.params = _dec_params(params)
+        ast.statedefs[num] = sd
+    for st_no, ctrls in states:
+        out = ast.states[st_no] = []
+        for state_no, index, ctype, params, triggers, triggerall in ctrls:
+            c = Controller(state_no, index, ctype)
+            c.params = _dec_params(params)
+            c.triggers = [_dec(t) for t in triggers]
+            c.triggerall = _dec(triggerall)
+            out.append(c)
+    for sec, params in globs:
+        ast.globals[sec] = _dec_params(params)
+    return ast
+
+def dump_cns(ast):
+    return marshal.dumps((_MAGIC, CACHE_FORMAT_VERSION, encode_cns(ast)))
+
+def load_cns_bytes(blob):
+    magic, version, data = marshal.loads(blob)
+    if magic != _MAGIC or version != CACHE_FORMAT_VERSION:
+        raise ValueError("Caché CNS de otro formato")
+    return decode_cns(data)
+
+# ----------------------------------------------------------------------------
+#  Caché en disco
+# ----------------------------------------------------------------------------
+
+def source_key(raw):
+    """Hash del contenido + versión del parser, de marshal y de Python."""
+    h = hashlib.sha1()
+    h.update(raw)
+    h.update(('|%d|%d|%d|%d' % (PARSER_VERSION, CACHE_FORMAT_VERSION,
+                                marshal.version, sys.version_info[0])).encode('ascii'))
+    return h.hexdigest()
+
+def default_cache_dir():
+    """
+    %LOCALAPPDATA%\\mugen_cns\\cns en Windows; $XDG_CACHE_HOME/mugen_cns/cns
+    (o ~/.cache/mugen_cns/cns) en el resto.
+    """
+    base = os.environ.get('LOCALAPPDATA' if os.name == 'nt' else 'XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'mugen_cns', 'cns')
+
+def parse_cns_cached(path, cache_dir=None):
+    """
+    PlayerCNS de un archivo, usando la caché si es válida.
+    Si no existe o está corrupta, parsea normal y la (re)escribe.
+    Errores de escritura de la caché se ignoran.
+    """
+    if not os.path.exists(path):
+        raise IOError("No existe: %s" % path)
+    raw = _read_bytes(path)
+    cache_dir = cache_dir or default_cache_dir()
+    cpath = os.path.join(cache_dir, source_key(raw) + '.cnsc')
+
+    if os.path.exists(cpath):
+        try:
+            with open(cpath, 'rb') as f:
+                return load_cns_bytes(f.read())
+        except Exception:
+            pass  # caché corrupta o de otro formato: re-parsear
+
+    ast = Parser(lex(_decode_text(raw))).parse_file()
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        tmp = cpath + '.tmp%d' % os.getpid()
+        with open(tmp, 'wb') as f:
+            f.write(dump_cns(ast))
+        if os.path.exists(cpath):
+            os.remove(cpath)
+        os.rename(tmp, cpath)
+    except Exception:
+        pass
+    return ast
+
+def load_cns_files(paths, cache_dir=None):
+    """Como loader.load_cns_files pero con un AST cacheado por archivo."""
+    merged = None
+    for p in paths:
+        merged = merge_cns(merged, parse_cns_cached(p, cache_dir))
+    return merged
+
+# ----------------------------------------------------------------------------
+if __name__ == '__main__':
+    import time, shutil, tempfile
+    from . import loader
+    if len(sys.argv) < 2:
+        print("Uso: python -m mugen_cns.ast_cache <archivo.cns> [...]"); sys.exit(1)
+    paths = sys.argv[1:]
+    _clock = getattr(time, "perf_counter", time.time)
+    tmpdir = tempfile.mkdtemp(prefix='cnsc')
+    try:
+        t0 = _clock(); a = loader.load_cns_files(paths); t1 = _clock()
+        load_cns_files(paths, cache_dir=tmpdir); t2 = _clock()
+        b = load_cns_files(paths, cache_dir=tmpdir); t3 = _clock()
+        size = sum(os.path.getsize(os.path.join(tmpdir, n)) for n in os.listdir(tmpdir))
+        print("AST: %r  caché: %d bytes" % (a, size))
+        print("sin caché      : %.1f ms" % ((t1 - t0) * 1000.0))
+        print("frío (+escribe): %.1f ms" % ((t2 - t1) * 1000.0))
+        print("caliente       : %.1f ms" % ((t3 - t2) * 1000.0))
+        print("Equivalente:", encode_cns(a) == encode_cns(b))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
@@ -39,6 +39,21 @@ class Bin(Expr):
     def __repr__(self):
         return "Bin(%s,%s,%s)" % (self.op, self.lhs, self.rhs)
 
+class Temp(Expr):
+    """Subexpresión compartida (optimizer): se evalúa una vez por tick en ctx.temps[key]."""
+    def __init__(self, key, expr):
+        self.key = key
+        self.expr = expr
+    def __repr__(self):
+        return "Temp(%s,%s)" % (self.key, self.expr)
+
+class Tuple(Expr):
+    """Valor separado por comas (pos = 10, -20; value = S5, 0). Un elemento vacío es None."""
+    def __init__(self, items):
+        self.items = items
+    def __repr__(self):
+        return "Tuple(%s)" % (self.items,)
+
 class StateDef(object):
     def __init__(self, number):
         self.number = number
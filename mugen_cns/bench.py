@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, print_function
+"""
+bench.py — micro-benchmarks del paquete mugen_cns (Python 2.7)
+
+    python -m mugen_cns.bench lex  <archivo.cns> [...]
+    python -m mugen_cns.bench eval <archivo.cns> [...]
+    python -m mugen_cns.bench ctrl <archivo.cns> [...]
+    python -m mugen_cns.bench multi <archivo.cns> [...]
+    python -m mugen_cns.bench world <archivo.cns> [...]
+
+lex : tokens/seg del lexer, tiempo de parseo y pico de memoria parseando
+      en streaming (ventana de lookahead) vs. materializando list(tokens).
+eval: evaluaciones/seg de todos los triggers del CNS con evaluator.eval_expr
+      (recorrido del AST) vs. expr_compiler (closures), sin y con optimizer
+      (plegado de constantes + CSE) y con el memo de triggers puros (hit rate).
+      Cada "tick" evalúa TICK_STATES states seguidos (como -3, -2, -1 y el
+      state actual en M.U.G.E.N); ctx.temps y el memo se vacían entre ticks.
+      La referencia (eval_expr) usa un EvalContext con el memo apagado.
+ctrl: controllers/seg de CNSInterpreter.tick (triggers compilados + despacho
+      pre-ligado en load_plan) recorriendo todos los states del CNS con un
+      adaptador que no hace nada.
+multi: 1 vs. 50 intérpretes sobre el mismo plan compilado (cada uno con su
+      EvalContext); el costo por tick de cada uno debe ser el mismo.
+world: ticks/s de world.World con 2 jugadores + 100 helpers + 100 explods
+      sobre el mismo plan y physics.Physics, y el tiempo de cada fase
+      (física con NumPy si está instalado y en Python puro).
+"""
+
+import sys, time
+
+from .lexer import lex
+from .parser import Parser
+from .loader import _read_text, load_cns_files
+from .evaluator import EvalContext, eval_expr
+from .expr_compiler import compile_expr, compile_controller_triggers
+from .optimizer import optimize_cns
+from .params import statedef_flags
+
+_clock = getattr(time, "perf_counter", time.time)
+
+try:
+    import tracemalloc
+    _HAS_TRACEMALLOC = True
+except Exception:
+    _HAS_TRACEMALLOC = False
+
+def _peak(fn, *args):
+    """(resultado, pico de memoria en KiB) de fn(*args). -1 si no hay tracemalloc."""
+    if not _HAS_TRACEMALLOC:
+        # Py2.7: sin tracemalloc; ru_maxrss solo crece, sirve de cota
+        try:
+            import resource
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            res = fn(*args)
+            return res, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+        except ImportError:
+            return fn(*args), -1
+    tracemalloc.start()
+    try:
+        res = fn(*args)
+        return res, tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+def _best(fn, args, repeat):
+    best = None
+    res = None
+    for _ in range(repeat):
+        t0 = _clock()
+        res = fn(*args)
+        dt = _clock() - t0
+        if best is None or dt < best:
+            best = dt
+    return res, best
+
+def _count_tokens(text):
+    n = 0
+    for _ in lex(text):
+        n += 1
+    return n
+
+def _parse_stream(text):
+    return Parser(lex(text)).parse_file()
+
+def _parse_list(text):
+    return Parser(list(lex(text))).parse_file()
+
+def bench_lex(paths, repeat=3):
+    texts = [_read_text(p) for p in paths]
+    text = "\n".join(texts)
+    lines = text.count("\n") + 1
+    ntok, t_lex = _best(_count_tokens, (text,), repeat)
+    _, t_parse = _best(_parse_stream, (text,), repeat)
+    _, peak_stream = _peak(_parse_stream, text)
+    _, peak_list = _peak(_parse_list, text)
+    return dict(files=len(paths), lines=lines, tokens=ntok,
+                lex_seconds=t_lex, tokens_per_sec=ntok / max(1e-9, t_lex),
+                parse_seconds=t_parse,
+                peak_kb_stream=peak_stream, peak_kb_list=peak_list)
+
+# ----------------------------------------------------------------------------
+#  Evaluación de triggers
+# ----------------------------------------------------------------------------
+
+def load_trigger_registry():
+    """Registro global de triggers (el mismo que usa CNSRuntime)."""
+    from .cns_integrator import load_trigger_catalog
+    return load_trigger_catalog()["registry"]
+
+class _BenchProvider(object):
+    """Provider con valores fijos: mide el costo de evaluar, no el del juego."""
+    def time_in_state(self): return 3
+    def state_no(self): return 52
+    def prev_state_no(self): return 40
+    def has_control(self): return 1
+    def pos_x(self): return 10.0
+    def pos_y(self): return -4.0
+    def vel_x(self): return 1.5
+    def vel_y(self): return 2.0
+    def anim_no(self): return 5
+    def anim_time_left(self): return -3
+    def is_in_anim_elem(self, n): return n == 2
+    def anim_elem_time(self, n): return 1
+    def command_active(self, s): return s == "holdfwd"
+
+def collect_trigger_nodes(ast):
+    nodes = []
+    for group in collect_trigger_groups(ast):
+        nodes.extend(group)
+    return nodes
+
+TICK_STATES = 4
+
+def collect_trigger_groups(ast, per_tick=TICK_STATES):
+    """[[nodos de per_tick states], ...] en orden de states (uno por tick simulado)."""
+    groups = []
+    nodes = []
+    for i, st in enumerate(sorted(ast.states)):
+        if i and i % per_tick == 0:
+            groups.append(nodes)
+            nodes = []
+        for c in ast.states[st]:
+            if c.triggerall is not None:
+                nodes.append(c.triggerall)
+            nodes.extend(c.triggers)
+    if nodes:
+        groups.append(nodes)
+    return groups
+
+def _safe(fn, *args):
+    # como CNSInterpreter: un trigger que lanza cuenta como 0
+    try:
+        return fn(*args)
+    except Exception:
+        return 0
+
+def _eval_all_ast(nodes, ctx, rounds):
+    for _ in range(rounds):
+        for n in nodes:
+            _safe(eval_expr, n, ctx)
+
+def _eval_all_compiled(groups, ctx, rounds):
+    temps = ctx.temps
+    memo = ctx.memo
+    for _ in range(rounds):
+        for fns in groups:
+            temps.clear()
+            memo.clear()
+            for fn in fns:
+                _safe(fn, ctx)
+
+def _compile_groups(groups, ctx, memo=None):
+    return [[compile_expr(n, ctx.triggers, memo) for n in g] for g in groups]
+
+def _check_groups(ref_groups, groups, ref_ctx, ctx, label):
+    for ref, fns in zip(ref_groups, groups):
+        ctx.temps.clear()
+        ctx.memo.clear()
+        for n, fn in zip(ref, fns):
+            a, b = _safe(eval_expr, n, ref_ctx), _safe(fn, ctx)
+            if a != b:
+                raise AssertionError("%s distinto para %r: %r != %r" % (label, n, a, b))
+
+def bench_eval(paths, rounds=20, repeat=3):
+    ast = load_cns_files(paths)
+    ref_groups = collect_trigger_groups(ast)
+    nodes = collect_trigger_nodes(ast)
+    ctx = EvalContext(load_trigger_registry(), provider=_BenchProvider())
+    ref_ctx = EvalContext(ctx.triggers, provider=ctx.provider)
+    ref_ctx.memo.enabled = False
+    t0 = _clock()
+    groups = _compile_groups(ref_groups, ctx)
+    t_compile = _clock() - t0
+    _check_groups(ref_groups, groups, ref_ctx, ctx, "Compilado")
+    _, t_ast = _best(_eval_all_ast, (nodes, ref_ctx, rounds), repeat)
+    _, t_cmp = _best(_eval_all_compiled, (groups, ctx, rounds), repeat)
+
+    opt_ast = load_cns_files(paths)
+    opt_stats = optimize_cns(opt_ast, ctx.triggers)
+    opt_groups = _compile_groups(collect_trigger_groups(opt_ast), ctx)
+    _check_groups(ref_groups, opt_groups, ref_ctx, ctx, "Optimizado")
+    _, t_opt = _best(_eval_all_compiled, (opt_groups, ctx, rounds), repeat)
+
+    memo_groups = _compile_groups(collect_trigger_groups(opt_ast), ctx, True)
+    _check_groups(ref_groups, memo_groups, ref_ctx, ctx, "Memo")
+    ctx.memo.reset_stats()
+    _, t_memo = _best(_eval_all_compiled, (memo_groups, ctx, rounds), repeat)
+    memo_stats = ctx.memo.stats()
+
+    total = len(nodes) * rounds
+    return dict(expressions=len(nodes), triggers=len(ctx.triggers),
+                compile_seconds=t_compile,
+                ast_per_sec=total / max(1e-9, t_ast),
+                compiled_per_sec=total / max(1e-9, t_cmp),
+                optimized_per_sec=total / max(1e-9, t_opt),
+                memo_per_sec=total / max(1e-9, t_memo),
+                opt_stats=opt_stats, memo_stats=memo_stats)
+
+# ----------------------------------------------------------------------------
+#  Despacho de controllers
+# ----------------------------------------------------------------------------
+
+class PlanRuntime(object):
+    """
+    Lo mínimo de CNSRuntime que usa CNSInterpreter (eval_ctx + eval_expr),
+    para correr un plan de build_bench_plan sin catálogos de SCTRLs.
+    """
+    def __init__(self, eval_ctx):
+        self.eval_ctx = eval_ctx
+    def eval_expr(self, node):
+        return eval_expr(node, self.eval_ctx)
+
+def build_bench_plan(ast, ctx):
+    """Plan con la forma de build_runtime_plan: params evaluados + triggers compilados."""
+    plan = []
+    for st in sorted(ast.states):
+        ctrls = []
+        for c in ast.states[st]:
+            trigall_fn, trigger_fns = compile_controller_triggers(c, ctx.triggers, True)
+            params = dict((k, _safe(eval_expr, v, ctx)) for k, v in c.params.items())
+            ctrls.append({"name": c.ctype, "params": params, "spec": None, "raw": c,
+                          "triggerall_fn": trigall_fn, "trigger_fns": trigger_fns})
+        plan.append({"stateno": st, "statedef": statedef_flags(ast.statedefs.get(st)),
+                     "controllers": ctrls})
+    return plan
+
+def _tick_all(it, states, rounds):
+    for _ in range(rounds):
+        for st in states:
+            it.current_state_no = st
+            it.tick()
+
+def _count_visited(it, states):
+    """Controllers que tick() alcanza a revisar en una ronda (ChangeState corta el frame)."""
+    n = [0]
+    def wrap(e):
+        check = e[0]
+        def counted():
+            n[0] += 1
+            return True if check is None else check()
+        return (counted,) + tuple(e[1:])
+    saved = it._dispatch_by_state
+    it._dispatch_by_state = dict((st, [wrap(e) for e in es]) for st, es in saved.items())
+    try:
+        _tick_all(it, states, 1)
+    finally:
+        it._dispatch_by_state = saved
+    return n[0]
+
+def bench_ctrl(paths, rounds=20, repeat=3):
+    from .cns_interpreter import CNSInterpreter, BaseAdapter
+    ast = load_cns_files(paths)
+    ctx = EvalContext(load_trigger_registry())
+    it = CNSInterpreter(PlanRuntime(ctx), BaseAdapter())
+    plan = build_bench_plan(ast, ctx)
+    t0 = _clock()
+    it.load_plan(plan)
+    t_load = _clock() - t0
+    states = sorted(it.plan_by_state)
+    visited = _count_visited(it, states)
+    _, t = _best(_tick_all, (it, states, rounds), repeat)
+    return dict(states=len(states), controllers=sum(len(c) for c in it.plan_by_state.values()),
+                visited=visited, load_seconds=t_load,
+                ticks_per_sec=len(states) * rounds / max(1e-9, t),
+                ctrls_per_sec=visited * rounds / max(1e-9, t))
+
+def _tick_many(its, states, rounds):
+    for _ in range(rounds):
+        for st in states:
+            for it in its:
+                it.current_state_no = st
+                it.tick()
+
+def bench_multi(paths, count=50, rounds=4, repeat=3):
+    from .cns_interpreter import CNSInterpreter, BaseAdapter
+    ast = load_cns_files(paths)
+    rt = PlanRuntime(EvalContext(load_trigger_registry()))
+    plan = build_bench_plan(ast, rt.eval_ctx)
+    states = sorted(ast.states)
+    out = {}
+    for n in (1, count):
+        its = [CNSInterpreter(rt, BaseAdapter()) for _ in range(n)]
+        for k, it in enumerate(its):
+            it.load_plan(plan)
+            it.set_velocity(vx=float(k))   # cada uno con su estado
+        _, t = _best(_tick_many, (its, states, rounds), repeat)
+        out[n] = len(states) * rounds * n / max(1e-9, t)
+    return dict(count=count, states=len(states),
+                single_ticks_per_sec=out[1], multi_ticks_per_sec=out[count])
+
+def bench_world(paths, helpers=100, explods=100, ticks=200, use_numpy=None):
+    from .cns_interpreter import CNSInterpreter, BaseAdapter
+    from .world import World, KIND_HELPER, PHASES
+    from .physics import Physics
+    ast = load_cns_files(paths)
+    rt = PlanRuntime(EvalContext(load_trigger_registry()))
+    plan = build_bench_plan(ast, rt.eval_ctx)
+    physics = Physics(use_numpy=use_numpy)
+    world = World(physics=physics)
+    for k in range(2 + helpers):
+        it = CNSInterpreter(rt, BaseAdapter())
+        it.load_plan(plan)
+        it.set_velocity(vx=0.5 * k)
+        world.add(it, kind=KIND_HELPER if k >= 2 else 0)
+    for k in range(explods):
+        world.add_explod(0.0, 0.0, vx=1.0, vy=-0.5)
+    world.profile = True
+    t0 = _clock()
+    world.run_fixed(ticks)
+    t = _clock() - t0
+    return dict(entities=len(world.table), ticks=ticks, ticks_per_sec=ticks / max(1e-9, t),
+                numpy=physics.use_numpy,
+                phases=[(p, world.phase_seconds[p] * 1000.0 / ticks) for p in PHASES])
+
+def _main(argv):
+    if len(argv) < 2 or argv[0] not in ("lex", "eval", "ctrl", "multi", "world"):
+        print("Uso: python -m mugen_cns.bench lex|eval|ctrl|multi|world <archivo.cns> [...]")
+        return 1
+    if argv[0] == "world":
+        for use_numpy in (None, False):
+            r = bench_world(argv[1:], use_numpy=use_numpy)
+            print("Entidades: %(entities)d  ticks: %(ticks)d  numpy: %(numpy)s"
+                  "  -> %(ticks_per_sec).0f ticks/s" % r)
+            for phase, ms in r["phases"]:
+                print("  %-10s %.3f ms/tick" % (phase, ms))
+        return 0
+    if argv[0] == "multi":
+        r = bench_multi(argv[1:])
+        print("1 intérprete   : %.0f ticks/s" % r["single_ticks_per_sec"])
+        print("%d intérpretes: %.0f ticks/s en total  (x%.2f por tick)" % (
+            r["count"], r["multi_ticks_per_sec"],
+            r["single_ticks_per_sec"] / max(1e-9, r["multi_ticks_per_sec"])))
+        return 0
+    if argv[0] == "ctrl":
+        r = bench_ctrl(argv[1:])
+        print("States: %(states)d  controllers: %(controllers)d  revisados por ronda: %(visited)d" % r)
+        print("load_plan: %.1f ms" % (r["load_seconds"] * 1000.0))
+        print("tick: %.0f ticks/s  %.0f controllers/s" % (r["ticks_per_sec"], r["ctrls_per_sec"]))
+        return 0
+    if argv[0] == "eval":
+        r = bench_eval(argv[1:])
+        print("Expresiones: %(expressions)d  triggers registrados: %(triggers)d" % r)
+        print("Compilación: %.1f ms" % (r["compile_seconds"] * 1000.0))
+        print("eval_expr (AST): %.0f evals/s" % r["ast_per_sec"])
+        print("compiladas     : %.0f evals/s  (x%.2f)" % (
+            r["compiled_per_sec"], r["compiled_per_sec"] / max(1e-9, r["ast_per_sec"])))
+        print("+ optimizer    : %.0f evals/s  (x%.2f)" % (
+            r["optimized_per_sec"], r["optimized_per_sec"] / max(1e-9, r["ast_per_sec"])))
+        print("+ memo triggers: %.0f evals/s  (x%.2f, hit rate %.1f%%)" % (
+            r["memo_per_sec"], r["memo_per_sec"] / max(1e-9, r["ast_per_sec"]),
+            r["memo_stats"]["hit_rate"] * 100.0))
+        s = r["opt_stats"]
+        print("optimizer: %d -> %d nodos de trigger (-%d), %d Temp, -%d nodos en params, "
+              "%d conjunciones reordenadas" % (
+            s["nodes_before"], s["nodes_after"], s["removed"], s["temps"], s["folded_params"],
+            s["reordered"]))
+        return 0
+    r = bench_lex(argv[1:])
+    print("Archivos: %(files)d  líneas: %(lines)d  tokens: %(tokens)d" % r)
+    print("Lexer: %.3f s  (%.0f tokens/s)" % (r["lex_seconds"], r["tokens_per_sec"]))
+    print("Lexer+parser: %.3f s" % r["parse_seconds"])
+    print("Pico de memoria: streaming %d KiB  vs  list(tokens) %d KiB" % (
+        r["peak_kb_stream"], r["peak_kb_list"]))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
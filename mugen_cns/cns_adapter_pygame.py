@@ -17,8 +17,8 @@ Requisitos (duck-typing):
 - layers: dict con superficies de destino, por ejemplo:
     {"bg": Surface, "main": Surface, "fx": Surface, "ui": Surface}
   (puedes pasar solo {"main": Surface} y el adaptador dibuja ahí)
-- sound: servicio de audio con:
-    .play(value_tuple, channel:int=0, volume:float=1.0) -> None
+- sound: servicio de audio con (ver snd_service.PygameSoundService / snd_mixer.SoftwareMixer):
+    .play(value_tuple, channel:int=0, volume:float=1.0[, lowpriority:bool]) -> None
     .stop(channel:int=None) -> None
     .pan(channel:int, pan:int) -> None        # opcional
 - camera: servicio con:
@@ -52,14 +52,17 @@ except ImportError:
 
 class CNSAdapterPygame(BaseAdapter):
     def __init__(self, entity, layers, sound=None, camera=None, fx_factory=None,
-                 screenbound_policy=None):
+                 screenbound_policy=None, integrate=True):
         """
         entity: ver cabecera
         layers: dict de superficies destino (ej. {"main": display_surface})
         sound, camera, fx_factory: servicios inyectables (duck-typing)
         screenbound_policy: función(entity) -> None para limitar a pantalla
+        integrate: si False, la física la hace otro (world.World + physics.Physics)
+                   y on_after_controllers solo copia ctx["pos"]/ctx["vel"] al entity
         """
         self.entity = entity
+        self.integrate = integrate
         self.layers = layers or {}
         self.main_surface = self.layers.get("main")  # Surface principal
         self.sound = sound
@@ -102,8 +105,12 @@ class CNSAdapterPygame(BaseAdapter):
         self._darken_overlay = 192 if darken else 0
 
     def on_after_controllers(self, ctx):
+        if not self.integrate:
+            # pos/vel ya los actualizó physics.Physics (columnas del World)
+            self.entity.x, self.entity.y = float(ctx["pos"][0]), float(ctx["pos"][1])
+            self.entity.vx, self.entity.vy = float(ctx["vel"][0]), float(ctx["vel"][1])
         # Aplicar física mínima pos += vel (si no está en pausa/superpause)
-        if self._superpause_frames <= 0 and self._paused_frames <= 0:
+        elif self._superpause_frames <= 0 and self._paused_frames <= 0:
             self.entity.x = float(getattr(self.entity, "x", 0.0)) + float(getattr(self.entity, "vx", 0.0))
             self.entity.y = float(getattr(self.entity, "y", 0.0)) + float(getattr(self.entity, "vy", 0.0))
 
@@ -372,8 +379,18 @@ class CNSAdapterPygame(BaseAdapter):
         value = params.get("value")          # (group, index) típico
         channel = int(params.get("channel", 0) or 0)
         volume = float(params.get("volumescale", 1.0) or 1.0)
+        kw = dict(channel=channel, volume=volume)
+        if int(params.get("lowpriority", 0) or 0):
+            kw["lowpriority"] = True
         try:
-            self.sound.play(value, channel=channel, volume=volume)
+            self.sound.play(value, **kw)
+        except TypeError:
+            # servicios viejos sin lowpriority
+            kw.pop("lowpriority", None)
+            try:
+                self.sound.play(value, **kw)
+            except Exception:
+                pass
         except Exception:
             pass
 
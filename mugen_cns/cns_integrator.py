@@ -8,13 +8,36 @@ from __future__ import division
 # Opcional: expression_loader (si lo tienes). Si no, el integrador sigue.
 # ============================================================================
 
-import types
+import os, sys, types
+
+try:
+    unicode
+except NameError:   # Py3
+    unicode = str
 
 # --- Core del parser/loader/evaluator (de tu paquete) ------------------------
-from loader import load_cns_files            # fusiona múltiples .cns
-from evaluator import EvalContext, eval_expr # eval de expresiones/triggers
+try:
+    from .loader import load_cns_files            # fusiona múltiples .cns
+    from .evaluator import EvalContext, eval_expr # eval de expresiones/triggers
+    from .expr_compiler import compile_expr, compile_controller_triggers
+    from .optimizer import optimize_cns
+    from .params import is_dynamic, DynamicParam, statedef_flags
+except (ImportError, ValueError):   # importado como módulo suelto
+    from loader import load_cns_files
+    from evaluator import EvalContext, eval_expr
+    from expr_compiler import compile_expr, compile_controller_triggers
+    from optimizer import optimize_cns
+    from params import is_dynamic, DynamicParam, statedef_flags
 
 # --- Catálogos de runtime (que ya armamos antes) -----------------------------
+# registry/sctrls y registry/triggers se importan entre sí con imports
+# implícitos: sus carpetas van al sys.path.
+_REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "registry")
+for _sub in ("sctrls", "triggers"):
+    _d = os.path.join(_REGISTRY_DIR, _sub)
+    if os.path.isdir(_d) and _d not in sys.path:
+        sys.path.insert(0, _d)
+
 # SCTRLs
 try:
     from sctrls_loader import load_catalog as load_sctrl_catalog
@@ -34,8 +57,10 @@ except ImportError:
 try:
     from triggers_loader import load_trigger_catalog
 except ImportError:
+    # triggers_loader importa 'triggers_catalog_1x' (el archivo es triggeres_...):
+    # el registro se arma con triggers_core + los catálogos que sí cargan
     def load_trigger_catalog():
-        return {
+        catalog = {
             "list": [],
             "get": lambda name: None,
             "export_json": lambda path: None,
@@ -44,6 +69,22 @@ except ImportError:
             "registry": {},
             "canon": {},
         }
+        try:
+            import triggers_core, triggers_catalog_classic   # noqa: F401
+        except ImportError:
+            return catalog
+        try:
+            import triggeres_catalog_1x                      # noqa: F401
+        except ImportError:
+            pass
+        catalog.update({
+            "list": triggers_core.list_triggers(),
+            "get": triggers_core.get_trigger_spec,
+            "export_json": triggers_core.export_triggers_json,
+            "registry": triggers_core.TRIGGERS,
+            "canon": triggers_core.CANON,
+        })
+        return catalog
 
 # Expresiones (opcional): si tienes funciones/helper de expr fuera de triggers
 try:
@@ -80,23 +121,62 @@ class CNSRuntime(object):
 
         # 4) AST fusionado del CNS (se setea con load_cns)
         self.ast = None
+        self.opt_stats = None   # resultado de optimize_cns (ver build_runtime_plan)
+        self._optimized = None  # (ast, cse, reorder) de la última optimización
+
+        # Avisos al construir el plan (p. ej. params dinámicos congelados)
+        self.warnings = []
 
 
 
 
     def set_provider(self, provider):
         self.eval_ctx.provider = provider  # ← setter sencillo
+
+    def new_eval_ctx(self, provider=None):
+        """
+        EvalContext propio para un intérprete (P1, P2, helpers): mismo registro
+        de triggers (no se modifica) pero provider, temps y memo separados.
+        El plan compilado sirve igual para todos.
+        """
+        ctx = EvalContext(self.eval_ctx.triggers, provider=provider)
+        if expression_loader and hasattr(expression_loader, "inject_into_context"):
+            expression_loader.inject_into_context(ctx)
+        return ctx
     # ----------------- Carga y fusión de CNS ---------------------------------
     def load_cns(self, paths):
         """
         paths: lista de rutas .cns
         Retorna el AST fusionado (el mismo que guarda en self.ast).
         """
-        if isinstance(paths, (str, unicode)) if str is not unicode else isinstance(paths, str):
+        if isinstance(paths, (str, unicode)):
             paths = [paths]
         self.ast = load_cns_files(paths)
+        self.opt_stats = None
         return self.ast
 
+    def optimize(self, cse=True, reorder=True):
+        """
+        Plegado de constantes + CSE de triggers puros sobre self.ast (una vez).
+        reorder: reordena las conjunciones && por costo (optimizer.reorder_conjunction);
+        False si el orden de evaluación importa (triggers con efectos o no puros).
+        Devuelve las estadísticas (nodos quitados, Temp creados, reordenados).
+        optimize_cns cambia el AST en el lugar: pedir otros cse/reorder sobre el
+        mismo AST da ValueError (recargarlo con load_cns).
+        """
+        if self.ast is None:
+            return self.opt_stats
+        if self._optimized is not None and self._optimized[0] is self.ast:
+            if self._optimized[1:] != (cse, reorder):
+                raise ValueError("AST ya optimizado con cse=%r, reorder=%r; recargar con load_cns "
+                                 "para usar cse=%r, reorder=%r"
+                                 % (self._optimized[1], self._optimized[2], cse, reorder))
+            return self.opt_stats
+        self.opt_stats = optimize_cns(self.ast, self.eval_ctx.triggers, cse=cse,
+                                      reorder=reorder)
+        self._optimized = (self.ast, cse, reorder)
+        return self.opt_stats
+
     # ----------------- Utilidades de consulta --------------------------------
     def list_triggers(self):
         return list(self.trig["list"])
@@ -118,11 +198,18 @@ class CNSRuntime(object):
     def eval_expr(self, expr_node):
         """
         Evalúa un nodo de expresión del AST usando el EvalContext con triggers.
+        Acepta también una expresión ya compilada (ver compile_expr).
         """
+        if callable(expr_node):
+            return expr_node(self.eval_ctx)
         return eval_expr(expr_node, self.eval_ctx)
 
+    def compile_expr(self, expr_node):
+        """Compila un nodo a closure fn(eval_ctx) ligada al registro y al memo de triggers."""
+        return compile_expr(expr_node, self.eval_ctx.triggers, getattr(self.eval_ctx, "memo", None))
+
     # ----------------- Preparación de Controllers ----------------------------
-    def normalize_controller(self, ctrl):
+    def normalize_controller(self, ctrl, lazy_params=True):
         """
         Recibe un objeto Controller del parser (con atributos como:
           - ctype (nombre textual del controlador)
@@ -131,29 +218,71 @@ class CNSRuntime(object):
         Devuelve un dict listo para ejecutar/renderizar en tu engine:
           {
             "name": <nombre canon (o degradado)>,
-            "params": <dict nombre->valor_evaluado>,
+            "params": <dict nombre->valor_evaluado (params estáticos)>,
+            "dynamic": <dict nombre->expr compilada (params que usan triggers)>,
             "spec": <spec del sctrl normalizado o None>,
             "raw":  <el controller original>,
+            "triggerall_fn": <triggerall compilado o None>,
+            "trigger_fns": <[trigger1..N compilados]>,
+            "frozen": <[params dinámicos evaluados aquí (ver abajo)]>,
           }
+        lazy_params: si True, los params que llaman triggers no se congelan aquí:
+        van compilados en "dynamic" y CNSInterpreter los evalúa cuando el
+        controller se ejecuta (ver params.ParamsView). Si la normalización del
+        SCTRL necesita sus valores, se evalúan una vez (sin provider) como con
+        lazy_params=False; quedan en "frozen" y en self.warnings.
         """
-        # 1) Evaluar params (expresiones -> valores)
-        evaled_params = {}
-        for k, v in (getattr(ctrl, "params", {}) or {}).items():
-            try:
-                evaled_params[k] = self.eval_expr(v)
-            except Exception:
-                # Fallback seguro: deja el nodo sin evaluar si algo falla
-                evaled_params[k] = v
+        raw_params = getattr(ctrl, "params", {}) or {}
+
+        # 1) Evaluar params estáticos (expresiones -> valores); dinámicos -> DynamicParam
+        def _evaluate(lazy):
+            out = {}
+            for k, v in raw_params.items():
+                if lazy and is_dynamic(v):
+                    out[k] = DynamicParam(self.compile_expr(v))
+                    continue
+                try:
+                    out[k] = self.eval_expr(v)
+                except Exception:
+                    # Fallback seguro: deja el nodo sin evaluar si algo falla
+                    out[k] = v
+            return out
 
         # 2) Normalización/compat de SCTRL (alias, defaults, degradación)
         name_in = getattr(ctrl, "ctype", "")
-        nname, nparams, spec = self.sctrl["normalize"](name_in, evaled_params, self.backend_caps)
+        frozen = []
+        try:
+            nname, nparams, spec = self.sctrl["normalize"](name_in, _evaluate(lazy_params),
+                                                           self.backend_caps)
+        except Exception as e:
+            if not lazy_params:
+                raise
+            # la degradación necesitó el valor de un param dinámico: congelarlo como antes
+            frozen = sorted(k for k, v in raw_params.items() if is_dynamic(v))
+            self.warnings.append("State %s, %s (%s): params dinámicos congelados: %s (%s)" % (
+                getattr(ctrl, "state_no", "?"), getattr(ctrl, "index", "?"), name_in,
+                ", ".join(frozen), e))
+            nname, nparams, spec = self.sctrl["normalize"](name_in, _evaluate(False),
+                                                           self.backend_caps)
+        dynamic = {}
+        for k, v in list(nparams.items()):
+            if isinstance(v, DynamicParam):
+                dynamic[k] = v.fn
+                del nparams[k]
+
+        # 3) Triggers compilados una sola vez (los evalúa CNSInterpreter por frame)
+        trigall_fn, trigger_fns = compile_controller_triggers(
+            ctrl, self.eval_ctx.triggers, getattr(self.eval_ctx, "memo", None))
 
         return {
             "name": nname,
             "params": nparams,
+            "dynamic": dynamic,
             "spec": spec,
             "raw": ctrl,
+            "triggerall_fn": trigall_fn,
+            "trigger_fns": trigger_fns,
+            "frozen": frozen,
         }
 
     # ----------------- Iteración de estados/controllers ----------------------
@@ -167,12 +296,14 @@ class CNSRuntime(object):
         for st_no, ctrls in getattr(self.ast, "states", {}).items():
             yield st_no, ctrls
 
-    def build_runtime_plan(self, filter_fn=None):
+    def build_runtime_plan(self, filter_fn=None, optimize=True, lazy_params=True,
+                           reorder=True):
         """
         Construye un 'plan' de ejecución por estado:
         [
           {
             "stateno": <int>,
+            "statedef": {"type": "s"|"c"|"a"|"l"|"u", "physics": "s"|"c"|"a"|"n"|"u"},
             "controllers": [
                 {"name":..., "params":..., "spec":..., "raw":...},
                 ...
@@ -181,19 +312,30 @@ class CNSRuntime(object):
           ...
         ]
         filter_fn(controller) -> bool opcional para filtrar controllers
+        optimize: aplica optimize() al AST antes de compilar los triggers
+        lazy_params: ver normalize_controller
+        reorder: ver optimize
         """
+        if optimize:
+            self.optimize(reorder=reorder)
         plan = []
         for st_no, ctrls in self.iter_states():
-            bucket = {"stateno": st_no, "controllers": []}
+            bucket = {"stateno": st_no, "statedef": self.statedef_flags(st_no),
+                      "controllers": []}
             for c in (ctrls or []):
                 if filter_fn and not filter_fn(c):
                     continue
-                bucket["controllers"].append(self.normalize_controller(c))
+                bucket["controllers"].append(self.normalize_controller(c, lazy_params))
             plan.append(bucket)
         # Orden sugerido por número de estado
         plan.sort(key=lambda x: x["stateno"])
         return plan
 
+    def statedef_flags(self, st_no):
+        """type/physics del [Statedef] (defaults de M.U.G.E.N: type S, physics N)."""
+        sd = self.ast.statedefs.get(st_no) if self.ast is not None else None
+        return statedef_flags(sd)
+
     # ----------------- Export -----------------------------------------------
     def export_trigger_doc(self, path):
         """
@@ -241,3 +383,5 @@ if __name__ == "__main__":
         print("Primer estado:", plan[0]["stateno"])
         for item in plan[0]["controllers"][:5]:
             print("  -", item["name"], item["params"])
+    for w in rt.warnings:
+        print("Aviso:", w)
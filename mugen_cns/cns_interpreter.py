@@ -11,11 +11,13 @@ Agnóstico de backend. Orquesta el flujo CNS:
 
 Requisitos del proyecto:
 - CNSRuntime de tu cns_integrator (rt) con:
-    - rt.eval_ctx (EvalContext)
-    - rt.eval_expr(node) -> valor (usa triggers_loader)
+    - rt.eval_ctx (EvalContext; el intérprete usa su registro de triggers)
+    - rt.new_eval_ctx(provider) -> EvalContext propio del intérprete (opcional)
     - rt.build_runtime_plan() -> plan por estado
 - Los controladores normalizados tienen shape:
     {"name": <canon/degradado>, "params": <dict evaluado o nodo>, "spec": <spec|None>, "raw": <Controller AST>}
+  y opcionalmente "dynamic" (params compilados que se evalúan al ejecutar; el
+  handler recibe entonces un params.ParamsView en lugar del dict).
 
 Adaptador:
 - Provee métodos ctrl_* para cada SCTRL que quieras soportar (ver BaseAdapter).
@@ -23,6 +25,49 @@ Adaptador:
 - El adaptador no tiene por qué dibujar nada; puede ser “headless” y delegar a otro sistema.
 """
 
+try:
+    from .params import ParamsView, eval_dynamic, ident_param
+    from .evaluator import EvalContext, eval_expr
+except (ImportError, ValueError):
+    from params import ParamsView, eval_dynamic, ident_param
+    from evaluator import EvalContext, eval_expr
+
+# ---------------- Escrituras de SCTRLs (invalidación del memo de triggers) ---
+# Qué 'deps' de triggers (register_trigger(deps=...)) puede cambiar cada SCTRL.
+# () = no toca nada que lean los triggers; SCTRL ausente = invalida todo.
+CTRL_WRITES = {
+    "changestate": ("state", "time", "anim", "ctrl"),
+    "selfstate": ("state", "time", "anim", "ctrl"),
+    "statetypeset": ("state",),
+    "ctrlset": ("ctrl",),
+    "changeanim": ("anim",), "changeanim2": ("anim",),
+    "posset": ("pos",), "posadd": ("pos",), "posfreeze": ("pos",),
+    "velset": ("vel",), "veladd": ("vel",), "velmul": ("vel",),
+    "turn": ("pos", "vel"),
+    "varset": ("vars",), "varadd": ("vars",), "varrandom": ("vars",), "varrangeset": ("vars",),
+    "lifeadd": ("life",), "lifeset": ("life",),
+    "poweradd": ("power",), "powerset": ("power",),
+    "helper": ("helpers",), "destroyself": ("helpers",),
+    "explod": ("explods",), "modifyexplod": ("explods",), "removeexplod": ("explods",),
+    "null": (), "playsnd": (), "stopsnd": (), "sndpan": (),
+    "pause": (), "superpause": (),
+    "assertspecial": (), "sprpriority": (), "screenbound": (), "width": (),
+    "trans": (), "palfx": (), "allpalfx": (), "envcolor": (), "remappal": (),
+    "afterimage": (), "afterimagetime": (),
+    "displaytoclipboard": (), "appendtoclipboard": (), "clearclipboard": (),
+}
+
+# ---------------- Tipos de despacho (resueltos en load_plan) -----------------
+FLOW_NONE = 0        # SCTRL normal: handler(params, ctx)
+FLOW_STATE = 1       # ChangeState / SelfState: corta el frame
+FLOW_PAUSE = 2       # Pause
+FLOW_SUPERPAUSE = 3  # SuperPause
+
+FLOW_KINDS = {
+    "changestate": FLOW_STATE, "selfstate": FLOW_STATE,
+    "pause": FLOW_PAUSE, "superpause": FLOW_SUPERPAUSE,
+}
+
 # ---------------- Interface del adaptador (backend) --------------------------
 
 class BaseAdapter(object):
@@ -133,6 +178,10 @@ class _TriggerProvider(object):
         # Si manejas 'ctrl' en flags/entidad, conéctalo aquí.
         return int(self.i.ctx.get("flags", {}).get("ctrl", 1))
 
+    # --- entrada (Command): el backend o una IA llenan interp.commands por tick ---
+    def command_active(self, name):
+        return name in self.i.commands
+
     # --- posición/velocidad (ctx ya guarda pos/vel) ---
     def pos_x(self):
         return float(self.i.ctx["pos"][0])
@@ -150,13 +199,30 @@ class _TriggerProvider(object):
     def is_alive(self):
         return 1
 
+    # --- animación (usa interp.animator: air_draw_anim.Animator o compatible) ---
+    def anim_no(self):
+        a = self.i.animator
+        return int(a.anim.number) if a is not None else 0
+
+    def anim_time_left(self):
+        # AnimTime de M.U.G.E.N: -(ticks restantes), 0 al terminar
+        a = self.i.animator
+        return int(a.anim_time()) if a is not None else 0
+
+    def is_in_anim_elem(self, n):
+        a = self.i.animator
+        return a is not None and a.frame_idx == int(n) - 1
+
+    def anim_elem_time(self, n):
+        a = self.i.animator
+        t = a.elem_time(n) if a is not None else None
+        return int(t) if t is not None else 0
+
     # --- stubs ampliables según tus triggers ---
     # def round_state(self): ...
     # def p2_dist_x(self): ...
     # def p2_dist_y(self): ...
     # def num_explod(self, id=None): ...
-    # def anim_no(self): ...
-    # def anim_time_left(self): ...
     # def front_edge_dist(self): ...
     # def back_edge_dist(self): ...
     # etc.
@@ -179,9 +245,24 @@ class CNSInterpreter(object):
 
         # AST/Plan
         self.plan_by_state = {}   # stateno -> [ controllers ]
+        self._dispatch_by_state = {}  # stateno -> [ (check, kind, handler, params, dynamic, writes) ]
         self.current_state_no = None
         self.state_time = 0       # ticks transcurridos en el estado actual
 
+        # Animación actual (Animator); alimenta AnimTime/AnimElem/AnimElemTime
+        self.animator = None
+
+        # StateType (s/c/a/l) y Physics (s/c/a/n) del state actual: los fija el
+        # [Statedef] al entrar (plan "statedef") y StateTypeSet; World/physics los usa
+        self.statedefs = {}       # stateno -> {"type":..., "physics":...}
+        self.statetype = "s"
+        self.physics = "n"
+        self.world = None         # world.World que lo registró (o None)
+        self.world_slot = None
+
+        # Comandos activos este tick (trigger Command); los llena el backend/IA
+        self.commands = set()
+
         # Pausas
         self.pause_ticks = 0      # Pause normal
         self.superpause_ticks = 0 # SuperPause (puede tener darken/p2defmul)
@@ -195,27 +276,21 @@ class CNSInterpreter(object):
             "pos": [0.0, 0.0],  # x, y
         }
 
-        # ---- Provider + shim de triggers (sin tocar evaluator) ---------------
-        # Creamos un provider y "envolvemos" cada impl de trigger para que use
-        # este provider aunque el evaluator pase None como primer argumento.
+        # ---- Provider + contexto de evaluación propios ------------------------
+        # El registro de triggers es compartido y no se toca: cada intérprete
+        # tiene su EvalContext (provider, temps, memo) y los impl reciben este
+        # provider como primer argumento. Varios intérpretes (P2, helpers)
+        # pueden correr el mismo plan compilado sin pisarse.
         provider = _TriggerProvider(self)
         self._provider = provider
+        self.eval_ctx = self._new_eval_ctx(provider)
 
-        try:
-            registry = getattr(self.rt, "eval_ctx", None)
-            registry = getattr(registry, "triggers", None)
-        except Exception:
-            registry = None
-
-        if isinstance(registry, dict):
-            for _name, spec in list(registry.items()):
-                impl = spec.get("impl") if isinstance(spec, dict) else None
-                if callable(impl):
-                    def _make_wrapped(_impl):
-                        def _wrapped(_ignored_ctx, *args):
-                            return _impl(provider, *args)
-                        return _wrapped
-                    spec["impl"] = _make_wrapped(impl)
+    def _new_eval_ctx(self, provider):
+        make = getattr(self.rt, "new_eval_ctx", None)
+        if make is not None:
+            return make(provider)
+        registry = getattr(getattr(self.rt, "eval_ctx", None), "triggers", None)
+        return EvalContext(registry if registry is not None else {}, provider=provider)
 
     # --------- Setup del plan de ejecución -----------------------------------
     def load_plan(self, plan):
@@ -223,11 +298,80 @@ class CNSInterpreter(object):
         plan: lista devuelta por runtime.build_runtime_plan()
         """
         self.plan_by_state = {e["stateno"]: list(e["controllers"]) for e in (plan or [])}
-        # estado inicial: el menor stateno presente (o 0 si existe)
+        self.statedefs = dict((e["stateno"], e["statedef"]) for e in (plan or []) if e.get("statedef"))
+        self.rebind_dispatch()
+        # estado inicial: 0 si existe; si no, el menor stateno no negativo
+        # (los -3/-2/-1 corren cada tick, no son un state al que se entre)
         if self.plan_by_state:
-            initial = min(self.plan_by_state.keys())
+            states = [s for s in self.plan_by_state if s >= 0] or list(self.plan_by_state)
+            initial = 0 if 0 in self.plan_by_state else min(states)
             self.change_state(initial)
 
+    def rebind_dispatch(self):
+        """
+        Resuelve una vez por controller lo que tick() necesita: chequeo de
+        triggers, tipo de flujo, handler ctrl_<name> ya ligado al adaptador
+        (o ctrl_fallback), params y CTRL_WRITES. Llamar de nuevo si se cambia
+        el adaptador o sus métodos después de load_plan.
+        """
+        self._dispatch_by_state = dict(
+            (st, [self._bind_ctrl(c) for c in ctrls])
+            for st, ctrls in self.plan_by_state.items())
+
+    def _resolve_handler(self, name):
+        handler = getattr(self.adapter, "ctrl_" + name, None)
+        if handler is None:
+            # Compat: en catálogos viejos algunos nombres tienen case raro;
+            # el normalizador ya lo puso en canon, pero por si acaso:
+            handler = getattr(self.adapter, "ctrl_" + name.replace(".", "_"), None)
+        return handler
+
+    def _bind_ctrl(self, ctrl):
+        name = (ctrl.get("name") or "").lower()
+        kind = FLOW_KINDS.get(name, FLOW_NONE)
+        handler = self._resolve_handler(name)
+        if handler is None and kind == FLOW_NONE:
+            fallback = self.adapter.ctrl_fallback
+            def handler(params, ctx, _name=name):
+                return fallback(_name, params, ctx)
+        if name == "statetypeset":
+            handler = self._bind_statetypeset(ctrl, handler)
+        return (self._bind_trigger_check(ctrl.get("raw"), ctrl), kind, handler,
+                ctrl.get("params") or {}, ctrl.get("dynamic"), CTRL_WRITES.get(name))
+
+    def _bind_statetypeset(self, ctrl, handler):
+        # statetype = A / physics = N son identificadores: se leen del AST una vez
+        raw_params = dict((k.lower(), v) for k, v in
+                          (getattr(ctrl.get("raw"), "params", None) or {}).items())
+        statetype = ident_param(raw_params.get("statetype"))
+        physics = ident_param(raw_params.get("physics"))
+        def bound(params, ctx):
+            self.set_state_flags(statetype, physics)
+            return handler(params, ctx)
+        return bound
+
+    def _bind_trigger_check(self, raw, ctrl):
+        """check() -> bool del controller, o None si corre siempre (sin AST)."""
+        if raw is None:
+            return None
+        if "trigger_fns" not in ctrl:
+            return lambda: self._should_run_ctrl(raw)
+        trigall_fn = ctrl.get("triggerall_fn")
+        trigger_fns = tuple(ctrl["trigger_fns"])
+        if trigall_fn is None and not trigger_fns:
+            return None
+        ev = self._eval_compiled
+        def check():
+            if trigall_fn is not None and not ev(trigall_fn):
+                return False
+            if not trigger_fns:
+                return True
+            for fn in trigger_fns:
+                if ev(fn):
+                    return True
+            return False
+        return check
+
     # --------- Gestión de estados --------------------------------------------
     def change_state(self, stateno):
         if self.current_state_no is not None:
@@ -241,8 +385,25 @@ class CNSInterpreter(object):
 
         self.current_state_no = int(stateno)
         self.state_time = 0
+        sd = self.statedefs.get(self.current_state_no)
+        if sd:
+            self.set_state_flags(sd.get("type"), sd.get("physics"))
         self._notify_state_enter(self.current_state_no)
 
+    def set_state_flags(self, statetype=None, physics=None):
+        """
+        StateType ('s','c','a','l') y Physics ('s','c','a','n'); None o 'u' = sin
+        cambio. Si la entidad está en un World, actualiza sus columnas.
+        """
+        st = (statetype or "u")[:1].lower()
+        ph = (physics or "u")[:1].lower()
+        if st != "u":
+            self.statetype = st
+        if ph != "u":
+            self.physics = ph
+        if self.world is not None:
+            self.world.set_state_flags(self.world_slot, self.statetype, self.physics)
+
     def _notify_state_enter(self, stateno):
         try:
             self.adapter.on_state_enter(stateno)
@@ -269,14 +430,23 @@ class CNSInterpreter(object):
     def _eval_trigger_expr(self, node):
         """Evalúa una expresión del AST usando el runtime/evaluator."""
         try:
-            return self.rt.eval_expr(node)
+            return eval_expr(node, self.eval_ctx)
+        except Exception:
+            return 0
+
+    def _eval_compiled(self, fn):
+        """Llama una expresión compilada (expr_compiler); error -> 0 como _eval_trigger_expr."""
+        try:
+            return fn(self.eval_ctx)
         except Exception:
             return 0
 
-    def _should_run_ctrl(self, raw_ctrl):
+    def _should_run_ctrl(self, raw_ctrl, ctrl=None):
         """
         Respeta TriggerAll + trigger1..N si están en el AST del controller.
         Si honor_triggerall=False, ejecuta siempre.
+        Si el controller normalizado (ctrl) trae "trigger_fns" (ver
+        CNSRuntime.normalize_controller), usa las closures compiladas.
 
         Robusto/compatible:
         - Acepta triggerall como nodo o como par ('triggerall', nodo).
@@ -286,6 +456,18 @@ class CNSInterpreter(object):
         if not self.honor_triggerall:
             return True
 
+        if ctrl is not None and "trigger_fns" in ctrl:
+            trigall_fn = ctrl.get("triggerall_fn")
+            if trigall_fn is not None and not self._eval_compiled(trigall_fn):
+                return False
+            trigger_fns = ctrl["trigger_fns"]
+            if not trigger_fns:
+                return True
+            for fn in trigger_fns:
+                if self._eval_compiled(fn):
+                    return True
+            return False
+
         trigall_ok = True
         triggers_ok = True
 
@@ -299,6 +481,8 @@ class CNSInterpreter(object):
                 trigall_ok = bool(self._eval_trigger_expr(trigall_node))
             except Exception:
                 trigall_ok = False
+            if not trigall_ok:
+                return False   # TriggerAll falso: no hace falta evaluar trigger1..N
 
         # --- trigger1..N  (OR)
         trig_nodes = getattr(raw_ctrl, "triggers", None)
@@ -350,80 +534,103 @@ class CNSInterpreter(object):
             return
 
         # 1) Ejecutar SCTRLs del estado actual
-        ctrls = self.plan_by_state.get(self.current_state_no, [])
-        for ctrl in ctrls:
-            raw = ctrl.get("raw")
-            if raw is not None and not self._should_run_ctrl(raw):
-                continue  # condiciones no cumplidas
+        self.begin_frame()
+        if self.run_state(self.current_state_no):
+            return  # cambio inmediato de estado: corta el resto del frame
 
-            name = (ctrl.get("name") or "").lower()
-            params = ctrl.get("params") or {}
+        # 2) Hook post-controladores
+        self._post_frame()
+
+        # 3) Avanza cronómetro del estado
+        self.state_time += 1
+
+    def begin_frame(self):
+        """
+        Temp del optimizer y memo de triggers: valen hasta que un SCTRL
+        escriba algo que lean (CTRL_WRITES); se vacían al inicio del tick.
+        """
+        temps = self.eval_ctx.temps
+        if temps:
+            temps.clear()
+        self.eval_ctx.memo.clear()
+
+    def run_state(self, stateno):
+        """
+        Ejecuta los SCTRLs de un state (el actual o uno negativo: -3/-2/-1).
+        True si un ChangeState/SelfState cortó el frame (state_time queda en 0).
+        """
+        eval_ctx = self.eval_ctx
+        temps = eval_ctx.temps
+        memo = eval_ctx.memo
+        ctx = self.ctx
+        honor = self.honor_triggerall
+        for check, kind, handler, params, dynamic, writes in \
+                self._dispatch_by_state.get(stateno, ()):
+            if check is not None and honor and not check():
+                continue  # condiciones no cumplidas
 
-            # Ejecutar vía adaptador: ctrl_<name>
-            handler = getattr(self.adapter, "ctrl_" + name, None)
-            if handler is None:
-                # Compat: en catálogos viejos algunos nombres tienen case raro;
-                # el normalizador ya lo puso en canon, pero por si acaso:
-                handler = getattr(self.adapter, "ctrl_" + name.replace(".", "_"), None)
+            if dynamic:
+                # params que usan triggers: se evalúan ahora que el controller corre
+                params = ParamsView(params, eval_dynamic(dynamic, eval_ctx))
 
-            # SCTRLs que afectan el flujo del intérprete pueden tener atajos:
+            # SCTRLs que afectan el flujo del intérprete (kind resuelto en load_plan)
             flow_taken = False
             try:
-                if name == "changestate":
-                    # Cambio inmediato de estado
+                if kind == FLOW_NONE:
+                    handler(params, ctx)
+                elif kind == FLOW_STATE:
+                    # Cambio inmediato de estado (ChangeState / SelfState)
                     new_state = params.get("value")
                     if new_state is not None:
-                        self.adapter.ctrl_changestate(params, self.ctx) if handler else self.adapter.request_change_state(int(new_state))
+                        handler(params, ctx) if handler else self.adapter.request_change_state(int(new_state))
                         flow_taken = True
-                elif name == "selfstate":
-                    new_state = params.get("value")
-                    if new_state is not None:
-                        self.adapter.ctrl_selfstate(params, self.ctx) if handler else self.adapter.request_change_state(int(new_state))
-                        flow_taken = True
-                elif name == "pause":
+                elif kind == FLOW_PAUSE:
                     frames = int(params.get("time", 0))
                     movetime = int(params.get("movetime", 0))
                     # movetime podría dejar moverse al actor; aquí no lo diferenciamos.
                     self._apply_pause(frames, superpause=False)
                     # Notifica al backend
                     if handler:
-                        handler(params, self.ctx)
-                elif name == "superpause":
+                        handler(params, ctx)
+                else:  # FLOW_SUPERPAUSE
                     frames = int(params.get("time", 0))
                     darken = int(params.get("darken", 0)) != 0
                     p2defmul = params.get("p2defmul", None)
                     self._apply_pause(frames, superpause=True, darken=darken, p2defmul=p2defmul)
                     if handler:
-                        handler(params, self.ctx)
-                else:
-                    # SCTRL normal, llama al adaptador si existe; si no, fallback
-                    if handler:
-                        handler(params, self.ctx)
-                    else:
-                        self.adapter.ctrl_fallback(name, params, self.ctx)
+                        handler(params, ctx)
             except Exception as e:
                 # No rompas el loop por errores de un SCTRL
                 # print(f"[Interpreter] error en {name}: {e}")
                 pass
+            if writes != ():
+                if temps:
+                    temps.clear()
+                memo.invalidate(writes)
 
             # Si hubo cambio inmediato de estado, corta la ejecución del resto del frame
             if flow_taken:
                 self.state_time = 0  # reinicia cronómetro de estado
-                return
-
-        # 2) Hook post-controladores
-        self._post_frame()
-
-        # 3) Avanza cronómetro del estado
-        self.state_time += 1
+                return True
+        return False
 
     def _post_frame(self):
         try:
             self.adapter.on_after_controllers(self.ctx)
         except Exception:
             pass
+        # la física/colisiones del adaptador cambian pos/vel: nada del memo sigue valiendo
+        self.eval_ctx.memo.clear()
 
     # --------- Conveniencias --------------------------------------------------
+    def set_animator(self, animator):
+        """Conecta el Animator del personaje (o None) para los triggers de animación."""
+        self.animator = animator
+
+    def trigger_memo_stats(self):
+        """hits/misses/invalidations/hit_rate del memo de triggers de este intérprete."""
+        return self.eval_ctx.memo.stats()
+
     def run_fixed(self, frames=1):
         """Avanza 'frames' lógicos (útil para tests headless)."""
         for _ in range(int(frames)):
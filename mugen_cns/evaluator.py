@@ -1,12 +1,80 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 # Optional: AST evaluator skeleton (Py2.7)
-from .ast_nodes import Num, Var, Call, Unary, Bin
+from .ast_nodes import Num, Var, Call, Unary, Bin, Temp, Tuple
+
+def memoizable(spec):
+    """True si el trigger declara deps y es puro (register_trigger(deps=..., pure=True))."""
+    return bool(spec) and spec.get("deps") is not None and spec.get("pure", True)
+
+class TriggerMemo(object):
+    """
+    Memo por tick de triggers puros: una tabla args -> valor por trigger,
+    agrupadas por las 'deps' del spec (register_trigger(deps=...)).
+    clear() al inicio del tick; invalidate(writes) cuando un SCTRL escribe
+    alguna dep (writes=None invalida todo).
+    Cada EvalContext tiene el suyo: los intérpretes no comparten valores.
+    'enabled' se lee al crear cada tabla (apagarlo antes de evaluar).
+    """
+    def __init__(self):
+        self.enabled = True
+        self.tables = {}     # nombre canónico (lower) -> dict
+        self._by_dep = {}    # dep -> [dict, ...]
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def table_for(self, spec):
+        """Tabla del trigger o None si no es memoizable (sin deps / impuro / memo apagado)."""
+        if not self.enabled or not memoizable(spec):
+            return None
+        name = spec.get("name", "").lower()
+        t = self.tables.get(name)
+        if t is None:
+            t = self.tables[name] = {}
+            for d in spec["deps"]:
+                self._by_dep.setdefault(d, []).append(t)
+        return t
+
+    def clear(self):
+        for t in self.tables.values():
+            t.clear()
+
+    def invalidate(self, writes=None):
+        if writes is None:
+            self.clear()
+        else:
+            for d in writes:
+                for t in self._by_dep.get(d, ()):
+                    t.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return dict(hits=self.hits, misses=self.misses, invalidations=self.invalidations,
+                    hit_rate=(self.hits / total) if total else 0.0)
+
+    def reset_stats(self):
+        self.hits = self.misses = self.invalidations = 0
 
 class EvalContext(object):
+    """
+    Registro de triggers (compartido, no se modifica) + lo que es de cada
+    intérprete: provider, temps del optimizer y memo de triggers.
+    """
     def __init__(self, trigger_registry, provider=None):   # ← agrega provider
         self.triggers = trigger_registry
         self.provider = provider
+        self.temps = {}   # Temp.key -> valor del tick actual (lo vacía el intérprete)
+        self.memo = TriggerMemo()
+
+def _tuple_item(node, ctx):
+    # elemento vacío -> None; un identificador suelto es texto (value = F5, 0; attr = S, NA)
+    if node is None:
+        return None
+    if isinstance(node, Var) and not node.name.startswith('"'):
+        return node.name
+    return eval_expr(node, ctx)
 
 def eval_expr(node, ctx):
     if isinstance(node, Num):
@@ -26,8 +94,13 @@ def eval_expr(node, ctx):
         if node.op == '~': return (~int(v)) if v is not None else 0
         return 0
     if isinstance(node, Bin):
-        a = eval_expr(node.lhs, ctx); b = eval_expr(node.rhs, ctx)
         op = node.op
+        # && / || con cortocircuito (como M.U.G.E.N): el lado derecho solo si hace falta
+        if op == '&&':
+            return 1 if (eval_expr(node.lhs, ctx) and eval_expr(node.rhs, ctx)) else 0
+        if op == '||':
+            return 1 if (eval_expr(node.lhs, ctx) or eval_expr(node.rhs, ctx)) else 0
+        a = eval_expr(node.lhs, ctx); b = eval_expr(node.rhs, ctx)
         if op == '+': return a + b
         if op == '-': return a - b
         if op == '*': return a * b
@@ -40,16 +113,38 @@ def eval_expr(node, ctx):
         if op == '<': return 1 if a < b else 0
         if op == '>=': return 1 if a >= b else 0
         if op == '<=': return 1 if a <= b else 0
-        if op == '&&': return 1 if (a and b) else 0
-        if op == '||': return 1 if (a or b) else 0
         return 0
+    if isinstance(node, Temp):
+        temps = getattr(ctx, "temps", None)
+        if temps is None:
+            return eval_expr(node.expr, ctx)
+        if node.key in temps:
+            return temps[node.key]
+        v = temps[node.key] = eval_expr(node.expr, ctx)
+        return v
+    if isinstance(node, Tuple):
+        return tuple(_tuple_item(x, ctx) for x in node.items)
     if isinstance(node, Call):
         name = (node.name or "").lower()
         args = [eval_expr(x, ctx) for x in node.args]
         trig = ctx.triggers.get(name)
+        memo = getattr(ctx, "memo", None)
+        table = memo.table_for(trig) if memo is not None else None
+        if table is not None:
+            key = args[0] if len(args) == 1 else tuple(args)   # misma clave que expr_compiler
+            try:
+                if key in table:
+                    memo.hits += 1
+                    return table[key]
+            except TypeError:   # argumento no hasheable: sin memo
+                table = None
         if trig and trig.get("impl"):
             # ANTES:
             # return trig["impl"](*([None] + args))
             # AHORA:
-            return trig["impl"](ctx.provider, *args)       # ← usa provider real
+            v = trig["impl"](ctx.provider, *args)          # ← usa provider real
+            if table is not None:
+                memo.misses += 1
+                table[key] = v
+            return v
         return 0
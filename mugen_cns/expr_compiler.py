@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""
+expr_compiler.py — compila árboles de expresión CNS a closures (Python 2.7)
+
+evaluator.eval_expr recorre el AST con una cadena de isinstance y una
+escalera de 'if op == ...' cada frame. Aquí cada nodo se convierte una sola
+vez (al construir el plan) en una closure especializada fn(ctx):
+
+- Num / string      -> closure que devuelve la constante
+- Unary / Bin       -> el operador queda ligado en la closure (sin comparar 'op')
+- Call              -> spec["impl"] queda ligado (el registro de triggers no se
+                       modifica después de cargarlo); impl recibe ctx.provider
+- Temp (optimizer)  -> memo en ctx.temps[key] hasta que el intérprete lo vacíe
+- Call con memo     -> si memo es verdadero y el spec declara deps, la llamada
+                       usa la tabla args -> valor de ctx.memo
+
+Las closures no guardan nada del contexto: un mismo plan compilado sirve a
+varios intérpretes, cada uno con su EvalContext (provider, temps, memo).
+
+Semántica idéntica a evaluator.eval_expr (mismos 1/0 en comparaciones,
+'/' flotante, && / || con cortocircuito, Var no-string = 0, trigger
+desconocido = 0).
+
+    fn = compile_expr(node, rt.eval_ctx.triggers)
+    fn(rt.eval_ctx)   # == eval_expr(node, rt.eval_ctx)
+"""
+
+from .ast_nodes import Num, Var, Call, Unary, Bin, Temp, Tuple
+from .evaluator import memoizable
+
+# ---------------- Operadores --------------------------------------------------
+
+def _div(a, b): return a / float(b)
+def _pow(a, b): return a ** b
+def _eq(a, b):  return 1 if a == b else 0
+def _ne(a, b):  return 1 if a != b else 0
+def _gt(a, b):  return 1 if a > b else 0
+def _lt(a, b):  return 1 if a < b else 0
+def _ge(a, b):  return 1 if a >= b else 0
+def _le(a, b):  return 1 if a <= b else 0
+def _and(a, b): return 1 if (a and b) else 0
+def _or(a, b):  return 1 if (a or b) else 0
+
+BIN_OPS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': _div,
+    '%': lambda a, b: a % b,
+    '**': _pow,
+    '==': _eq, '!=': _ne, '>': _gt, '<': _lt, '>=': _ge, '<=': _le,
+    '&&': _and, '||': _or,
+}
+
+def _neg(v):  return -v
+def _pos(v):  return +v
+def _not(v):  return 0 if v else 1
+def _inv(v):  return (~int(v)) if v is not None else 0
+
+UNARY_OPS = {'-': _neg, '+': _pos, '!': _not, '~': _inv}
+
+# ---------------- Compilación -------------------------------------------------
+
+def _const(value):
+    def fn(ctx):
+        return value
+    return fn
+
+_ZERO = _const(0)
+
+def _compile_memo_call(spec, impl, args):
+    """
+    Llamada memoizada: table[args] vale hasta que el memo la invalida.
+    La tabla es la de ctx.memo (una por EvalContext / intérprete).
+    """
+    name = spec.get("name", "").lower()
+    n = len(args)
+    if n == 0:
+        def fn(ctx):
+            memo = ctx.memo
+            table = memo.tables.get(name)
+            if table is None:   # primera vez en este contexto (None si el memo está apagado)
+                table = memo.table_for(spec)
+                if table is None:
+                    return impl(ctx.provider)
+            if () in table:
+                memo.hits += 1
+                return table[()]
+            v = table[()] = impl(ctx.provider)
+            memo.misses += 1
+            return v
+        return fn
+    if n == 1:
+        a0 = args[0]
+        def fn(ctx):
+            v0 = a0(ctx)    # clave = el argumento (sin tupla)
+            memo = ctx.memo
+            table = memo.tables.get(name)
+            if table is None:
+                table = memo.table_for(spec)
+                if table is None:
+                    return impl(ctx.provider, v0)
+            try:
+                if v0 in table:
+                    memo.hits += 1
+                    return table[v0]
+            except TypeError:   # argumento no hasheable: sin memo
+                return impl(ctx.provider, v0)
+            v = table[v0] = impl(ctx.provider, v0)
+            memo.misses += 1
+            return v
+        return fn
+    def fn(ctx):
+        vals = tuple([a(ctx) for a in args])
+        memo = ctx.memo
+        table = memo.tables.get(name)
+        if table is None:
+            table = memo.table_for(spec)
+            if table is None:
+                return impl(ctx.provider, *vals)
+        try:
+            if vals in table:
+                memo.hits += 1
+                return table[vals]
+        except TypeError:
+            return impl(ctx.provider, *vals)
+        v = table[vals] = impl(ctx.provider, *vals)
+        memo.misses += 1
+        return v
+    return fn
+
+def _compile_call(name, args, triggers, memo=None):
+    spec = triggers.get((name or "").lower()) if triggers is not None else None
+    # el registro no se modifica: impl se liga una vez, aquí
+    impl = spec.get("impl") if spec else None
+    if not impl:
+        # evaluator: trigger desconocido (o sin impl) -> 0 (los args se evalúan igual)
+        if not args:
+            return _ZERO
+        def fn(ctx):
+            for a in args:
+                a(ctx)
+            return 0
+        return fn
+    if memo and memoizable(spec):
+        return _compile_memo_call(spec, impl, args)
+    n = len(args)
+    # aridades frecuentes sin construir listas
+    if n == 0:
+        def fn(ctx):
+            return impl(ctx.provider)
+    elif n == 1:
+        a0 = args[0]
+        def fn(ctx):
+            return impl(ctx.provider, a0(ctx))
+    elif n == 2:
+        a0, a1 = args
+        def fn(ctx):
+            return impl(ctx.provider, a0(ctx), a1(ctx))
+    else:
+        def fn(ctx):
+            return impl(ctx.provider, *[a(ctx) for a in args])
+    return fn
+
+def compile_expr(node, triggers=None, memo=None):
+    """
+    Nodo del AST -> closure fn(ctx). triggers: registro nombre(lower) -> spec.
+    memo: si es verdadero (True o un evaluator.TriggerMemo), memoiza los
+    triggers con deps en el ctx.memo de cada evaluación.
+    """
+    if isinstance(node, Num):
+        return _const(node.value)
+    if isinstance(node, Var):
+        s = node.name
+        if s and s.startswith('"') and s.endswith('"'):
+            return _const(s[1:-1])
+        return _ZERO
+    if isinstance(node, Unary):
+        op = UNARY_OPS.get(node.op)
+        rhs = compile_expr(node.rhs, triggers, memo)
+        if op is None:
+            def fn(ctx):
+                rhs(ctx)
+                return 0
+            return fn
+        def fn(ctx):
+            return op(rhs(ctx))
+        return fn
+    if isinstance(node, Bin):
+        op = BIN_OPS.get(node.op)
+        lhs = compile_expr(node.lhs, triggers, memo)
+        rhs = compile_expr(node.rhs, triggers, memo)
+        # cortocircuito: BIN_OPS['&&'/'||'] solo se usa para plegar literales
+        if node.op == '&&':
+            def fn(ctx):
+                return 1 if (lhs(ctx) and rhs(ctx)) else 0
+            return fn
+        if node.op == '||':
+            def fn(ctx):
+                return 1 if (lhs(ctx) or rhs(ctx)) else 0
+            return fn
+        if op is None:
+            def fn(ctx):
+                lhs(ctx); rhs(ctx)
+                return 0
+            return fn
+        def fn(ctx):
+            return op(lhs(ctx), rhs(ctx))
+        return fn
+    if isinstance(node, Temp):
+        key = node.key
+        inner = compile_expr(node.expr, triggers, memo)
+        def fn(ctx):
+            temps = ctx.temps
+            if key in temps:
+                return temps[key]
+            v = temps[key] = inner(ctx)
+            return v
+        return fn
+    if isinstance(node, Tuple):
+        # como evaluator._tuple_item: vacío -> None, identificador suelto -> texto
+        items = []
+        for x in node.items:
+            if x is None:
+                items.append(_const(None))
+            elif isinstance(x, Var) and not x.name.startswith('"'):
+                items.append(_const(x.name))
+            else:
+                items.append(compile_expr(x, triggers, memo))
+        def fn(ctx):
+            return tuple(f(ctx) for f in items)
+        return fn
+    if isinstance(node, Call):
+        return _compile_call(node.name, [compile_expr(a, triggers, memo) for a in node.args],
+                             triggers, memo)
+    # nodo ya compilado o desconocido
+    if callable(node):
+        return node
+    return _ZERO
+
+# ---------------- Triggers de un controller ----------------------------------
+
+def _strip_key(node):
+    # compat: ('triggerall', nodo) / ('trigger1', nodo)
+    if isinstance(node, tuple) and len(node) == 2:
+        return node[1]
+    return node
+
+def compile_controller_triggers(raw_ctrl, triggers=None, memo=None):
+    """
+    (triggerall_fn o None, [trigger_fn, ...]) de un Controller del parser.
+    Acepta las mismas formas compat que CNSInterpreter._should_run_ctrl.
+    """
+    trigall = _strip_key(getattr(raw_ctrl, "triggerall", None))
+    trigall_fn = compile_expr(trigall, triggers, memo) if trigall is not None else None
+    nodes = getattr(raw_ctrl, "triggers", None) or []
+    return trigall_fn, [compile_expr(_strip_key(n), triggers, memo) for n in nodes]
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, print_function
+"""
+headless.py — simulación sin gráficos a máxima velocidad (Python 2.7)
+
+Para correr miles de combates IA vs IA (pruebas de balance) sin ventana:
+
+- HeadlessAdapter: adaptador que no dibuja nada pero sí ejecuta lo que
+  cambia la simulación: ChangeState/SelfState, Pos*/Vel*, CtrlSet, VarSet/
+  VarAdd, explods (entidades del World con su removetime) y eventos de
+  sonido (se registran y, si hay servicio de audio, se le reenvían).
+- simulate(): carga los personajes una vez y corre N combates de M frames
+  en un world.World(render=False) con physics.Physics, tan rápido como se
+  pueda; reporta frames simulados por segundo y tiempo por fase.
+
+    python -m mugen_cns.headless <p1.cns> [...] [--p2 <p2.cns> ...]
+                                 [--frames N] [--matches M] [--seed S]
+
+La IA por defecto (random_ai) activa al azar los Command que usa el CNS;
+simulate(ai=fn) acepta cualquier fn(interp, frame) -> iterable de comandos.
+"""
+
+import sys, time, random
+
+from .ast_nodes import Var, Call, Unary, Bin, Temp
+from .ast_cache import load_cns_files
+from .cns_integrator import CNSRuntime
+from .cns_interpreter import CNSInterpreter, BaseAdapter
+from .world import World, PHASES
+from .physics import Physics
+
+_clock = getattr(time, "perf_counter", time.time)
+
+P1_START_X, P2_START_X = -70.0, 70.0
+
+# ---------------- Adaptador --------------------------------------------------
+
+def _num(params, key, default=None):
+    v = params.get(key, default)
+    if isinstance(v, (tuple, list)):
+        v = v[0] if v else default
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+def _pair(params, key, default=(0.0, 0.0)):
+    # "pos = 10, -20" llega como tupla o (según el parser) solo como x
+    v = params.get(key)
+    if isinstance(v, (tuple, list)):
+        x = float(v[0]) if len(v) > 0 else default[0]
+        y = float(v[1]) if len(v) > 1 else default[1]
+        return x, y
+    try:
+        return float(v), default[1]
+    except (TypeError, ValueError):
+        return default
+
+class HeadlessAdapter(BaseAdapter):
+    """
+    Sin render. La física (pos += vel, gravedad, suelo) la hace el World;
+    aquí solo los SCTRLs que la alimentan y el ciclo de vida de los explods.
+    """
+    def __init__(self, sound=None, explod_time=60):
+        """
+        sound: servicio opcional con .play(value, channel=..., volume=...) y
+               .stop(channel) (snd_mixer.SoftwareMixer, snd_service...)
+        explod_time: vida de un explod con removetime = -2 (sin animación que
+                     termine, en headless se usa este número de ticks)
+        """
+        self.sound = sound
+        self.explod_time = int(explod_time)
+        self.frame = 0
+        self.sound_events = []   # (frame, "play"/"stop", value, channel)
+        self.explods = {}        # slot del World -> [id, ticks restantes o -1]
+        self.explods_spawned = 0
+        self.state_changes = 0
+        self.unhandled = {}      # SCTRL sin handler -> veces
+
+    # ---- ciclo de vida ----
+    def on_state_enter(self, stateno):
+        self.state_changes += 1
+
+    def on_after_controllers(self, ctx):
+        self.frame += 1
+        if not self.explods:
+            return
+        world = getattr(self.interpreter, "world", None)
+        for slot, e in list(self.explods.items()):
+            if e[1] > 0:
+                e[1] -= 1
+                if e[1] == 0:
+                    self._remove_explod(world, slot)
+
+    # ---- estado ----
+    def ctrl_changestate(self, params, ctx):
+        value = params.get("value")
+        if value is not None:
+            if "ctrl" in params:
+                ctx["flags"]["ctrl"] = int(_num(params, "ctrl", 1))
+            self.request_change_state(int(value))
+
+    ctrl_selfstate = ctrl_changestate
+
+    def ctrl_ctrlset(self, params, ctx):
+        ctx["flags"]["ctrl"] = int(_num(params, "value", 1))
+
+    # ---- posición / velocidad (van a las columnas del World) ----
+    def ctrl_posset(self, params, ctx):
+        for k, i in (("x", 0), ("y", 1)):
+            v = _num(params, k)
+            if v is not None:
+                ctx["pos"][i] = v
+
+    def ctrl_posadd(self, params, ctx):
+        for k, i in (("x", 0), ("y", 1)):
+            v = _num(params, k)
+            if v is not None:
+                ctx["pos"][i] += v
+
+    def ctrl_velset(self, params, ctx):
+        for k, i in (("x", 0), ("y", 1)):
+            v = _num(params, k)
+            if v is not None:
+                ctx["vel"][i] = v
+
+    def ctrl_veladd(self, params, ctx):
+        for k, i in (("x", 0), ("y", 1)):
+            v = _num(params, k)
+            if v is not None:
+                ctx["vel"][i] += v
+
+    def ctrl_velmul(self, params, ctx):
+        for k, i in (("x", 0), ("y", 1)):
+            v = _num(params, k)
+            if v is not None:
+                ctx["vel"][i] *= v
+
+    # ---- variables ----
+    def _var_target(self, params, ctx):
+        if "fv" in params:
+            return ctx["fvars"], int(_num(params, "fv", 0))
+        return ctx["vars"], int(_num(params, "v", 0))
+
+    def ctrl_varset(self, params, ctx):
+        table, idx = self._var_target(params, ctx)
+        table[idx] = params.get("value", 0)
+
+    def ctrl_varadd(self, params, ctx):
+        table, idx = self._var_target(params, ctx)
+        table[idx] = table.get(idx, 0) + (_num(params, "value", 0) or 0)
+
+    # ---- explods ----
+    def ctrl_explod(self, params, ctx):
+        self.explods_spawned += 1
+        world = getattr(self.interpreter, "world", None)
+        if world is None:
+            return
+        ox, oy = _pair(params, "pos")
+        vx, vy = _pair(params, "vel")
+        slot = world.add_explod(ctx["pos"][0] + ox, ctx["pos"][1] + oy, vx, vy)
+        removetime = int(_num(params, "removetime", -2))
+        if removetime == -2:
+            removetime = self.explod_time
+        self.explods[slot] = [int(_num(params, "id", -1)), removetime if removetime > 0 else -1]
+
+    def ctrl_removeexplod(self, params, ctx):
+        world = getattr(self.interpreter, "world", None)
+        eid = int(_num(params, "id", -1))
+        for slot, e in list(self.explods.items()):
+            if eid == -1 or e[0] == eid:
+                self._remove_explod(world, slot)
+
+    def _remove_explod(self, world, slot):
+        del self.explods[slot]
+        if world is not None:
+            world.remove(slot)
+
+    # ---- sonido ----
+    def ctrl_playsnd(self, params, ctx):
+        value = params.get("value")
+        channel = int(_num(params, "channel", -1))
+        self.sound_events.append((self.frame, "play", value, channel))
+        if self.sound is not None:
+            try:
+                self.sound.play(value, channel=channel, volume=1.0)
+            except Exception:
+                pass
+
+    def ctrl_stopsnd(self, params, ctx):
+        channel = int(_num(params, "channel", -1))
+        self.sound_events.append((self.frame, "stop", None, channel))
+        if self.sound is not None:
+            try:
+                self.sound.stop(channel)
+            except Exception:
+                pass
+
+    def ctrl_fallback(self, name, params, ctx):
+        self.unhandled[name] = self.unhandled.get(name, 0) + 1
+
+# ---------------- IA -----------------------------------------------------------
+
+def _walk_commands(node, out):
+    if isinstance(node, Call):
+        if (node.name or "").lower() == "command" and node.args and isinstance(node.args[0], Var):
+            out.add(node.args[0].name.strip('"'))
+        for a in node.args:
+            _walk_commands(a, out)
+    elif isinstance(node, Temp):
+        _walk_commands(node.expr, out)
+    elif isinstance(node, Unary):
+        _walk_commands(node.rhs, out)
+    elif isinstance(node, Bin):
+        _walk_commands(node.lhs, out)
+        _walk_commands(node.rhs, out)
+
+def command_names(ast):
+    """Nombres de Command("...") que aparecen en los triggers del CNS."""
+    out = set()
+    for ctrls in ast.states.values():
+        for c in ctrls:
+            _walk_commands(c.triggerall, out)
+            for t in c.triggers:
+                _walk_commands(t, out)
+    return sorted(out)
+
+def random_ai(names, seed=None, rate=0.2):
+    """fn(interp, frame) -> comandos: cada frame, con prob. rate, uno de names al azar."""
+    rnd = random.Random(seed)
+    names = list(names)
+    def ai(interp, frame):
+        if names and rnd.random() < rate:
+            return (rnd.choice(names),)
+        return ()
+    return ai
+
+# ---------------- Driver -------------------------------------------------------
+
+def load_character(paths, cache_dir=None):
+    """
+    (CNSRuntime, plan) de un personaje, listo para muchos combates: el plan
+    compilado es el mismo para todos los intérpretes. El AST sale de
+    ast_cache (cache_dir: ver ast_cache.parse_cns_cached).
+    """
+    rt = CNSRuntime()
+    rt.ast = load_cns_files(paths, cache_dir)
+    return rt, rt.build_runtime_plan()
+
+def new_match(p1, p2, physics=None, sound=None):
+    """World sin render con P1 y P2 (pares (runtime, plan) de load_character)."""
+    world = World(physics=physics or Physics(), render=False)
+    players = []
+    for (rt, plan), x in ((p1, P1_START_X), (p2, P2_START_X)):
+        it = CNSInterpreter(rt, HeadlessAdapter(sound=sound))
+        it.load_plan(plan)
+        it.set_position(x, 0.0)
+        world.add(it)
+        players.append(it)
+    return world, players
+
+def run_match(world, players, frames, ai=None):
+    for frame in range(int(frames)):
+        if ai is not None:
+            for it in players:
+                it.commands = set(ai(it, frame))
+        world.tick()
+
+def simulate(p1_paths, p2_paths=None, frames=3600, matches=1, ai=None, seed=None,
+             cache_dir=None):
+    """
+    Corre 'matches' combates de 'frames' ticks. Devuelve dict con fps
+    (frames simulados por segundo de reloj), ms/frame por fase y contadores.
+    """
+    t0 = _clock()
+    p1 = load_character(p1_paths, cache_dir)
+    p2 = load_character(p2_paths, cache_dir) if p2_paths else p1
+    t_load = _clock() - t0
+    if ai is None:
+        ai = random_ai(sorted(set(command_names(p1[0].ast)) | set(command_names(p2[0].ast))),
+                       seed=seed)
+
+    phases = dict.fromkeys(PHASES, 0.0)
+    totals = dict(sound_events=0, explods=0, state_changes=0)
+    unhandled = {}
+    t_sim = 0.0
+    for _ in range(int(matches)):
+        world, players = new_match(p1, p2)
+        world.profile = True
+        t0 = _clock()
+        run_match(world, players, frames, ai)
+        t_sim += _clock() - t0
+        for p in PHASES:
+            phases[p] += world.phase_seconds[p]
+        for it in players:
+            a = it.adapter
+            totals["sound_events"] += len(a.sound_events)
+            totals["explods"] += a.explods_spawned
+            totals["state_changes"] += a.state_changes
+            for k, n in a.unhandled.items():
+                unhandled[k] = unhandled.get(k, 0) + n
+
+    total_frames = int(frames) * int(matches)
+    r = dict(matches=int(matches), frames=total_frames, load_seconds=t_load,
+             sim_seconds=t_sim, fps=total_frames / max(1e-9, t_sim),
+             phases=[(p, phases[p] * 1000.0 / max(1, total_frames)) for p in PHASES],
+             unhandled=unhandled,
+             warnings=p1[0].warnings + (p2[0].warnings if p2 is not p1 else []))
+    r.update(totals)
+    return r
+
+def _main(argv):
+    p1, p2, frames, matches, seed = [], [], 3600, 1, None
+    target = p1
+    i = 0
+    while i < len(argv):
+        a = argv[i]
+        if a in ("--frames", "--matches", "--seed") and i + 1 < len(argv):
+            v = int(argv[i + 1])
+            if a == "--frames":
+                frames = v
+            elif a == "--matches":
+                matches = v
+            else:
+                seed = v
+            i += 2
+            continue
+        if a == "--p2":
+            target = p2
+        else:
+            target.append(a)
+        i += 1
+    if not p1:
+        print("Uso: python -m mugen_cns.headless <p1.cns> [...] [--p2 <p2.cns> ...] "
+              "[--frames N] [--matches M] [--seed S]")
+        return 1
+    r = simulate(p1, p2 or None, frames=frames, matches=matches, seed=seed)
+    print("Combates: %(matches)d  frames: %(frames)d  carga: %(load_seconds).2f s" % r)
+    print("Simulación: %.2f s  -> %.0f frames/s" % (r["sim_seconds"], r["fps"]))
+    for phase, ms in r["phases"]:
+        print("  %-10s %.3f ms/frame" % (phase, ms))
+    print("Cambios de state: %(state_changes)d  explods: %(explods)d  "
+          "eventos de sonido: %(sound_events)d" % r)
+    if r["unhandled"]:
+        top = sorted(r["unhandled"].items(), key=lambda kv: -kv[1])[:8]
+        print("SCTRLs sin handler: " + ", ".join("%s x%d" % kv for kv in top))
+    for w in r["warnings"]:
+        print("Aviso: " + w)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
-import re
+import re, sys
 
 TOKEN_SPEC = [
     ('SKIP',    r'[ \t\r]+'),
@@ -13,7 +13,7 @@ TOKEN_SPEC = [
     ('LP',      r'\('),
     ('RP',      r'\)'),
     ('OP',      r'(\*\*|>=|<=|==|!=|&&|\|\||[+\-*/%<>^&|!])'),
-    ('FLOAT',   r'\d+\.\d+'),
+    ('FLOAT',   r'\d+\.\d+|\.\d+'),   # .44 (yaccel = .44) también es FLOAT
     ('INT',     r'-?\d+'),
     ('IDENT',   r'[A-Za-z_][A-Za-z0-9_.]*'),
     ('STRING',  r'"[^"\n]*"'),
@@ -21,7 +21,14 @@ TOKEN_SPEC = [
 
 token_re = re.compile('|'.join('(?P<%s>%s)' % p for p in TOKEN_SPEC))
 
+try:
+    _intern = sys.intern
+except AttributeError:   # Py2.7
+    _intern = intern
+
 class Tok(object):
+    # __slots__: sin __dict__ por token (un common1.cns genera cientos de miles)
+    __slots__ = ('type', 'val', 'line')
     def __init__(self, typ, val, line):
         self.type = typ
         self.val = val
@@ -30,12 +37,23 @@ class Tok(object):
         return "Tok(%s,%s)" % (self.type, self.val)
 
 def lex(s):
+    """
+    Generador de Tok. Los valores IDENT/OP se internan: las claves y nombres de
+    trigger repetidos comparten un solo string (menos memoria, comparaciones por
+    identidad en los dicts del parser y del registro). Los NL se emiten: el
+    valor de cada 'clave = valor' termina en su línea.
+    """
     line = 1
+    intern_types = ('IDENT', 'OP')
     for m in token_re.finditer(s):
-        typ = m.lastgroup; val = m.group()
+        typ = m.lastgroup
+        if typ == 'SKIP' or typ == 'COMMENT':
+            continue
         if typ == 'NL':
+            yield Tok(typ, '\n', line)
             line += 1
             continue
-        if typ in ('SKIP','COMMENT'):
-            continue
+        val = m.group()
+        if typ in intern_types:
+            val = _intern(val)
         yield Tok(typ, val, line)
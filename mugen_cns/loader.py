@@ -4,33 +4,39 @@ import io, os
 from .parser import Parser
 from .lexer import lex
 
-def _read_text(path):
-    # explicit cp1252 fallback if utf-8 fails
-    data = None
+def _decode_text(raw):
+    # explicit cp1252 fallback if utf-8 fails; newlines as io.open (universal)
     try:
-        f = io.open(path, 'r', encoding='utf-8')
-        data = f.read()
-        f.close()
-        return data
-    except Exception:
-        f = io.open(path, 'r', encoding='cp1252', errors='replace')
-        data = f.read()
+        data = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        data = raw.decode('cp1252', 'replace')
+    return data.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+
+def _read_bytes(path):
+    f = io.open(path, 'rb')
+    try:
+        return f.read()
+    finally:
         f.close()
-        return data
+
+def _read_text(path):
+    return _decode_text(_read_bytes(path))
+
+def merge_cns(merged, ast):
+    """Fusiona ast dentro de merged (o devuelve ast si merged es None)."""
+    if merged is None:
+        return ast
+    # naive merge: append states and globals; override statedefs by number
+    merged.statedefs.update(ast.statedefs)
+    for k, v in ast.states.items():
+        merged.states.setdefault(k, []).extend(v)
+    for gk, gv in ast.globals.items():
+        merged.globals.setdefault(gk, {}).update(gv)
+    return merged
 
 def load_cns_files(paths):
-    parser = None
     merged = None
     for p in paths:
         txt = _read_text(p)
-        ast = Parser(lex(txt)).parse_file()
-        if merged is None:
-            merged = ast
-        else:
-            # naive merge: append states and globals; override statedefs by number
-            merged.statedefs.update(ast.statedefs)
-            for k, v in ast.states.items():
-                merged.states.setdefault(k, []).extend(v)
-            for gk, gv in ast.globals.items():
-                merged.globals.setdefault(gk, {}).update(gv)
+        merged = merge_cns(merged, Parser(lex(txt)).parse_file())
     return merged
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""
+optimizer.py — pase de optimización sobre el AST del parser (Python 2.7)
+
+1) Plegado de constantes: subárboles Unary/Bin cuyas hojas son literales
+   (Num o string) se reemplazan por un Num/Var con el valor ya calculado,
+   con la misma semántica que evaluator/expr_compiler. Las llamadas a
+   triggers matemáticos puros (IfElse, Ceil, Floor, Clamp) con argumentos
+   literales también se pliegan.
+2) CSE por estado: una llamada a un trigger puro (Time, StateNo, AnimTime...)
+   con argumentos literales que aparece más de una vez en los triggers de un
+   mismo estado se reemplaza por un nodo Temp compartido. Temp se evalúa una
+   vez y queda en ctx.temps hasta que CNSInterpreter lo vacía (inicio de tick
+   y después de cada SCTRL ejecutado, que puede cambiar el estado).
+3) Reordenado de conjunciones: en la raíz de cada trigger/triggerall, los
+   términos de 'a && b && c' sin triggers impuros se ordenan por
+   costo / (1 - P(verdadero)), con el costo del catálogo (register_trigger
+   cost=...). Con cortocircuito, lo barato y selectivo (StateNo = ..,
+   Time = ..) corta antes de llegar a Command o P2*. Solo en la raíz: ahí un
+   error al evaluar ya equivale a falso, así que el orden no cambia el resultado.
+
+    stats = optimize_cns(ast, rt.eval_ctx.triggers)
+    print(stats)   # {'nodes_before': ..., 'nodes_after': ..., 'removed': ..., ...}
+
+Los parámetros de los controllers solo se pliegan (se evalúan fuera del tick).
+"""
+
+from .ast_nodes import Num, Var, Call, Unary, Bin, Temp, Tuple
+from .expr_compiler import BIN_OPS, UNARY_OPS
+
+# Triggers sin efectos ni dependencia del estado del juego: plegables con args literales
+FOLDABLE_CALLS = ('ifelse', 'ceil', 'floor', 'clamp')
+
+# Triggers puros dentro de un tick (solo leen estado): candidatos a CSE
+CSE_CALLS = ('time', 'stateno', 'prevstateno', 'animtime', 'anim', 'animelem',
+             'animelemtime', 'ctrl', 'movetype', 'statetype', 'life', 'power',
+             'alive', 'posx', 'posy', 'velx', 'vely', 'gametime', 'roundno',
+             'roundstate', 'p2stateno', 'p2movetype', 'numhelper', 'numexplod')
+
+_NO_VALUE = object()
+
+try:
+    _STRING_TYPES = (str, unicode)
+    _NUMBER_TYPES = (int, long, float)
+except NameError:   # Py3
+    _STRING_TYPES = (str,)
+    _NUMBER_TYPES = (int, float)
+
+def _literal(node):
+    """Valor de un nodo literal (Num o string) o _NO_VALUE."""
+    if isinstance(node, Num):
+        return node.value
+    if isinstance(node, Var):
+        s = node.name
+        if s and s.startswith('"') and s.endswith('"'):
+            return s[1:-1]
+    return _NO_VALUE
+
+def _to_node(value):
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, _NUMBER_TYPES):
+        return Num(value, isinstance(value, float))
+    if isinstance(value, _STRING_TYPES):
+        if '"' not in value:
+            return Var('"%s"' % value)
+    return None
+
+def count_nodes(node):
+    if isinstance(node, Unary):
+        return 1 + count_nodes(node.rhs)
+    if isinstance(node, Bin):
+        return 1 + count_nodes(node.lhs) + count_nodes(node.rhs)
+    if isinstance(node, Call):
+        return 1 + sum(count_nodes(a) for a in node.args)
+    if isinstance(node, Temp):
+        return 1 + count_nodes(node.expr)
+    if isinstance(node, Tuple):
+        return 1 + sum(count_nodes(x) for x in node.items)
+    return 1 if node is not None else 0
+
+# ---------------- Plegado de constantes ---------------------------------------
+
+def fold_constants(node, triggers=None):
+    """Devuelve el nodo con los subárboles literales ya calculados."""
+    if isinstance(node, Unary):
+        rhs = fold_constants(node.rhs, triggers)
+        op = UNARY_OPS.get(node.op)
+        v = _literal(rhs)
+        if op is not None and v is not _NO_VALUE:
+            try:
+                folded = _to_node(op(v))
+            except Exception:
+                folded = None   # p. ej. -"abc": se deja para el runtime
+            if folded is not None:
+                return folded
+        node.rhs = rhs
+        return node
+    if isinstance(node, Bin):
+        lhs = fold_constants(node.lhs, triggers)
+        rhs = fold_constants(node.rhs, triggers)
+        op = BIN_OPS.get(node.op)
+        a, b = _literal(lhs), _literal(rhs)
+        if op is not None and a is not _NO_VALUE and b is not _NO_VALUE:
+            try:
+                folded = _to_node(op(a, b))
+            except Exception:
+                folded = None   # división por cero, tipos mezclados...
+            if folded is not None:
+                return folded
+        node.lhs, node.rhs = lhs, rhs
+        return node
+    if isinstance(node, Call):
+        node.args = [fold_constants(a, triggers) for a in node.args]
+        name = (node.name or "").lower()
+        spec = triggers.get(name) if triggers is not None else None
+        if name in FOLDABLE_CALLS and spec and spec.get("impl"):
+            vals = [_literal(a) for a in node.args]
+            if _NO_VALUE not in vals:
+                try:
+                    folded = _to_node(spec["impl"](None, *vals))
+                except Exception:
+                    folded = None
+                if folded is not None:
+                    return folded
+        return node
+    if isinstance(node, Temp):
+        node.expr = fold_constants(node.expr, triggers)
+        return node
+    if isinstance(node, Tuple):
+        node.items = [fold_constants(x, triggers) for x in node.items]
+        return node
+    return node
+
+# ---------------- CSE ---------------------------------------------------------
+
+def _cse_key(node):
+    """Clave estructural de una llamada pura con args literales, o None."""
+    if not isinstance(node, Call):
+        return None
+    name = (node.name or "").lower()
+    if name not in CSE_CALLS:
+        return None
+    parts = []
+    for a in node.args:
+        v = _literal(a)
+        if v is _NO_VALUE:
+            # 'vel x' llega como Call('vel', [Var('x')]): el nombre del eje es literal
+            if isinstance(a, Var):
+                v = a.name.lower()
+            else:
+                return None
+        parts.append(repr(v))
+    return "%s(%s)" % (name, ",".join(parts))
+
+def _walk_calls(node, out):
+    if isinstance(node, Unary):
+        _walk_calls(node.rhs, out)
+    elif isinstance(node, Bin):
+        _walk_calls(node.lhs, out)
+        _walk_calls(node.rhs, out)
+    elif isinstance(node, Call):
+        key = _cse_key(node)
+        if key is not None:
+            out[key] = out.get(key, 0) + 1
+            return
+        for a in node.args:
+            _walk_calls(a, out)
+
+def _replace_calls(node, shared, temps):
+    if isinstance(node, Unary):
+        node.rhs = _replace_calls(node.rhs, shared, temps)
+    elif isinstance(node, Bin):
+        node.lhs = _replace_calls(node.lhs, shared, temps)
+        node.rhs = _replace_calls(node.rhs, shared, temps)
+    elif isinstance(node, Call):
+        key = _cse_key(node)
+        if key is not None:
+            if key in shared:
+                t = temps.get(key)
+                if t is None:
+                    t = temps[key] = Temp(key, node)
+                return t
+            return node
+        node.args = [_replace_calls(a, shared, temps) for a in node.args]
+    return node
+
+def _trigger_nodes(ctrl):
+    out = []
+    if ctrl.triggerall is not None:
+        out.append(ctrl.triggerall)
+    out.extend(ctrl.triggers)
+    return out
+
+def _state_cost(ctrls):
+    # nodos evaluados por tick si todos los triggers corren; un Temp cuenta
+    # su subárbol una sola vez por estado (las repeticiones son un lookup)
+    seen = set()
+    def cost(node):
+        if isinstance(node, Temp):
+            if node.key in seen:
+                return 0
+            seen.add(node.key)
+            return count_nodes(node.expr)
+        if isinstance(node, Unary):
+            return 1 + cost(node.rhs)
+        if isinstance(node, Bin):
+            return 1 + cost(node.lhs) + cost(node.rhs)
+        if isinstance(node, Call):
+            return 1 + sum(cost(a) for a in node.args)
+        return 1 if node is not None else 0
+    total = 0
+    for c in ctrls:
+        for n in _trigger_nodes(c):
+            total += cost(n)
+    return total
+
+def cse_state(ctrls):
+    """Comparte llamadas puras repetidas entre los triggers de un estado. Devuelve #Temp."""
+    counts = {}
+    for c in ctrls:
+        for n in _trigger_nodes(c):
+            _walk_calls(n, counts)
+    shared = set(k for k, n in counts.items() if n > 1)
+    if not shared:
+        return 0
+    temps = {}
+    for c in ctrls:
+        if c.triggerall is not None:
+            c.triggerall = _replace_calls(c.triggerall, shared, temps)
+        c.triggers = [_replace_calls(n, shared, temps) for n in c.triggers]
+    return len(temps)
+
+# ---------------- Reordenado por costo ----------------------------------------
+
+# probabilidad aproximada de que un término sea verdadero, por operador raíz
+_P_TRUE = {'==': 0.1, '!=': 0.9}
+_DEFAULT_P_TRUE = 0.5
+
+def expr_cost(node, triggers=None):
+    """Costo estimado de evaluar node (operadores = 1, triggers según catálogo)."""
+    if isinstance(node, Unary):
+        return 1 + expr_cost(node.rhs, triggers)
+    if isinstance(node, Bin):
+        return 1 + expr_cost(node.lhs, triggers) + expr_cost(node.rhs, triggers)
+    if isinstance(node, Call):
+        spec = triggers.get((node.name or "").lower()) if triggers is not None else None
+        own = spec.get("cost", 1) if spec else 0
+        return own + sum(expr_cost(a, triggers) for a in node.args)
+    if isinstance(node, Temp):
+        return 1   # en general ya está en ctx.temps
+    if isinstance(node, Tuple):
+        return sum(expr_cost(x, triggers) for x in node.items)
+    return 0
+
+def is_pure(node, triggers=None):
+    """False si node llama a un trigger marcado pure=False en el catálogo."""
+    if isinstance(node, Unary):
+        return is_pure(node.rhs, triggers)
+    if isinstance(node, Bin):
+        return is_pure(node.lhs, triggers) and is_pure(node.rhs, triggers)
+    if isinstance(node, Call):
+        spec = triggers.get((node.name or "").lower()) if triggers is not None else None
+        if spec and not spec.get("pure", True):
+            return False
+        return all(is_pure(a, triggers) for a in node.args)
+    if isinstance(node, Temp):
+        return is_pure(node.expr, triggers)
+    if isinstance(node, Tuple):
+        return all(is_pure(x, triggers) for x in node.items)
+    return True
+
+def _flatten_and(node, out):
+    if isinstance(node, Bin) and node.op == '&&':
+        _flatten_and(node.lhs, out)
+        _flatten_and(node.rhs, out)
+    else:
+        out.append(node)
+    return out
+
+def _rank(node, triggers):
+    p = _P_TRUE.get(node.op, _DEFAULT_P_TRUE) if isinstance(node, Bin) else _DEFAULT_P_TRUE
+    return expr_cost(node, triggers) / (1.0 - p)
+
+def reorder_conjunction(node, triggers=None):
+    """(nodo, cambió) con los términos de la conjunción raíz ordenados por _rank."""
+    terms = _flatten_and(node, [])
+    if len(terms) < 2 or not all(is_pure(t, triggers) for t in terms):
+        return node, False
+    ranked = sorted(terms, key=lambda t: _rank(t, triggers))   # estable
+    if all(a is b for a, b in zip(ranked, terms)):
+        return node, False
+    out = ranked[0]
+    for t in ranked[1:]:
+        out = Bin('&&', out, t)
+    return out, True
+
+# ---------------- Pase completo -----------------------------------------------
+
+def optimize_cns(ast, triggers=None, cse=True, reorder=True):
+    """
+    Optimiza el PlayerCNS en el lugar. Devuelve estadísticas:
+    nodes_before/nodes_after (nodos de trigger evaluados por tick),
+    removed, folded_params (nodos quitados de params), temps (Temp creados),
+    reordered (conjunciones reordenadas por costo).
+    """
+    before = after = 0
+    params_before = params_after = 0
+    n_temps = 0
+    n_reordered = 0
+    for st_no, ctrls in ast.states.items():
+        before += _state_cost(ctrls)
+        for c in ctrls:
+            if c.triggerall is not None:
+                c.triggerall = fold_constants(c.triggerall, triggers)
+            c.triggers = [fold_constants(n, triggers) for n in c.triggers]
+            for k, v in list(c.params.items()):
+                params_before += count_nodes(v)
+                c.params[k] = fold_constants(v, triggers)
+                params_after += count_nodes(c.params[k])
+        if cse:
+            n_temps += cse_state(ctrls)
+        if reorder:
+            for c in ctrls:
+                if c.triggerall is not None:
+                    c.triggerall, changed = reorder_conjunction(c.triggerall, triggers)
+                    n_reordered += changed
+                for i, n in enumerate(c.triggers):
+                    c.triggers[i], changed = reorder_conjunction(n, triggers)
+                    n_reordered += changed
+        after += _state_cost(ctrls)
+    for sd in ast.statedefs.values():
+        for k, v in list(sd.params.items()):
+            params_before += count_nodes(v)
+            sd.params[k] = fold_constants(v, triggers)
+            params_after += count_nodes(sd.params[k])
+    return dict(nodes_before=before, nodes_after=after, removed=before - after,
+                folded_params=params_before - params_after, temps=n_temps,
+                reordered=n_reordered)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""
+params.py — parámetros de controllers: estáticos vs dinámicos (Python 2.7)
+
+CNSRuntime.normalize_controller clasifica cada parámetro al construir el plan:
+
+- estático: sin llamadas a triggers (literales, aritmética ya plegada);
+  se evalúa una vez y queda en el plan.
+- dinámico: usa triggers (value = ifelse(...), x = vel x * 2); se compila
+  (expr_compiler) y se evalúa cada vez que los triggers del controller se
+  cumplen en un tick — todos juntos, antes de llamar al handler, como M.U.G.E.N.
+
+El handler recibe un ParamsView: mapping de solo lectura que superpone los
+valores dinámicos del tick sobre el dict estático, sin copiarlo.
+"""
+
+try:
+    from .ast_nodes import Var, Unary, Bin, Call, Temp, Tuple
+except (ImportError, ValueError):   # importado como módulo suelto (cns_interpreter)
+    from ast_nodes import Var, Unary, Bin, Call, Temp, Tuple
+
+def is_dynamic(node):
+    """True si el nodo depende del estado del juego (llama triggers)."""
+    if isinstance(node, (Call, Temp)):
+        return True
+    if isinstance(node, Unary):
+        return is_dynamic(node.rhs)
+    if isinstance(node, Bin):
+        return is_dynamic(node.lhs) or is_dynamic(node.rhs)
+    if isinstance(node, Tuple):
+        return any(is_dynamic(x) for x in node.items)
+    return callable(node)
+
+def ident_param(node, default=None):
+    """
+    Texto (lowercase) de un parámetro identificador: type = A, physics = N,
+    statetype = C. eval_expr da 0 para esos Var; aquí se lee el nombre del nodo.
+    """
+    if isinstance(node, Var) and node.name:
+        return node.name.strip('"').lower()
+    return default
+
+def statedef_flags(sd):
+    """{"type", "physics"} de un StateDef (defaults de M.U.G.E.N: type S, physics N)."""
+    params = dict((k.lower(), v) for k, v in (getattr(sd, "params", None) or {}).items())
+    return {"type": ident_param(params.get("type"), "s")[:1],
+            "physics": ident_param(params.get("physics"), "n")[:1]}
+
+class DynamicParam(object):
+    """Marcador de parámetro dinámico dentro del dict que recibe normalize_sctrl."""
+    __slots__ = ('fn',)
+    def __init__(self, fn):
+        self.fn = fn
+    def __repr__(self):
+        return "DynamicParam(%r)" % (self.fn,)
+
+def eval_dynamic(dynamic, ctx):
+    """{nombre: fn} -> {nombre: valor} del tick. Un error deja None (no rompe el SCTRL)."""
+    out = {}
+    for k, fn in dynamic.items():
+        try:
+            out[k] = fn(ctx)
+        except Exception:
+            out[k] = None
+    return out
+
+class ParamsView(object):
+    """Vista dict-like (solo lectura) de params estáticos + valores dinámicos del tick."""
+    __slots__ = ('_static', '_dyn')
+
+    def __init__(self, static, dyn):
+        self._static = static
+        self._dyn = dyn
+
+    def __getitem__(self, k):
+        dyn = self._dyn
+        if k in dyn:
+            return dyn[k]
+        return self._static[k]
+
+    def get(self, k, default=None):
+        dyn = self._dyn
+        if k in dyn:
+            return dyn[k]
+        return self._static.get(k, default)
+
+    def __contains__(self, k):
+        return k in self._dyn or k in self._static
+
+    def keys(self):
+        ks = list(self._static.keys())
+        ks.extend(k for k in self._dyn if k not in self._static)
+        return ks
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def copy(self):
+        d = dict(self._static)
+        d.update(self._dyn)
+        return d
+
+    def __repr__(self):
+        return "ParamsView(%r)" % (self.copy(),)
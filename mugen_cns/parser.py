@@ -1,30 +1,47 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 import re
+from collections import deque
 from .lexer import lex
 from .ast_nodes import *
 
+# Subir cuando cambie el AST que producen lex()/Parser (invalida ast_cache)
+PARSER_VERSION = 5
+
+_TRIGGER_PAT = re.compile(r'^trigger(\d+)$', re.I)
+
 class Parser(object):
+    """
+    Parser recursivo descendente. Consume los tokens del generador de lex()
+    con una ventana de lookahead (deque) en vez de materializar la lista
+    completa: la memoria no crece con el tamaño del archivo.
+    """
     def __init__(self, tokens):
-        self.toks = list(tokens)
-        self.i = 0
+        self._it = iter(tokens)
+        self._win = deque()
     def peek(self, k=0):
-        j = self.i + k
-        if j < len(self.toks):
-            return self.toks[j]
-        return None
+        win = self._win
+        while len(win) <= k:
+            t = next(self._it, None)
+            if t is None:
+                return None
+            win.append(t)
+        return win[k]
+    def _advance(self):
+        # el token ya fue visto con peek(), así que está en la ventana
+        self._win.popleft()
     def eat(self, typ=None):
         t = self.peek()
         if not t:
             raise SyntaxError("EOF")
         if typ and t.type != typ:
             raise SyntaxError("Esperaba %s, vi %s" % (typ, t))
-        self.i += 1
+        self._win.popleft()
         return t
     def match(self, typ):
         t = self.peek()
         if t and t.type == typ:
-            self.i += 1
+            self._win.popleft()
             return True
         return False
 
@@ -47,7 +64,7 @@ class Parser(object):
                     params = self.parse_keyvals_until_next_section()
                     ast.globals.setdefault(sec_name, {}).update(params)
             else:
-                self.i += 1
+                self._advance()
         return ast
 
     def parse_section_header(self):
@@ -61,12 +78,20 @@ class Parser(object):
             if t.type == 'COMMA':
                 self.eat('COMMA')
                 continue
+            if t.type == 'OP' and t.val == '-':
+                # states negativos: [Statedef -1], [State -2, x]
+                n = self.peek(1)
+                if n and n.type == 'INT':
+                    self._advance(); self._advance()
+                    args.append(-int(n.val))
+                    continue
+                break
             if t.type in ('INT','IDENT'):
                 if t.type == 'INT':
                     args.append(int(t.val))
                 else:
                     args.append(t.val)
-                self.i += 1
+                self._advance()
             else:
                 break
         return name, args
@@ -84,7 +109,6 @@ class Parser(object):
         items = self.parse_keyvals_until_next_section(raw=True)
         ctrls = []
         current = None
-        trigger_pat = re.compile(r'^trigger(\d+)$', re.I)
 
         for k, v in items:
             lk = k.lower()
@@ -99,7 +123,7 @@ class Parser(object):
                 # Guarda SOLO el nodo de expresión, no par (k,v)
                 current.triggerall = v
 
-            elif trigger_pat.match(lk):
+            elif _TRIGGER_PAT.match(lk):
                 if not current:
                     current = Controller(state_no, idx, 'Null')
                 # Guarda SOLO el nodo de expresión, no par (k,v)
@@ -124,15 +148,46 @@ class Parser(object):
             if t.type == 'IDENT':
                 key = self.eat('IDENT').val
                 if self.match('EQ'):
-                    expr = self.parse_expr()
-                    if raw:
-                        out.append((key, expr))
-                    else:
-                        out[key] = expr
+                    nxt = self.peek()
+                    if nxt and nxt.type not in ('NL', 'LBRACK'):   # 'clave =' sin valor: se ignora
+                        expr = self.parse_value()
+                        if raw:
+                            out.append((key, expr))
+                        else:
+                            out[key] = expr
+                self._skip_line()
             else:
-                self.i += 1
+                self._advance()
         return out
 
+    def parse_value(self):
+        # 'pos = 10, -20' / 'value = S5, 0' -> Tuple; sin coma, la expresión sola
+        node = self.parse_expr()
+        t = self.peek()
+        if not t or t.type != 'COMMA':
+            return node
+        items = [node]
+        while self.match('COMMA'):
+            t = self.peek()
+            if not t or t.type in ('COMMA', 'NL', 'LBRACK'):
+                items.append(None)   # 'sparkxy = , -70': el controller pone el default
+                continue
+            try:
+                items.append(self.parse_expr())
+            except SyntaxError:
+                break   # el resto de la línea lo descarta _skip_line
+        return Tuple(items)
+
+    def _skip_line(self):
+        # el valor termina en su línea: lo que sobre tras el valor se descarta
+        while True:
+            t = self.peek()
+            if not t or t.type == 'LBRACK':
+                return
+            self._advance()
+            if t.type == 'NL':
+                return
+
     # ----- Expresiones -----
     def parse_expr(self):
         return self.parse_or()
@@ -196,13 +251,13 @@ class Parser(object):
             self.eat('RP')
             return node
         if t.type == 'INT':
-            self.i += 1
+            self._advance()
             return Num(int(t.val), False)
         if t.type == 'FLOAT':
-            self.i += 1
+            self._advance()
             return Num(float(t.val), True)
         if t.type == 'STRING':
-            self.i += 1
+            self._advance()
             return Var(t.val)
         if t.type == 'IDENT':
             ident = self.eat('IDENT').val
@@ -226,7 +281,7 @@ class Parser(object):
         t = self.peek()
         if t and t.type == 'OP' and t.val in ops:
             self._last_op = t.val
-            self.i += 1
+            self._advance()
             return True
         return False
 
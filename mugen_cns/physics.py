@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""
+physics.py — paso de física por lotes para todas las entidades de un World (Python 2.7)
+
+CNSAdapterPygame.on_after_controllers integra x += vx / y += vy de una sola
+entidad, sin gravedad, fricción ni suelo. Physics es el paso de física de
+world.World: un solo paso por tick sobre las columnas de world.EntityTable
+(pos, vel, statetype, physics y las constantes de [Movement] de cada slot).
+Con NumPy, las columnas array('d') se ven como arrays sin copiarlas
+(np.frombuffer) y el paso entero son operaciones con máscaras; sin NumPy
+se recorre slot por slot con la misma semántica.
+
+Por tick, para cada slot vivo (coordenadas de M.U.G.E.N: y crece hacia abajo,
+el suelo es ground_y):
+
+    pos += vel
+    physics S  -> vel x *= stand.friction
+    physics C  -> vel x *= crouch.friction
+    physics A  -> vel y += yaccel
+    suelo      -> si pos y > ground_y (physics != N): pos y = ground_y;
+                  en S/C además vel y = 0 si iba hacia abajo. En A la vel y
+                  se conserva para que el CNS vea el aterrizaje
+                  (common1: Vel Y > 0 && Pos Y >= 0 -> ChangeState 52).
+
+Como ctx["pos"] / ctx["vel"] de cada intérprete son vistas sobre esas mismas
+columnas (World.add), el resultado ya está en el intérprete al terminar.
+
+    world = World(physics=Physics(ground_y=0.0))
+"""
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except Exception:
+    _HAS_NUMPY = False
+
+from .ast_nodes import Var
+from .evaluator import EvalContext, eval_expr
+from .params import is_dynamic
+
+# Códigos de las columnas statetype / physics (world.EntityTable)
+STATETYPE_CODES = {"s": 0, "c": 1, "a": 2, "l": 3}
+PHYSICS_CODES = {"s": 0, "c": 1, "a": 2, "n": 3}
+PHYS_S, PHYS_C, PHYS_A, PHYS_N = 0, 1, 2, 3
+
+# [Movement] si el CNS no lo define (valores de kfm)
+DEFAULT_MOVEMENT = {"yaccel": 0.44, "stand.friction": 0.85, "crouch.friction": 0.82}
+
+_CONST_CTX = EvalContext({})
+
+def _const_value(node):
+    if isinstance(node, (int, float)):
+        return node
+    if node is None or isinstance(node, Var) or is_dynamic(node):
+        return None
+    try:
+        return eval_expr(node, _CONST_CTX)
+    except Exception:
+        return None
+
+def movement_from_cns(ast):
+    """yaccel / stand.friction / crouch.friction del [Movement] de un PlayerCNS."""
+    out = dict(DEFAULT_MOVEMENT)
+    if ast is None:
+        return out
+    for sec, params in ast.globals.items():
+        if (sec or "").lower() != "movement":
+            continue
+        for k, v in params.items():
+            k = k.lower()
+            if k in out:
+                val = _const_value(v)
+                if val is not None:
+                    out[k] = float(val)
+    return out
+
+class Physics(object):
+    def __init__(self, ground_y=0.0, use_numpy=None):
+        """
+        ground_y: y del suelo (0 en M.U.G.E.N).
+        use_numpy: None = NumPy si está instalado; False fuerza el paso en Python.
+        """
+        self.ground_y = float(ground_y)
+        self.use_numpy = _HAS_NUMPY if use_numpy is None else bool(use_numpy and _HAS_NUMPY)
+
+    def __call__(self, world):
+        t = world.table
+        if not len(t.alive):
+            return
+        if self.use_numpy:
+            self._step_numpy(t)
+        else:
+            self._step_py(t)
+
+    def _step_numpy(self, t):
+        # vistas sobre los array de la tabla: escribir aquí es escribir en las
+        # columnas (y en ctx["pos"]/ctx["vel"]); se sueltan al salir, así la
+        # tabla puede volver a crecer
+        f64, i8 = np.float64, np.int8
+        px = np.frombuffer(t.pos_x, dtype=f64)
+        py = np.frombuffer(t.pos_y, dtype=f64)
+        vx = np.frombuffer(t.vel_x, dtype=f64)
+        vy = np.frombuffer(t.vel_y, dtype=f64)
+        phys = np.frombuffer(t.physics, dtype=i8)
+        alive = np.frombuffer(t.alive, dtype=i8) != 0
+
+        px[alive] += vx[alive]
+        py[alive] += vy[alive]
+
+        m = alive & (phys == PHYS_S)
+        vx[m] *= np.frombuffer(t.stand_friction, dtype=f64)[m]
+        m = alive & (phys == PHYS_C)
+        vx[m] *= np.frombuffer(t.crouch_friction, dtype=f64)[m]
+        air = alive & (phys == PHYS_A)
+        vy[air] += np.frombuffer(t.yaccel, dtype=f64)[air]
+
+        g = self.ground_y
+        below = alive & (phys != PHYS_N) & (py > g)
+        py[below] = g
+        vy[below & ~air & (vy > 0.0)] = 0.0
+
+    def _step_py(self, t):
+        px, py, vx, vy = t.pos_x, t.pos_y, t.vel_x, t.vel_y
+        phys, alive = t.physics, t.alive
+        sf, cf, ya = t.stand_friction, t.crouch_friction, t.yaccel
+        g = self.ground_y
+        for i in range(len(alive)):
+            if not alive[i]:
+                continue
+            px[i] += vx[i]
+            py[i] += vy[i]
+            p = phys[i]
+            if p == PHYS_N:
+                continue
+            if p == PHYS_S:
+                vx[i] *= sf[i]
+            elif p == PHYS_C:
+                vx[i] *= cf[i]
+            else:
+                vy[i] += ya[i]
+            if py[i] > g:
+                py[i] = g
+                if p != PHYS_A and vy[i] > 0.0:
+                    vy[i] = 0.0
@@ -4,16 +4,16 @@ from triggers_core import register_trigger, INT, FLT, BOOL, STR, EXPR, v
 
 # Triggers/afinaciones introducidas o consolidadas en 1.0/1.1
 
-@register_trigger("AILevel", args=[], returns=INT, note="Nivel de AI (0..8 si aplica).", versions=v(dos=False, v10=True, v11=True))
+@register_trigger("AILevel", args=[], returns=INT, note="Nivel de AI (0..8 si aplica).", versions=v(dos=False, v10=True, v11=True), deps=("ai",))
 def trig_ailevel(ctx): return getattr(ctx, "ai_level", lambda: 0)()
 
-@register_trigger("HitShakeOver", args=[], returns=INT, note="1 si terminó el shake del hit.", versions=v(dos=False, v10=True, v11=True))
+@register_trigger("HitShakeOver", args=[], returns=INT, note="1 si terminó el shake del hit.", versions=v(dos=False, v10=True, v11=True), deps=("hit",))
 def trig_hitshakeover(ctx): return 1 if getattr(ctx, "hitshake_over", lambda: True)() else 0
 
-@register_trigger("CanRecover", args=[], returns=INT, note="1 si puede tech/recuperarse.", versions=v(dos=False, v10=True, v11=True))
+@register_trigger("CanRecover", args=[], returns=INT, note="1 si puede tech/recuperarse.", versions=v(dos=False, v10=True, v11=True), deps=("hit",))
 def trig_canrecover(ctx): return 1 if getattr(ctx, "can_recover", lambda: False)() else 0
 
-@register_trigger("P2Dist", args=[STR], returns=FLT, note="Distancia a P2 ('x' o 'y').", versions=v(dos=False, v10=True, v11=True))
+@register_trigger("P2Dist", args=[STR], returns=FLT, note="Distancia a P2 ('x' o 'y').", versions=v(dos=False, v10=True, v11=True), cost=3, deps=("pos", "p2"))
 def trig_p2dist(ctx, axis):
     return getattr(ctx, "p2_dist", lambda _a: 0.0)(axis)
 
@@ -9,7 +9,8 @@ CANON    = {}   # nombre canónico (lower) -> spec
 # Tipado básico para documentación / tooling
 INT, FLT, BOOL, STR, EXPR = "int", "float", "bool", "string", "expr"
 
-def register_trigger(name, args=None, returns="int", note="", versions=None, aliases=None):
+def register_trigger(name, args=None, returns="int", note="", versions=None, aliases=None,
+                     cost=1, pure=True, deps=None):
     """
     Registra un trigger.
     name:     Nombre canónico (p. ej., 'AnimTime')
@@ -18,6 +19,13 @@ def register_trigger(name, args=None, returns="int", note="", versions=None, ali
     note:     Descripción breve
     versions: dict {'dos','win','2001','2002','1.0','1.1'} -> bool
     aliases:  Lista de alias aceptados
+    cost:     Costo relativo de evaluarlo (1 = lectura directa del provider);
+              el optimizer prueba primero los términos baratos de un '&&'
+    pure:     True si no tiene efectos (se puede reordenar / memoizar)
+    deps:     Partes del estado que lee (p. ej. ("pos",), ("state",)). Con deps
+              el resultado se memoiza por tick y se invalida cuando un SCTRL
+              escribe alguna de ellas (ver CTRL_WRITES en cns_interpreter).
+              None = no memoizar.
     """
     def deco(fn):
         spec = {
@@ -28,6 +36,9 @@ def register_trigger(name, args=None, returns="int", note="", versions=None, ali
             "note": note,
             "versions": versions or {},
             "aliases": [a.lower() for a in (aliases or [])],
+            "cost": cost,
+            "pure": bool(pure),
+            "deps": tuple(deps) if deps is not None else None,
         }
         CANON[name.lower()] = spec
         TRIGGERS[name.lower()] = spec
@@ -52,6 +63,9 @@ def export_triggers_json(path):
             "note": v["note"],
             "versions": v["versions"],
             "aliases": v["aliases"],
+            "cost": v.get("cost", 1),
+            "pure": v.get("pure", True),
+            "deps": list(v["deps"]) if v.get("deps") is not None else None,
         }
     with open(path, "w") as f:
         json.dump(data, f, indent=2, sort_keys=True)
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""
+world.py — planificador de un combate: todas las entidades en un solo loop (Python 2.7)
+
+CNSInterpreter corre una sola entidad y run_fixed() solo avanza esa. World
+es dueño de todas (P1, P2, helpers, explods) y corre las fases del tick de
+M.U.G.E.N en orden, cada fase sobre todas las entidades antes de la siguiente:
+
+    1) states negativos (-3, -2, -1)  solo jugadores (helpers: negative_states=True)
+    2) state actual                   run_state(current_state_no) + state_time
+                                      (un ChangeState/SelfState corta el resto de
+                                      los states de esa entidad en el tick, como
+                                      en CNSInterpreter.tick)
+    3) física                         world.physics(world) sobre las columnas
+                                      + on_after_controllers de cada adaptador
+    4) colisión                       world.collision(world) (opcional)
+    5) render                         adapter.render_frame() de cada intérprete
+
+Pause / SuperPause son del mundo: si un SCTRL los dispara, el World toma los
+ticks del intérprete y congela todas las fases salvo render mientras duren
+(movetime no se diferencia, igual que en CNSInterpreter).
+
+Estado en struct-of-arrays (EntityTable): pos/vel, statetype/physics y las
+constantes de [Movement] de cada entidad viven en columnas array contiguas,
+un slot por entidad. ctx["pos"] y ctx["vel"] del intérprete pasan a ser
+vistas [x, y] sobre su slot, así que triggers, handlers y la física
+leen/escriben lo mismo sin copiar. Con 100+ helpers la
+física recorre columnas, no objetos (y physics.py las ve como arrays NumPy).
+
+    world = World(physics=Physics())     # physics.py: gravedad/fricción/suelo
+    world.add(p1); world.add(p2)
+    world.add(helper, kind=KIND_HELPER)
+    world.add_explod(x, y, vx=1.0)
+    world.run_fixed(60)
+
+Los adaptadores usados con World no deben integrar pos += vel por su cuenta
+en on_after_controllers (lo hace world.physics).
+"""
+
+import time
+from array import array
+
+from .physics import DEFAULT_MOVEMENT, STATETYPE_CODES, PHYSICS_CODES, movement_from_cns
+
+NEGATIVE_STATES = (-3, -2, -1)
+
+KIND_PLAYER = 0
+KIND_HELPER = 1
+KIND_EXPLOD = 2
+
+PHASES = ("negative", "current", "physics", "collision", "render")
+
+_clock = getattr(time, "perf_counter", time.time)
+
+# ---------------- Struct-of-arrays --------------------------------------------
+
+class _Vec2View(object):
+    """[x, y] de un slot: lo que el intérprete ve como ctx["pos"] / ctx["vel"]."""
+    __slots__ = ('_xs', '_ys', '_i')
+
+    def __init__(self, xs, ys, i):
+        self._xs = xs
+        self._ys = ys
+        self._i = i
+
+    def __getitem__(self, k):
+        if k == 0 or k == -2:
+            return self._xs[self._i]
+        if k == 1 or k == -1:
+            return self._ys[self._i]
+        raise IndexError(k)
+
+    def __setitem__(self, k, v):
+        if k == 0 or k == -2:
+            self._xs[self._i] = v
+        elif k == 1 or k == -1:
+            self._ys[self._i] = v
+        else:
+            raise IndexError(k)
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        return iter((self._xs[self._i], self._ys[self._i]))
+
+    def __eq__(self, other):
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+class EntityTable(object):
+    """
+    Una columna por campo, un slot por entidad. Los slots libres se reusan
+    (alive=0), así los índices de las entidades vivas no cambian.
+    statetype/physics usan los códigos de physics.py; yaccel y las fricciones
+    vienen del [Movement] de cada personaje.
+    """
+    _FLOAT_COLUMNS = ("pos_x", "pos_y", "vel_x", "vel_y",
+                      "yaccel", "stand_friction", "crouch_friction")
+    _BYTE_COLUMNS = ("alive", "kind", "negative", "statetype", "physics")
+
+    def __init__(self):
+        for name in self._FLOAT_COLUMNS:
+            setattr(self, name, array('d'))
+        for name in self._BYTE_COLUMNS:
+            setattr(self, name, array('b'))
+        self.interps = []            # slot -> CNSInterpreter o None (explods)
+        self._free = []
+        self.count = 0
+
+    def alloc(self, kind, interp=None, **fields):
+        """
+        Nuevo slot con alive=1; fields: valores iniciales de las columnas
+        (pos_x=..., vel_x=..., physics=...). Lo que falte queda en 0.
+        """
+        fields["alive"] = 1
+        fields["kind"] = kind
+        if self._free:
+            i = self._free.pop()
+            for name in self._FLOAT_COLUMNS + self._BYTE_COLUMNS:
+                getattr(self, name)[i] = fields.get(name, 0)
+            self.interps[i] = interp
+        else:
+            i = len(self.alive)
+            for name in self._FLOAT_COLUMNS + self._BYTE_COLUMNS:
+                getattr(self, name).append(fields.get(name, 0))
+            self.interps.append(interp)
+        self.count += 1
+        return i
+
+    def free(self, i):
+        if not self.alive[i]:
+            return
+        self.alive[i] = 0
+        self.interps[i] = None
+        self._free.append(i)
+        self.count -= 1
+
+    def __len__(self):
+        return self.count
+
+    def slots(self):
+        """Slots vivos en orden."""
+        alive = self.alive
+        return [i for i in range(len(alive)) if alive[i]]
+
+# ---------------- Física por defecto ------------------------------------------
+
+def integrate(world):
+    """pos += vel para cada slot vivo (sin gravedad ni fricción; ver physics.Physics)."""
+    t = world.table
+    px, py, vx, vy, alive = t.pos_x, t.pos_y, t.vel_x, t.vel_y, t.alive
+    for i in range(len(alive)):
+        if alive[i]:
+            px[i] += vx[i]
+            py[i] += vy[i]
+
+# ---------------- World -------------------------------------------------------
+
+class World(object):
+    def __init__(self, physics=None, collision=None, render=True):
+        """
+        physics: fn(world) que actualiza las columnas (por defecto integrate;
+                 physics.Physics() agrega gravedad, fricción y suelo)
+        collision: fn(world) o None
+        render: False salta la fase de render (modo headless)
+        """
+        self.table = EntityTable()
+        self.physics = physics or integrate
+        self.collision = collision
+        self.render_enabled = render
+        self.pause_ticks = 0
+        self.superpause_ticks = 0
+        self.tick_count = 0
+        # Perfilado por fase (segundos acumulados); se activa con profile=True
+        self.profile = False
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+
+    # --------- Entidades ----------------------------------------------------
+    def add(self, interp, kind=KIND_PLAYER, negative_states=None, movement=None):
+        """
+        Registra un CNSInterpreter (con su plan ya cargado). Devuelve su slot.
+        negative_states: por defecto solo los jugadores corren -3/-2/-1.
+        movement: {"yaccel", "stand.friction", "crouch.friction"}; por defecto
+        el [Movement] del CNS del runtime (physics.movement_from_cns).
+        """
+        if negative_states is None:
+            negative_states = (kind == KIND_PLAYER)
+        if movement is None:
+            movement = movement_from_cns(getattr(getattr(interp, "rt", None), "ast", None))
+        pos, vel = interp.ctx["pos"], interp.ctx["vel"]
+        t = self.table
+        i = t.alloc(kind, interp,
+                    pos_x=float(pos[0]), pos_y=float(pos[1]),
+                    vel_x=float(vel[0]), vel_y=float(vel[1]),
+                    negative=1 if negative_states else 0,
+                    yaccel=float(movement.get("yaccel", DEFAULT_MOVEMENT["yaccel"])),
+                    stand_friction=float(movement.get("stand.friction",
+                                                      DEFAULT_MOVEMENT["stand.friction"])),
+                    crouch_friction=float(movement.get("crouch.friction",
+                                                       DEFAULT_MOVEMENT["crouch.friction"])))
+        interp.ctx["pos"] = _Vec2View(t.pos_x, t.pos_y, i)
+        interp.ctx["vel"] = _Vec2View(t.vel_x, t.vel_y, i)
+        interp.world = self
+        interp.world_slot = i
+        self.set_state_flags(i, interp.statetype, interp.physics)
+        return i
+
+    def add_explod(self, x=0.0, y=0.0, vx=0.0, vy=0.0):
+        """Entidad sin CNS (explod): physics N, solo pos += vel. Devuelve su slot."""
+        return self.table.alloc(KIND_EXPLOD, None, pos_x=float(x), pos_y=float(y),
+                                vel_x=float(vx), vel_y=float(vy),
+                                statetype=STATETYPE_CODES["a"], physics=PHYSICS_CODES["n"])
+
+    def set_state_flags(self, slot, statetype, physics):
+        """Columnas statetype/physics del slot ('s','c','a','l' / 's','c','a','n')."""
+        t = self.table
+        t.statetype[slot] = STATETYPE_CODES.get(statetype, STATETYPE_CODES["s"])
+        t.physics[slot] = PHYSICS_CODES.get(physics, PHYSICS_CODES["n"])
+
+    def remove(self, slot):
+        """Quita una entidad; el intérprete vuelve a tener pos/vel propios."""
+        t = self.table
+        interp = t.interps[slot]
+        if interp is not None:
+            interp.ctx["pos"] = list(interp.ctx["pos"])
+            interp.ctx["vel"] = list(interp.ctx["vel"])
+            interp.world = None
+            interp.world_slot = None
+        t.free(slot)
+
+    def interpreters(self):
+        """(slot, intérprete) vivos en orden de slot."""
+        t = self.table
+        alive, interps = t.alive, t.interps
+        return [(i, interps[i]) for i in range(len(alive))
+                if alive[i] and interps[i] is not None]
+
+    # --------- Pausas compartidas -------------------------------------------
+    def _collect_pauses(self, its):
+        # Pause/SuperPause disparados este tick pasan a ser del mundo
+        for _i, it in its:
+            if it.superpause_ticks > 0:
+                self.superpause_ticks = max(self.superpause_ticks, it.superpause_ticks)
+                it.superpause_ticks = 0
+            if it.pause_ticks > 0:
+                self.pause_ticks = max(self.pause_ticks, it.pause_ticks)
+                it.pause_ticks = 0
+
+    # --------- Bucle ---------------------------------------------------------
+    def tick(self):
+        self.tick_count += 1
+        if self.superpause_ticks > 0 or self.pause_ticks > 0:
+            if self.superpause_ticks > 0:
+                self.superpause_ticks -= 1
+            else:
+                self.pause_ticks -= 1
+            if self.render_enabled:
+                self._timed("render", self.render)
+            return
+        its = self.interpreters()
+        cut = self._timed("negative", self._phase_negative, its)
+        self._timed("current", self._phase_current, its, cut)
+        self._collect_pauses(its)
+        self._timed("physics", self._phase_physics, its)
+        if self.collision is not None:
+            self._timed("collision", self.collision, self)
+        if self.render_enabled:
+            self._timed("render", self.render)
+
+    def run_fixed(self, frames=1):
+        for _ in range(int(frames)):
+            self.tick()
+
+    def _timed(self, phase, fn, *args):
+        if not self.profile:
+            return fn(*args)
+        t0 = _clock()
+        try:
+            return fn(*args)
+        finally:
+            self.phase_seconds[phase] += _clock() - t0
+
+    def reset_profile(self):
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+
+    # --------- Fases -----------------------------------------------------------
+    def _phase_negative(self, its):
+        """Devuelve los slots cuyo frame cortó un ChangeState/SelfState."""
+        negative = self.table.negative
+        cut = set()
+        for i, it in its:
+            it.begin_frame()
+            if negative[i]:
+                states = it._dispatch_by_state
+                for st in NEGATIVE_STATES:
+                    if st in states and it.run_state(st):
+                        cut.add(i)
+                        break
+        return cut
+
+    def _phase_current(self, its, cut=()):
+        for i, it in its:
+            st = it.current_state_no
+            if st is None or i in cut:
+                continue
+            if not it.run_state(st):
+                it.state_time += 1
+
+    def _phase_physics(self, its):
+        self.physics(self)
+        for _i, it in its:
+            it._post_frame()
+
+    def render(self):
+        for _i, it in self.interpreters():
+            try:
+                it.adapter.render_frame()
+            except Exception:
+                pass
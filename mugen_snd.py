@@ -10,6 +10,10 @@ Lector de archivos ElecbyteSnd (.SND) estilo M.U.G.E.N / Ikemen.
     MugenSND(path).get_sound(g, n) -> SoundEntry or None
     MugenSND(path).export_wav(g, n, out_path) -> bool
     MugenSND(path).to_pygame_sound(g, n) -> pygame.mixer.Sound
+      (convert=True adapta al formato del mixer vía snd_convert)
+- MugenSND(path, lazy=True): modo índice; solo lee cabeceras y cada
+  SoundEntry.pcm_bytes es una vista (memoryview) sin copia sobre un mmap
+  del archivo. Llamar close() al terminar.
 
 Notas:
 - Replica offsets del código SSZ: WAV empieza en subHeaderOffset + 28
@@ -20,6 +24,8 @@ Notas:
 from __future__ import division, print_function
 import io
 import os
+import sys
+import mmap
 import struct
 
 try:
@@ -47,18 +53,27 @@ def _read_exact(f, n):
         raise EOFError("Unexpected EOF")
     return data
 
+def _buffer_slice(buf, off, n):
+    """Vista sin copia de buf[off:off+n] (memoryview; buffer() en Py2 para mmap)."""
+    try:
+        return memoryview(buf)[off:off + n]
+    except TypeError:
+        return buffer(buf, off, n)  # noqa: F821 (solo Py2)
+
 class SoundEntry(object):
     """ Contenedor de un sonido PCM extraído del .SND """
     __slots__ = ('group', 'number', 'channels', 'sample_rate',
-                 'bits_per_sample', 'bytes_per_sample', 'pcm_bytes')
-    def __init__(self, group, number, channels, sample_rate, bits_per_sample, pcm_bytes):
+                 'bits_per_sample', 'bytes_per_sample', 'pcm_bytes', 'pcm_offset')
+    def __init__(self, group, number, channels, sample_rate, bits_per_sample, pcm_bytes,
+                 pcm_offset=None):
         self.group = group
         self.number = number
         self.channels = channels
         self.sample_rate = sample_rate
         self.bits_per_sample = bits_per_sample
         self.bytes_per_sample = bits_per_sample // 8
-        self.pcm_bytes = pcm_bytes  # raw PCM little-endian
+        self.pcm_bytes = pcm_bytes  # raw PCM little-endian (bytes o memoryview en modo lazy)
+        self.pcm_offset = pcm_offset  # offset del PCM dentro del .SND (modo lazy)
 
     def __repr__(self):
         return ("<SoundEntry g={0} n={1} ch={2} sr={3} bits={4} len={5}>"
@@ -69,16 +84,38 @@ class SoundEntry(object):
 class MugenSND(object):
     """
     Lector de .SND. Tras load(), self.sounds[(group,number)] -> SoundEntry
+    lazy=True: mmap + índice de cabeceras; el PCM no se copia a memoria.
     """
-    def __init__(self, path):
+    def __init__(self, path, lazy=False):
         self.path = path
+        self.lazy = bool(lazy)
         self.version_lo = 0
         self.version_hi = 0
         self.num_sounds = 0
         self.first_subheader_off = 0
         self.sounds = {}  # (group, number) -> SoundEntry
+        self._mm = None
+        self.recovery = None  # stats del escaneo de recuperación (si hizo falta)
         self._load()
 
+    def close(self):
+        """Libera el mmap (modo lazy). Las vistas pcm_bytes dejan de ser válidas."""
+        mm, self._mm = self._mm, None
+        if mm is None:
+            return
+        self.sounds = {}
+        try:
+            mm.close()
+        except BufferError:
+            # aún hay vistas vivas fuera; el mmap se libera cuando se suelten
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     # -------- WAV helpers (mínimos) --------
     @staticmethod
     def _write_wav(outfile_path, entry):
@@ -185,7 +222,12 @@ class MugenSND(object):
                     fmt_found = True
                 elif cid == b'data':
                     _ensure(csize)
-                    pcm = _read_exact(f, csize)
+                    if self.lazy:
+                        # solo el rango; la vista se crea sobre el mmap
+                        pcm = (f.tell(), csize)
+                        f.seek(csize, os.SEEK_CUR)
+                    else:
+                        pcm = _read_exact(f, csize)
                     data_found = True
                 else:
                     _ensure(csize)
@@ -251,81 +293,143 @@ class MugenSND(object):
 
 
     # -------- Carga del .SND --------
+    def _make_entry(self, group, number, wav):
+        pcm = wav['data']
+        pcm_offset = None
+        if self.lazy:
+            pcm_offset, size = pcm
+            pcm = _buffer_slice(self._mm, pcm_offset, size)
+        return SoundEntry(group, number,
+                          wav['channels'],
+                          wav['sample_rate'],
+                          wav['bits_per_sample'],
+                          pcm, pcm_offset)
+
     def _load(self):
+        # Las cabeceras se leen siempre con el archivo (lecturas chicas); en modo
+        # lazy el mmap solo respalda las vistas del PCM, así abrir no toca sus páginas.
         with open(self.path, 'rb') as f:
-            sig = _read_exact(f, 12)
-            if sig != ELECBYTE_SIGNATURE:
-                raise ValueError("Not ElecbyteSnd")
-
-            self.version_lo = _u16_le(_read_exact(f, 2))
-            self.version_hi = _u16_le(_read_exact(f, 2))
-            self.num_sounds = _u32_le(_read_exact(f, 4))
-            self.first_subheader_off = _u32_le(_read_exact(f, 4))
-
-            sub_off = self.first_subheader_off
-            seen = 0
-            guard = 0
-            while sub_off and guard < (self.num_sounds + 4096):
-                guard += 1
-                f.seek(sub_off)
+            if self.lazy:
+                if os.fstat(f.fileno()).st_size < 12:
+                    raise ValueError("Not ElecbyteSnd")
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._load_from(f)
+
+    def _load_from(self, f):
+        sig = _read_exact(f, 12)
+        if sig != ELECBYTE_SIGNATURE:
+            raise ValueError("Not ElecbyteSnd")
+
+        self.version_lo = _u16_le(_read_exact(f, 2))
+        self.version_hi = _u16_le(_read_exact(f, 2))
+        self.num_sounds = _u32_le(_read_exact(f, 4))
+        self.first_subheader_off = _u32_le(_read_exact(f, 4))
+
+        sub_off = self.first_subheader_off
+        seen = 0
+        guard = 0
+        while sub_off and guard < (self.num_sounds + 4096):
+            guard += 1
+            f.seek(sub_off)
+            try:
+                hdr = _read_exact(f, 16)
+            except EOFError:
+                break
+            next_sub = _u32_le(hdr[0:4])
+            sub_len  = _u32_le(hdr[4:8])
+            group    = _s32_le(hdr[8:12])
+            number   = _s32_le(hdr[12:16])
+
+            # Solo parsea entradas válidas
+            if group >= 0 and number >= 0:
                 try:
-                    hdr = _read_exact(f, 16)
-                except EOFError:
-                    break
-                next_sub = _u32_le(hdr[0:4])
-                sub_len  = _u32_le(hdr[4:8])
-                group    = _s32_le(hdr[8:12])
-                number   = _s32_le(hdr[12:16])
+                    wav = self._parse_embedded_wav(f, sub_off, next_sub if next_sub != 0 else None, sub_len)
+                    self.sounds[(group, number)] = self._make_entry(group, number, wav)
+                    seen += 1
+                except Exception:
+                    # Silencio; si quieres depurar, imprime aquí
+                    pass
+
+            # Avanza por lista enlazada; si es inválido, intenta romper por count
+            if next_sub == 0 or next_sub == sub_off:
+                break
+            sub_off = next_sub
 
-                # Solo parsea entradas válidas
-                if group >= 0 and number >= 0:
-                    try:
-                        wav = self._parse_embedded_wav(f, sub_off, next_sub if next_sub != 0 else None, sub_len)
-                        entry = SoundEntry(group, number,
-                                           wav['channels'],
-                                           wav['sample_rate'],
-                                           wav['bits_per_sample'],
-                                           wav['data'])
-                        self.sounds[(group, number)] = entry
-                        seen += 1
-                    except Exception:
-                        # Silencio; si quieres depurar, imprime aquí
-                        pass
+        # Fallback: si la lista enlazada no dio nada, buscar firmas RIFF/WAVE
+        # en todo el archivo y validar el subheader de cada candidato.
+        if seen == 0:
+            self._recover(f)
 
-                # Avanza por lista enlazada; si es inválido, intenta romper por count
-                if next_sub == 0 or next_sub == sub_off:
+    def _recover(self, f):
+        """
+        Recuperación por firmas: mmap.find(b'RIFF') + 'WAVE' a +8 localiza los
+        WAV candidatos en bloque; el subheader se toma a -16 (layout estándar)
+        o a -28 (layout Ikemen). Se prefiere el que sea coherente con el WAV
+        (_subheader_matches); si ninguno lo es, el primero que parsee.
+        Deja estadísticas en self.recovery.
+        """
+        import time
+        clock = getattr(time, "perf_counter", time.time)
+        t0 = clock()
+        own = self._mm is None
+        try:
+            mm = self._mm if not own else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            return
+        candidates = 0
+        recovered = 0
+        try:
+            size = len(mm)
+            pos = self.first_subheader_off if 0 < self.first_subheader_off < size else 24
+            while True:
+                j = mm.find(b'RIFF', pos)
+                if j < 0:
                     break
-                sub_off = next_sub
-
-            # Fallback: si no vimos nada pero el archivo parece válido, intenta
-            # una última pasada lineal escaneando subheaders cada 16 bytes (muy defensivo).
-            if seen == 0:
-                f.seek(self.first_subheader_off)
-                # intentar hasta 8 MiB en saltos de 16 bytes
-                limit = self.first_subheader_off + 8 * 1024 * 1024
-                while f.tell() + 16 <= limit:
-                    here = f.tell()
+                pos = j + 4
+                if mm[j + 8:j + 12] != b'WAVE':
+                    continue
+                candidates += 1
+                subs = []
+                for sub in (j - 16, j - 28):
+                    if sub < 0:
+                        continue
+                    next_sub, sub_len, group, number = struct.unpack('<IIii', mm[sub:sub + 16])
+                    if group < 0 or number < 0:
+                        continue
+                    if sub == j - 16 and sub_len == 0:
+                        continue  # a -16 sin longitud suele ser relleno de otro subheader
+                    subs.append((not self._subheader_matches(mm, sub, j, next_sub, sub_len),
+                                 sub, next_sub, group, number))
+                for _bad, sub, next_sub, group, number in sorted(subs):   # estable: -16 antes
                     try:
-                        hdr = _read_exact(f, 16)
-                    except EOFError:
-                        break
-                    next_sub = _u32_le(hdr[0:4])
-                    sub_len  = _u32_le(hdr[4:8])
-                    group    = _s32_le(hdr[8:12])
-                    number   = _s32_le(hdr[12:16])
-                    if group >= 0 and number >= 0:
-                        try:
-                            wav = self._parse_embedded_wav(f, here, next_sub if next_sub != 0 else None, sub_len)
-                            entry = SoundEntry(group, number,
-                                               wav['channels'],
-                                               wav['sample_rate'],
-                                               wav['bits_per_sample'],
-                                               wav['data'])
-                            self.sounds[(group, number)] = entry
-                            seen += 1
-                        except Exception:
-                            pass
-                    f.seek(here + 16, os.SEEK_SET)
+                        # sin pista de longitud: la cota es el siguiente subheader o EOF
+                        wav = self._parse_embedded_wav(f, sub, next_sub if next_sub > sub else None, 0)
+                    except Exception:
+                        continue
+                    self.sounds[(group, number)] = self._make_entry(group, number, wav)
+                    recovered += 1
+                    break
+        finally:
+            if own:
+                mm.close()
+        self.recovery = dict(candidates=candidates, recovered=recovered,
+                             seconds=clock() - t0)
+
+    @staticmethod
+    def _subheader_matches(mm, sub, riff, next_sub, sub_len):
+        """
+        True si el subheader en 'sub' describe el WAV en 'riff': su longitud
+        es la del RIFF (+8, con o sin el propio subheader) o next_sub apunta
+        a otro subheader (RIFF a +16 o +28).
+        """
+        riff_total = struct.unpack('<I', mm[riff + 4:riff + 8])[0] + 8
+        if sub_len and sub_len in (riff_total, riff_total + (riff - sub)):
+            return True
+        if next_sub > sub:
+            for off in (16, 28):
+                if mm[next_sub + off:next_sub + off + 4] == b'RIFF':
+                    return True
+        return False
 
 
     # -------- API pública --------
@@ -344,14 +448,15 @@ class MugenSND(object):
             return False
         return self._write_wav(out_path, entry)
 
-    def to_pygame_sound(self, group, number):
+    def to_pygame_sound(self, group, number, convert=False, cache=None):
         """
         Crea pygame.mixer.Sound desde el PCM del entry.
-        Requiere que pygame.mixer esté inicializado *con el mismo formato*:
+        Sin convert, requiere que pygame.mixer esté inicializado *con el mismo formato*:
           - frecuencia = entry.sample_rate
           - tamaño = -16 si 16-bit signed; 8 si 8-bit unsigned
           - channels = entry.channels
-        Si el mixer no coincide, conviértelo o reinit.
+        convert=True: si el mixer no coincide, convierte (snd_convert, NumPy)
+        y guarda el resultado en 'cache' (ConversionCache; por defecto una global).
         """
         if not _HAS_PYGAME:
             raise RuntimeError("pygame no disponible")
@@ -371,6 +476,10 @@ class MugenSND(object):
             raise ValueError("Bits no soportados por pygame: %r" % wanted_bits)
 
         if (freq != entry.sample_rate) or (fmt != required_fmt) or (ch != entry.channels):
+            if convert and freq is not None:
+                import snd_convert
+                cache = cache if cache is not None else snd_convert.default_cache()
+                return pygame.mixer.Sound(buffer=cache.get(self, group, number, (freq, fmt, ch)))
             raise RuntimeError("Formato mixer no coincide. mixer=%r, requerido=(%d,%d,%d)" %
                                ((freq, fmt, ch), entry.sample_rate, required_fmt, entry.channels))
 
@@ -378,11 +487,51 @@ class MugenSND(object):
         return pygame.mixer.Sound(buffer=entry.pcm_bytes)
 
 
+# ---------- Benchmark (RSS / tiempo de apertura) ----------
+def _max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB, macOS bytes
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def _bench_probe(path, lazy):
+    import time
+    clock = getattr(time, "perf_counter", time.time)
+    base = _max_rss_kb()
+    t0 = clock()
+    snd = MugenSND(path, lazy=lazy)
+    dt = clock() - t0
+    print("%d %.3f %s %s" % (len(snd.sounds), dt * 1000.0, base, _max_rss_kb()))
+
+def bench(path):
+    """Abre 'path' en modo normal y lazy, cada uno en un proceso limpio."""
+    import subprocess
+    print("%-6s %8s %10s %12s" % ("modo", "sonidos", "abrir ms", "RSS +KiB"))
+    # pygame 2 imprime su banner en stdout al importarse
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    for mode in ("eager", "lazy"):
+        out = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+                                       "--probe", mode, path], env=env)
+        # la medición es la última línea (por si algo más escribe en stdout)
+        n, ms, base, peak = out.decode('ascii', 'replace').strip().splitlines()[-1].split()
+        grow = (int(peak) - int(base)) if base != "None" else None
+        print("%-6s %8s %10s %12s" % (mode, n, ms, grow))
+
+
 # ---------- Ejemplo de uso ----------
 if __name__ == '__main__':
-    import sys
+    if len(sys.argv) >= 4 and sys.argv[1] == "--probe":
+        _bench_probe(sys.argv[3], sys.argv[2] == "lazy")
+        sys.exit(0)
+    if len(sys.argv) >= 3 and sys.argv[1] == "--bench":
+        bench(sys.argv[2])
+        sys.exit(0)
     if len(sys.argv) < 2:
         print("Uso: python mugen_snd.py path_al_archivo.snd [export_dir]")
+        print("     python mugen_snd.py --bench path_al_archivo.snd")
         sys.exit(1)
 
     snd_path = sys.argv[1]
@@ -390,6 +539,8 @@ if __name__ == '__main__':
     print("Version: %d.%d  NumSounds: %d" % (snd.version_lo, snd.version_hi, snd.num_sounds))
     keys = snd.list_keys()
     print("Entradas:", len(keys))
+    if snd.recovery:
+        print("Recuperación: %(recovered)d de %(candidates)d candidatos en %(seconds).3f s" % snd.recovery)
     for k in keys[:10]:
         print(" ", k, snd.get_sound(*k))
 
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+"""
+roster_index.py — índice persistente (SQLite) de metadatos del roster (Python 2.7)
+
+Recorre una carpeta de personajes y guarda por archivo:
+- .DEF : nombre, rutas resueltas, lista de ACT (pal1..pal12)
+- .SFF : campos de cabecera (versión, grupos, imágenes, paletas) y retratos
+         (offset/longitud/tamaño/eje de las claves PORTRAIT_KEYS)
+- .AIR : cantidad de acciones, frames y warnings (parse_air)
+- .CNS : cantidad de statedefs y controllers (load_cns_files)
+
+El re-indexado es incremental: solo se re-leen los archivos cuyo mtime o tamaño
+cambió; las filas de archivos que ya no existen se borran. Las consultas
+(p. ej. characters_with_portrait_size) no tocan los assets.
+
+Uso:
+    python roster_index.py <roster.db> <carpeta_chars>
+    python roster_index.py <roster.db> --portrait WxH [image]
+"""
+
+import os, sys, struct, sqlite3
+
+from char_def import find_characters
+from sff_index import read_sprite_index, sff_version, PORTRAIT_KEYS
+from sff_v1 import read_header as read_v1_header, iter_subheaders
+try:
+    from sff_v2 import SFFv2
+    _SFFV2_AVAILABLE = True
+except Exception:
+    _SFFV2_AVAILABLE = False
+from air_parser import parse_air
+try:
+    from mugen_cns import load_cns_files
+    _CNS_AVAILABLE = True
+except Exception:
+    _CNS_AVAILABLE = False
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta(
+    key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS characters(
+    def_path TEXT PRIMARY KEY, name TEXT, char_dir TEXT,
+    sprite TEXT, anim TEXT, sound TEXT);
+CREATE TABLE IF NOT EXISTS files(
+    path TEXT PRIMARY KEY, def_path TEXT, kind TEXT,
+    mtime REAL, size INTEGER, error TEXT);
+CREATE TABLE IF NOT EXISTS acts(
+    def_path TEXT, slot INTEGER, path TEXT,
+    PRIMARY KEY(def_path, slot));
+CREATE TABLE IF NOT EXISTS sff(
+    path TEXT PRIMARY KEY, version INTEGER, num_groups INTEGER,
+    num_sprites INTEGER, num_palettes INTEGER, palette_type INTEGER);
+CREATE TABLE IF NOT EXISTS portraits(
+    path TEXT, grp INTEGER, img INTEGER, offset INTEGER, length INTEGER,
+    width INTEGER, height INTEGER, axis_x INTEGER, axis_y INTEGER,
+    PRIMARY KEY(path, grp, img));
+CREATE TABLE IF NOT EXISTS air(
+    path TEXT PRIMARY KEY, actions INTEGER, frames INTEGER, warnings INTEGER);
+CREATE TABLE IF NOT EXISTS cns(
+    path TEXT PRIMARY KEY, states INTEGER, controllers INTEGER);
+CREATE INDEX IF NOT EXISTS portraits_size ON portraits(width, height);
+"""
+
+# ----------------------------------------------------------------------------
+#  Extractores por tipo (usan los lectores existentes)
+# ----------------------------------------------------------------------------
+
+def _sff_rows(path):
+    ver = sff_version(path)
+    if ver == 2:
+        if not _SFFV2_AVAILABLE:
+            raise RuntimeError("sff_v2 no disponible")
+        sff = SFFv2(path, lazy=True)
+        try:
+            # v2 no guarda la cantidad de grupos: se cuenta en la tabla de sprites
+            table = sff._read_sprite_table()
+            groups = set(struct.unpack_from('<H', table, i * 28)[0]
+                         for i in range(len(table) // 28))
+            head = (2, len(groups), sff.num_sprites, sff.num_palettes, None)
+        finally:
+            sff.close()
+    else:
+        # solo cabecera + subheaders: sin leer los PCX
+        with open(path, 'rb') as fh:
+            h = read_v1_header(fh)
+            count = sum(1 for _sf in iter_subheaders(fh, h))
+        head = (1, h.num_groups, count, None, h.palette_type)
+    refs = read_sprite_index(path, keys=PORTRAIT_KEYS, with_dims=True)
+    ports = [(r.group, r.image, r.offset, r.length, r.width, r.height, r.axis_x, r.axis_y)
+             for r in refs if (r.group, r.image) in PORTRAIT_KEYS]
+    return head, ports
+
+def _air_row(path):
+    air = parse_air(path)
+    frames = sum(a.frame_count() for a in air.actions.values())
+    return (len(air.actions), frames, len(air.warnings))
+
+def _cns_row(path):
+    if not _CNS_AVAILABLE:
+        raise RuntimeError("mugen_cns no disponible")
+    ast = load_cns_files([path])
+    ctrls = sum(len(v) for v in ast.states.values())
+    return (len(ast.statedefs), ctrls)
+
+# ----------------------------------------------------------------------------
+
+class RosterIndex(object):
+    """
+    Índice SQLite del roster.
+        idx = RosterIndex("roster.db")
+        stats = idx.update("chars")     # incremental
+        idx.characters_with_portrait_size(25, 25)
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(_SCHEMA)
+        row = self.db.execute("SELECT value FROM meta WHERE key='schema'").fetchone()
+        if row is None:
+            self.db.execute("INSERT INTO meta VALUES('schema', ?)", (str(SCHEMA_VERSION),))
+            self.db.commit()
+
+    def close(self):
+        try:
+            self.db.close()
+        except Exception:
+            pass
+
+    # ------------------------- indexado -------------------------
+
+    def _stale(self, path):
+        """True si el archivo no está indexado o cambió (mtime/tamaño)."""
+        st = os.stat(path)
+        row = self.db.execute("SELECT mtime, size FROM files WHERE path=?", (path,)).fetchone()
+        return row is None or row[0] != st.st_mtime or row[1] != st.st_size
+
+    def _touch(self, path, def_path, kind, error=None):
+        st = os.stat(path)
+        self.db.execute("INSERT OR REPLACE INTO files VALUES(?,?,?,?,?,?)",
+                        (path, def_path, kind, st.st_mtime, st.st_size, error))
+
+    def _forget(self, path):
+        for table in ("files", "sff", "portraits", "air", "cns"):
+            self.db.execute("DELETE FROM %s WHERE path=?" % table, (path,))
+
+    def _index_file(self, path, def_path, kind):
+        self._forget(path)
+        err = None
+        try:
+            if kind == "sff":
+                head, ports = _sff_rows(path)
+                self.db.execute("INSERT INTO sff VALUES(?,?,?,?,?,?)", (path,) + head)
+                self.db.executemany("INSERT OR REPLACE INTO portraits VALUES(?,?,?,?,?,?,?,?,?)",
+                                    [(path,) + p for p in ports])
+            elif kind == "air":
+                self.db.execute("INSERT INTO air VALUES(?,?,?,?)", (path,) + _air_row(path))
+            elif kind == "cns":
+                self.db.execute("INSERT INTO cns VALUES(?,?,?)", (path,) + _cns_row(path))
+        except Exception as e:
+            err = "%s" % (e,)
+        self._touch(path, def_path, kind, err)
+
+    def update(self, chars_dir):
+        """
+        Re-indexa chars_dir de forma incremental.
+        Devuelve dict(characters, checked, updated, removed).
+        """
+        stats = dict(characters=0, checked=0, updated=0, removed=0)
+        seen = set()
+        for ch in find_characters(chars_dir):
+            stats["characters"] += 1
+            if self._stale(ch.def_path):
+                self.db.execute("INSERT OR REPLACE INTO characters VALUES(?,?,?,?,?,?)",
+                                (ch.def_path, ch.name, ch.char_dir, ch.sprite, ch.anim, ch.sound))
+                self.db.execute("DELETE FROM acts WHERE def_path=?", (ch.def_path,))
+                self.db.executemany("INSERT INTO acts VALUES(?,?,?)",
+                                    [(ch.def_path, n + 1, p) for n, p in enumerate(ch.pals)])
+                self._touch(ch.def_path, ch.def_path, "def")
+                stats["updated"] += 1
+            seen.add(ch.def_path)
+            stats["checked"] += 1
+
+            assets = [(ch.sprite, "sff"), (ch.anim, "air")] + [(p, "cns") for p in ch.cns]
+            for path, kind in assets:
+                if not path or path in seen:
+                    continue
+                seen.add(path)
+                stats["checked"] += 1
+                if self._stale(path):
+                    self._index_file(path, ch.def_path, kind)
+                    stats["updated"] += 1
+
+        # Archivos que ya no están en el roster
+        gone = [r[0] for r in self.db.execute("SELECT path FROM files") if r[0] not in seen]
+        for path in gone:
+            self._forget(path)
+            self.db.execute("DELETE FROM characters WHERE def_path=?", (path,))
+            self.db.execute("DELETE FROM acts WHERE def_path=?", (path,))
+        stats["removed"] = len(gone)
+        self.db.commit()
+        return stats
+
+    # ------------------------- consultas -------------------------
+
+    def list_characters(self):
+        """[(name, def_path, num_sprites, num_palettes_act)] ordenado por nombre."""
+        return self.db.execute("""
+            SELECT c.name, c.def_path, s.num_sprites,
+                   (SELECT COUNT(*) FROM acts a WHERE a.def_path = c.def_path)
+            FROM characters c LEFT JOIN sff s ON s.path = c.sprite
+            ORDER BY c.name""").fetchall()
+
+    def portrait(self, def_path, key=(9000, 0)):
+        """(offset, length, width, height, axis_x, axis_y) del retrato o None."""
+        return self.db.execute("""
+            SELECT p.offset, p.length, p.width, p.height, p.axis_x, p.axis_y
+            FROM characters c JOIN portraits p ON p.path = c.sprite
+            WHERE c.def_path=? AND p.grp=? AND p.img=?""",
+            (def_path, int(key[0]), int(key[1]))).fetchone()
+
+    def characters_with_portrait_size(self, width, height, image=0):
+        """[(name, def_path)] cuyo retrato (9000,image) mide width x height."""
+        return self.db.execute("""
+            SELECT c.name, c.def_path
+            FROM characters c JOIN portraits p ON p.path = c.sprite
+            WHERE p.grp=9000 AND p.img=? AND p.width=? AND p.height=?
+            ORDER BY c.name""", (int(image), int(width), int(height))).fetchall()
+
+    def acts(self, def_path):
+        return [r[0] for r in self.db.execute(
+            "SELECT path FROM acts WHERE def_path=? ORDER BY slot", (def_path,))]
+
+    def errors(self):
+        """[(path, kind, error)] de archivos que fallaron al indexar."""
+        return self.db.execute(
+            "SELECT path, kind, error FROM files WHERE error IS NOT NULL ORDER BY path").fetchall()
+
+# ----------------------------------------------------------------------------
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Uso: python roster_index.py <roster.db> <carpeta_chars>")
+        print("     python roster_index.py <roster.db> --portrait WxH [image]")
+        sys.exit(1)
+    idx = RosterIndex(sys.argv[1])
+    try:
+        if sys.argv[2] == "--portrait":
+            w, h = [int(x) for x in sys.argv[3].lower().split("x")]
+            img = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+            for name, dp in idx.characters_with_portrait_size(w, h, img):
+                print("%s  (%s)" % (name, dp))
+        else:
+            st = idx.update(sys.argv[2])
+            print("Personajes: %(characters)d  revisados: %(checked)d  "
+                  "actualizados: %(updated)d  borrados: %(removed)d" % st)
+            for path, kind, err in idx.errors()[:20]:
+                print("  ! [%s] %s: %s" % (kind, path, err))
+    finally:
+        idx.close()
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+"""
+sff_index.py — índice de sprites SFF sin decodificar + extracción selectiva (Python 2.7)
+
+Pensado para select screens: de cientos de .SFF solo se necesitan (9000,0) y
+(9000,1). En vez de abrir con SFFv1 (lee TODOS los blobs) o SFFv2 (arma toda
+la lista), aquí:
+
+- read_sprite_index(path, keys=None) -> [SpriteRef]  (solo cabeceras)
+    v1: recorre la lista enlazada de subheaders sin leer los PCX.
+    v2: lee la tabla de sprites en un único read.
+    Con keys, corta en cuanto encuentra todas las claves.
+- read_sprites(path, keys) -> {(g,i): (PIL.Image, meta)}
+    Decodifica SOLO las claves pedidas.
+- load_roster_portraits(paths, keys, processes) -> {path: {(g,i): (im, meta)}}
+    Driver para todo el roster en paralelo (multiprocessing).
+
+CLI / benchmark:
+    python sff_index.py <carpeta_chars> [procesos]
+"""
+
+import sys, time, struct, collections
+
+from sff_v1 import read_header as _read_v1_header, iter_subheaders, decode_blob_pil
+try:
+    from sff_v2 import SFFv2
+    _SFFV2_AVAILABLE = True
+except Exception:
+    _SFFV2_AVAILABLE = False
+
+PORTRAIT_KEYS = ((9000, 0), (9000, 1))
+
+SpriteRef = collections.namedtuple("SpriteRef", [
+    "index", "group", "image", "axis_x", "axis_y",
+    "offset", "length",        # blob efectivo (tras resolver links); offset None si no hay datos
+    "width", "height",         # None si no se pidieron/no se conocen
+    "linked_index",            # índice del dueño del blob si es sprite enlazado, si no None
+])
+
+def sff_version(path):
+    """Devuelve 1 o 2 según la cabecera (lanza ValueError si no es SFF)."""
+    with open(path, 'rb') as fh:
+        hdr = fh.read(16)
+    if len(hdr) < 16 or hdr[0:12] != b"ElecbyteSpr\0":
+        raise ValueError("SFF inválido (firma)")
+    verhi, verlo = struct.unpack("<BB", hdr[12:14])
+    # mismo criterio que SFFv1: (1,1) => v2 ; el byte 15 (ver_hi en v2) = 2
+    if (verhi, verlo) == (1, 1) or struct.unpack("<B", hdr[15:16])[0] == 2:
+        return 2
+    return 1
+
+def _pcx_dims(fh, blob_off, length):
+    """Ancho/alto desde la cabecera PCX (bytes 4..12) sin leer el blob completo."""
+    if length < 12:
+        return None, None
+    fh.seek(blob_off + 4)
+    b = fh.read(8)
+    if len(b) != 8:
+        return None, None
+    x1, y1, x2, y2 = struct.unpack("<HHHH", b)
+    return x2 - x1 + 1, y2 - y1 + 1
+
+# ----------------------------------------------------------------------------
+#  Índice (solo cabeceras)
+# ----------------------------------------------------------------------------
+
+def _index_v1(path, wanted, with_dims):
+    refs = []
+    with open(path, 'rb') as fh:
+        header = _read_v1_header(fh)
+        subhdr = header.subheader_size
+        by_key = {}       # (g,i) -> índice del último sprite CON datos
+        last_data = None  # índice del último sprite con datos
+        found = set()
+        for sf in iter_subheaders(fh, header):
+            key = (sf.group, sf.image)
+            if sf.length > 0:
+                owner = sf.index
+                off, length = sf.offset + subhdr, sf.length
+                by_key[key] = sf.index
+                last_data = sf.index
+                linked = None
+            else:
+                # misma heurística que SFFv1._find_owner_index
+                owner = by_key.get(key, last_data)
+                linked = owner
+                if owner is not None:
+                    off, length = refs[owner].offset, refs[owner].length
+                else:
+                    off, length = None, 0
+            refs.append(SpriteRef(
+                index=sf.index, group=sf.group, image=sf.image,
+                axis_x=sf.axis_x, axis_y=sf.axis_y,
+                offset=off, length=length, width=None, height=None,
+                linked_index=linked))
+            if wanted is not None and key in wanted and key not in found:
+                found.add(key)
+                if len(found) == len(wanted):
+                    break
+
+        if with_dims:
+            for n, r in enumerate(refs):
+                if r.offset is None:
+                    continue
+                if wanted is not None and (r.group, r.image) not in wanted:
+                    continue
+                w, h = _pcx_dims(fh, r.offset, r.length)
+                refs[n] = r._replace(width=w, height=h)
+    return refs
+
+def _v2_ref(sp):
+    # sff_v2 ya resolvió el enlace: offset/length del dueño, como en v1
+    return SpriteRef(
+        index=sp['i'], group=sp['group'], image=sp['number'],
+        axis_x=sp['xaxis'], axis_y=sp['yaxis'],
+        offset=sp['data_ofs'], length=sp['length'],
+        width=sp['w'], height=sp['h'],
+        linked_index=sp['owner'])
+
+def _index_v2(path, wanted):
+    if not _SFFV2_AVAILABLE:
+        raise RuntimeError("sff_v2 no disponible")
+    sff = SFFv2(path, lazy=True)
+    try:
+        if wanted is not None:
+            found = sff.find_sprites(wanted)
+            return sorted((_v2_ref(sp) for sp in found.values()),
+                          key=lambda r: r.index)
+        sff._read_sprite_list()
+        return [_v2_ref(sp) for sp in sff.sprites]
+    finally:
+        sff.close()
+
+def read_sprite_index(path, keys=None, with_dims=False):
+    """
+    Lista SpriteRef sin decodificar píxeles.
+    keys: iterable de (group,image) para cortar en cuanto aparezcan todas
+          (v1: la lista devuelta llega hasta la última encontrada).
+    with_dims: en v1 lee además 8 bytes de cabecera PCX para width/height
+               (v2 ya los trae en la tabla).
+    """
+    wanted = set((int(g), int(i)) for (g, i) in keys) if keys is not None else None
+    if sff_version(path) == 2:
+        return _index_v2(path, wanted)
+    return _index_v1(path, wanted, with_dims)
+
+# ----------------------------------------------------------------------------
+#  Extracción selectiva
+# ----------------------------------------------------------------------------
+
+def read_sprites(path, keys):
+    """
+    Decodifica solo los sprites pedidos.
+    Devuelve {(group,image): (PIL.Image, meta)}; claves ausentes o no
+    decodificables no aparecen. meta igual que get_pil_indexed de cada lector.
+    """
+    wanted = set((int(g), int(i)) for (g, i) in keys)
+    out = {}
+    if sff_version(path) == 2:
+        if not _SFFV2_AVAILABLE:
+            raise RuntimeError("sff_v2 no disponible")
+        sff = SFFv2(path, lazy=True)
+        try:
+            for key, sp in sff.find_sprites(wanted).items():
+                im, meta = sff.decode_sprite(sp)
+                if im is not None:
+                    out[key] = (im, meta)
+        finally:
+            sff.close()
+        return out
+
+    refs = _index_v1(path, wanted, with_dims=False)
+    with open(path, 'rb') as fh:
+        for r in refs:
+            key = (r.group, r.image)
+            if key not in wanted or key in out or r.offset is None:
+                continue
+            fh.seek(r.offset)
+            raw = fh.read(r.length)
+            im = decode_blob_pil(raw)
+            if im is None:
+                continue
+            out[key] = (im, dict(group=r.group, image=r.image,
+                                 axis_x=r.axis_x, axis_y=r.axis_y,
+                                 width=im.size[0], height=im.size[1]))
+    return out
+
+# ----------------------------------------------------------------------------
+#  Driver de roster
+# ----------------------------------------------------------------------------
+
+def _portrait_job(args):
+    path, keys = args
+    try:
+        return path, read_sprites(path, keys), None
+    except Exception as e:
+        return path, {}, "%s" % (e,)
+
+def load_roster_portraits(paths, keys=PORTRAIT_KEYS, processes=None, errors=None):
+    """
+    Extrae 'keys' de cada SFF en 'paths' repartiendo el trabajo entre procesos.
+    processes=1 -> en el proceso actual (útil para depurar).
+    errors: lista opcional donde se agregan (path, mensaje) de los que fallen.
+    """
+    jobs = [(p, tuple(keys)) for p in paths]
+    out = {}
+    if processes == 1 or len(jobs) <= 1:
+        results = map(_portrait_job, jobs)
+        pool = None
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes)
+        chunk = max(1, len(jobs) // ((processes or multiprocessing.cpu_count()) * 4))
+        results = pool.imap_unordered(_portrait_job, jobs, chunk)
+    try:
+        for path, sprites, err in results:
+            out[path] = sprites
+            if err and errors is not None:
+                errors.append((path, err))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return out
+
+# ----------------------------------------------------------------------------
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Uso: python sff_index.py <carpeta_chars> [procesos]")
+        sys.exit(1)
+    from char_def import find_characters
+
+    chars = find_characters(sys.argv[1])
+    procs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    paths = [c.sprite for c in chars if c.sprite]
+    print("Personajes:", len(chars), " SFF:", len(paths))
+
+    errs = []
+    _clock = getattr(time, "perf_counter", time.time)
+    t0 = _clock()
+    res = load_roster_portraits(paths, processes=procs, errors=errs)
+    dt = _clock() - t0
+    got = sum(len(v) for v in res.values())
+    print("Retratos decodificados: %d en %.3f s (%.1f ms/personaje)" %
+          (got, dt, 1000.0 * dt / max(1, len(paths))))
+    for p, e in errs[:10]:
+        print("  ! %s: %s" % (p, e))
@@ -108,6 +108,109 @@ def _pcx_decode_8bpp(raw_bytes):
 
     return bytes(out), w, h, pal
 
+def read_header(fh, force_subhdr_size=None):
+    """
+    Lee la cabecera SFF v1 (512 bytes) desde el inicio de fh y devuelve SFFHeader.
+    Lanza ValueError si la firma no es válida o si el archivo es SFF v2.
+    """
+    fh.seek(0, os.SEEK_SET)
+    hdr = fh.read(512)
+    if len(hdr) != 512:
+        raise IOError("EOF leyendo %d bytes" % 512)
+
+    if hdr[0:12] != b"ElecbyteSpr\0":
+        raise ValueError("SFF inválido (firma)")
+
+    verhi, verlo, verlo2, verlo3 = struct.unpack("<BBBB", hdr[12:16])
+
+    # Detecta SFF v2 explícito (M.U.G.E.N 1.0/1.1)
+    # v2 suele ser (verhi=1, verlo=1). En v1 comúnmente (verhi=0, verlo=1) o variantes antiguas.
+    if (verhi, verlo) == (1, 1):
+        raise ValueError("SFF v2 detectado (M.U.G.E.N 1.0/1.1). Este parser es SFF v1.")
+
+    num_groups   = struct.unpack("<I", hdr[16:20])[0]
+    num_images   = struct.unpack("<I", hdr[20:24])[0]
+    first_off    = struct.unpack("<I", hdr[24:28])[0]
+    subhdr_size0 = struct.unpack("<I", hdr[28:32])[0]
+    palette_type = struct.unpack("<B", hdr[32:33])[0]
+    comments     = hdr[36:512]
+
+    # subheader size: usar override o caer a 32 si viene raro (28 también existe)
+    if force_subhdr_size:
+        subhdr_size = int(force_subhdr_size)
+    else:
+        subhdr_size = subhdr_size0 if subhdr_size0 in (28, 32) else 32
+
+    return SFFHeader(
+        signature=hdr[0:12],
+        verhi=verhi, verlo=verlo, verlo2=verlo2, verlo3=verlo3,
+        num_groups=num_groups, num_images=num_images,
+        first_subfile_offset=first_off,
+        subheader_size=subhdr_size, palette_type=palette_type,
+        comments=comments
+    )
+
+def _unpack_subheader(sh, subhdr_size):
+    """
+    Subheader v1 -> (next_off, length, axis_x, axis_y, group, image, shared).
+    """
+    next_off, length, axis_x, axis_y, group, image = struct.unpack("<IIhhHH", sh[0:16])
+    shared = struct.unpack("<H", sh[16:18])[0] if subhdr_size >= 18 else 0
+    return next_off, length, axis_x, axis_y, group, image, shared
+
+def iter_subheaders(fh, header, fsize=None):
+    """
+    Recorre la lista enlazada de subheaders SIN leer los blobs PCX.
+    Produce SFFSubfile con raw=None y linked_index=None (el llamador resuelve links).
+    Se detiene en silencio ante offsets fuera de rango o ciclos.
+    """
+    if fsize is None:
+        fh.seek(0, os.SEEK_END)
+        fsize = fh.tell()
+    subhdr_size = header.subheader_size
+    off = header.first_subfile_offset
+    idx = 0
+    seen = set()
+    while off and off not in seen and off + subhdr_size <= fsize:
+        seen.add(off)
+        fh.seek(off, os.SEEK_SET)
+        sh = fh.read(subhdr_size)
+        if len(sh) != subhdr_size:
+            break
+        next_off, length, axis_x, axis_y, group, image, shared = _unpack_subheader(sh, subhdr_size)
+        yield SFFSubfile(
+            index=idx, offset=off, next_offset=next_off, length=length,
+            axis_x=axis_x, axis_y=axis_y, group=group, image=image,
+            shared=shared, raw=None, linked_index=None
+        )
+        idx += 1
+        off = next_off
+
+def decode_blob_pil(raw):
+    """
+    Decodifica un blob de subfile a PIL.Image modo 'P' (PCX 8bpp RLE con paleta
+    embebida si existe). Si no es PCX válido, intenta abrirlo con PIL "como sea".
+    Devuelve None si no hay PIL o si nada funcionó.
+    """
+    if not PIL_OK or not raw:
+        return None
+    try:
+        # bytearray para slicing eficiente
+        px, w, h, pal = _pcx_decode_8bpp(bytearray(raw))
+        im = Image.frombytes('P', (w, h), px)
+        if pal and len(pal) >= 768:
+            im.putpalette(pal[:768])
+        return im
+    except Exception:
+        # Fallback: intentar abrir con PIL "como sea" (por si no era PCX real)
+        try:
+            im = Image.open(io.BytesIO(raw)); im.load()
+            if im.mode != 'P':
+                im = im.convert('P')
+            return im
+        except Exception:
+            return None
+
 class SFFv1(object):
     """
     Parser SFF v1 tolerante:
@@ -147,40 +250,9 @@ class SFFv1(object):
     # ------------------ PARSE ------------------
 
     def _parse(self):
-        self._fh.seek(0, os.SEEK_SET)
-        hdr = self._read(512)
-
-        if hdr[0:12] != b"ElecbyteSpr\0":
-            raise ValueError("SFF inválido (firma)")
-
-        verhi, verlo, verlo2, verlo3 = struct.unpack("<BBBB", hdr[12:16])
-
-        # Detecta SFF v2 explícito (M.U.G.E.N 1.0/1.1)
-        # v2 suele ser (verhi=1, verlo=1). En v1 comúnmente (verhi=0, verlo=1) o variantes antiguas.
-        if (verhi, verlo) == (1, 1):
-            raise ValueError("SFF v2 detectado (M.U.G.E.N 1.0/1.1). Este parser es SFF v1.")
-
-        num_groups   = struct.unpack("<I", hdr[16:20])[0]
-        num_images   = struct.unpack("<I", hdr[20:24])[0]
-        first_off    = struct.unpack("<I", hdr[24:28])[0]
-        subhdr_size0 = struct.unpack("<I", hdr[28:32])[0]
-        palette_type = struct.unpack("<B", hdr[32:33])[0]
-        comments     = hdr[36:512]
-
-        # subheader size: usar override o caer a 32 si viene raro (28 también existe)
-        if self.force_subhdr_size:
-            subhdr_size = int(self.force_subhdr_size)
-        else:
-            subhdr_size = subhdr_size0 if subhdr_size0 in (28, 32) else 32
-
-        self.header = SFFHeader(
-            signature=hdr[0:12],
-            verhi=verhi, verlo=verlo, verlo2=verlo2, verlo3=verlo3,
-            num_groups=num_groups, num_images=num_images,
-            first_subfile_offset=first_off,
-            subheader_size=subhdr_size, palette_type=palette_type,
-            comments=comments
-        )
+        self.header = read_header(self._fh, self.force_subhdr_size)
+        first_off = self.header.first_subfile_offset
+        subhdr_size = self.header.subheader_size
 
         # Info de tamaño de archivo
         self._fh.seek(0, os.SEEK_END)
@@ -212,13 +284,7 @@ class SFFv1(object):
             self._fh.seek(off, os.SEEK_SET)
             sh = self._read(subhdr_size)
 
-            next_off  = struct.unpack("<I", sh[0:4])[0]
-            length    = struct.unpack("<I", sh[4:8])[0]
-            axis_x    = struct.unpack("<h", sh[8:10])[0]
-            axis_y    = struct.unpack("<h", sh[10:12])[0]
-            group     = struct.unpack("<H", sh[12:14])[0]
-            image     = struct.unpack("<H", sh[14:16])[0]
-            shared    = struct.unpack("<H", sh[16:18])[0] if subhdr_size >= 18 else 0
+            next_off, length, axis_x, axis_y, group, image, shared = _unpack_subheader(sh, subhdr_size)
 
             raw = None
             linked = None
@@ -280,13 +346,7 @@ class SFFv1(object):
                     break
 
                 try:
-                    next_off  = struct.unpack("<I", sh[0:4])[0]
-                    length    = struct.unpack("<I", sh[4:8])[0]
-                    axis_x    = struct.unpack("<h", sh[8:10])[0]
-                    axis_y    = struct.unpack("<h", sh[10:12])[0]
-                    group     = struct.unpack("<H", sh[12:14])[0]
-                    image     = struct.unpack("<H", sh[14:16])[0]
-                    shared    = struct.unpack("<H", sh[16:18])[0] if subhdr_size >= 18 else 0
+                    next_off, length, axis_x, axis_y, group, image, shared = _unpack_subheader(sh, subhdr_size)
                 except Exception as e:
                     self.warnings.append("Header inválido en off=%d: %s" % (off, e))
                     break
@@ -422,31 +482,13 @@ class SFFv1(object):
         if not raw:
             return None, None
 
-        # Intentar decodificar PCX 8bpp RLE
-        try:
-            # bytearray para slicing eficiente
-            bb = bytearray(raw)
-            px, w, h, pal = _pcx_decode_8bpp(bb)
-            im = Image.frombytes('P', (w, h), px)
-            if pal and len(pal) >= 768:
-                im.putpalette(pal[:768])
-            meta = dict(group=sf.group, image=sf.image,
-                        axis_x=sf.axis_x, axis_y=sf.axis_y,
-                        width=w, height=h)
-            return im, meta
-        except Exception:
-            # Fallback: intentar abrir con PIL "como sea" (por si no era PCX real)
-            try:
-                bio = io.BytesIO(raw)
-                im = Image.open(bio); im.load()
-                if im.mode != 'P':
-                    im = im.convert('P')
-                meta = dict(group=sf.group, image=sf.image,
-                            axis_x=sf.axis_x, axis_y=sf.axis_y,
-                            width=im.size[0], height=im.size[1])
-                return im, meta
-            except Exception:
-                return None, None
+        im = decode_blob_pil(raw)
+        if im is None:
+            return None, None
+        meta = dict(group=sf.group, image=sf.image,
+                    axis_x=sf.axis_x, axis_y=sf.axis_y,
+                    width=im.size[0], height=im.size[1])
+        return im, meta
 
     # ------------------ Export ------------------
 
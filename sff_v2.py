@@ -204,13 +204,20 @@ class SFFv2(object):
     Ahora soporta: NONE (0x00), RLE8 (0x02 SFF), RLE5 (0x03), LZ5 (0x04),
                    PNG8 (0x0A), PNG truecolor/alpha (0x0B/0x0C).
     """
-    def __init__(self, path):
-        if Image is None:
+    def __init__(self, path, lazy=False):
+        """
+        lazy=True: solo lee cabecera y palette map; la lista de sprites no se
+        construye (self.sprites = None). Usa find_sprites() para localizar
+        claves concretas sin recorrer/armar toda la lista.
+        """
+        if Image is None and not lazy:
             raise RuntimeError("Pillow requerido para SFFv2")
         self._fh = open(path, 'rb')
+        self.sprites = None
         self._parse_header()
         self._read_palette_map()
-        self._read_sprite_list()
+        if not lazy:
+            self._read_sprite_list()
 
     def close(self):
         try:
@@ -262,9 +269,10 @@ class SFFv2(object):
             0x0C: length  (u32)  -> 4*colors (r,g,b,dummy)
         """
         self.pal_entries = []
-        base = self.palette_map_base
-        for i in range(self.num_palettes):
-            ent = _read_at(self._fh, base + i*16, 16)
+        # Un solo read para todo el mapa (16 bytes por entrada)
+        table = _read_at(self._fh, self.palette_map_base, self.num_palettes * 16)
+        for i in range(len(table) // 16):
+            ent = table[i*16:(i+1)*16]
             group   = _u16(ent, 0x00)
             number  = _u16(ent, 0x02)
             dummy   = _u16(ent, 0x04)
@@ -322,60 +330,105 @@ class SFFv2(object):
         return flat[:768]
 
     # --------------- Sprite list ---------------
-    def _read_sprite_list(self):
+    def _read_sprite_table(self):
+        """Lee la tabla completa de sprite headers (28 bytes c/u) en un solo read."""
+        return _read_at(self._fh, self.sprite_list_base, self.sprite_list_size)
+
+    def _parse_sprite_entry(self, table, i):
         """
         Sprite header v2 (28 bytes):
           0x00 group(u16) 0x02 number(u16) 0x04 w(u16) 0x06 h(u16)
           0x08 xaxis(i16) 0x0A yaxis(i16) 0x0C link(u16)
           0x0E fmt(u8)    0x0F depth(u8)   0x10 ofs(u32) 0x14 len(u32)
           0x18 pal(u16)   0x1A load(u16)
+        Devuelve el dict de sprite SIN resolver enlaces (data_ofs absoluto o None;
+        owner = índice del sprite dueño del blob, None si tiene datos propios).
         """
+        (group, number, w, h, xaxis, yaxis, linked, comp, depth,
+         data_of, length, palnum, loadmd) = struct.unpack_from('<HHHHhhHBBIIHH', table, i*28)
+        data_base = self.onload_base if loadmd == 0x01 else self.ondemand_base
+        return {
+            'i': i, 'group': group, 'number': number,
+            'w': w, 'h': h, 'xaxis': xaxis, 'yaxis': yaxis,
+            'compression': comp, 'depth': depth,
+            'data_ofs': (data_base + data_of) if length > 0 else None,
+            'length': length,
+            'palette_index': palnum, 'load_mode': loadmd,
+            'linked': linked,
+            'owner': None,
+        }
+
+    def _read_sprite_list(self):
+        table = self._read_sprite_table()
         self.sprites = []
-        base = self.sprite_list_base
-        for i in range(self.num_sprites):
-            ent = _read_at(self._fh, base + i*28, 28)
-            group  = _u16(ent, 0x00)
-            number = _u16(ent, 0x02)
-            w      = _u16(ent, 0x04)
-            h      = _u16(ent, 0x06)
-            xaxis  = struct.unpack('<h', ent[0x08:0x0A])[0]
-            yaxis  = struct.unpack('<h', ent[0x0A:0x0C])[0]
-            linked = _u16(ent, 0x0C)
-            comp   = _u8 (ent, 0x0E)
-            depth  = _u8 (ent, 0x0F)
-            data_of= _u32(ent, 0x10)
-            length = _u32(ent, 0x14)
-            palnum = _u16(ent, 0x18)
-            loadmd = _u16(ent, 0x1A)
-
-            data_base = self.onload_base if loadmd == 0x01 else self.ondemand_base
-            eff = None
-            if length > 0:
-                eff = data_base + data_of
-            else:
-                # heredar del enlace si es válido y ya leído
-                if 0 <= linked < i:
-                    eff = self.sprites[linked]['data_ofs']
-                    # heredar paleta también (como shareCopy en SSZ)
-                    palnum = self.sprites[linked]['palette_index']
-                else:
-                    # fallback al último con datos (no ideal pero común)
-                    # busca hacia atrás el primer data_ofs no None
-                    eff = None
-                    for j in range(i-1, -1, -1):
-                        if self.sprites[j]['data_ofs'] is not None:
-                            eff = self.sprites[j]['data_ofs']
-                            palnum = self.sprites[j]['palette_index']
-                            break
-
-            self.sprites.append({
-                'i': i, 'group': group, 'number': number,
-                'w': w, 'h': h, 'xaxis': xaxis, 'yaxis': yaxis,
-                'compression': comp, 'depth': depth,
-                'data_ofs': eff, 'length': length,
-                'palette_index': palnum, 'load_mode': loadmd,
-                'linked': linked,
-            })
+        for i in range(len(table) // 28):
+            sp = self._parse_sprite_entry(table, i)
+            if sp['length'] == 0:
+                self._resolve_link(sp, self.sprites)
+            self.sprites.append(sp)
+
+    def _resolve_link(self, sp, prev):
+        """
+        Sprite con length==0: hereda data_ofs, length y paleta del dueño del
+        blob (como shareCopy en SSZ) y lo anota en 'owner'.
+        prev: sprites 0..i-1 ya resueltos (self.sprites, o el prefijo que arma
+        find_sprites en modo lazy), así ambos caminos resuelven igual.
+        """
+        i, linked = sp['i'], sp['linked']
+        src = None
+        # heredar del enlace si es válido y ya leído
+        if 0 <= linked < i:
+            src = prev[linked]
+        else:
+            # fallback al último con datos (no ideal pero común)
+            # busca hacia atrás el primer data_ofs no None
+            for j in range(i-1, -1, -1):
+                if prev[j]['data_ofs'] is not None:
+                    src = prev[j]
+                    break
+        if src is not None:
+            sp['data_ofs'] = src['data_ofs']
+            sp['length'] = src['length']
+            sp['palette_index'] = src['palette_index']
+            if src['data_ofs'] is not None:
+                sp['owner'] = src['i'] if src['owner'] is None else src['owner']
+
+    def find_sprites(self, keys):
+        """
+        Localiza solo los sprites pedidos: keys = iterable de (group, number).
+        Devuelve {(group, number): sprite_dict} con enlaces resueltos (mismas
+        reglas que _read_sprite_list). Claves ausentes no aparecen.
+        No construye self.sprites; funciona en modo lazy.
+        """
+        wanted = set((int(g), int(n)) for (g, n) in keys)
+        if self.sprites is not None:
+            out = {}
+            for sp in self.sprites:
+                k = (sp['group'], sp['number'])
+                if k in wanted and k not in out:
+                    out[k] = sp
+            return out
+
+        table = self._read_sprite_table()
+        count = len(table) // 28
+        out = {}
+        prefix = []   # sprites 0..n-1 resueltos; solo se arma si hay enlaces
+        for i in range(count):
+            k = struct.unpack_from('<HH', table, i*28)
+            if k not in wanted or k in out:
+                continue
+            sp = self._parse_sprite_entry(table, i)
+            if sp['length'] == 0:
+                for j in range(len(prefix), i):
+                    prev = self._parse_sprite_entry(table, j)
+                    if prev['length'] == 0:
+                        self._resolve_link(prev, prefix)
+                    prefix.append(prev)
+                self._resolve_link(sp, prefix)
+            out[k] = sp
+            if len(out) == len(wanted):
+                break
+        return out
 
     # --------------- API: imagen indexada PIL ---------------
     def get_pil_indexed(self, index):
@@ -384,9 +437,16 @@ class SFFv2(object):
         - Para 0x0A (PNG8): respeta paleta del PNG (modo 'P').
         - Para 0x0B/0x0C (PNG truecolor): devuelve RGBA y NO aplica paleta.
         """
-        if index < 0 or index >= len(self.sprites):
+        if self.sprites is None or index < 0 or index >= len(self.sprites):
             return None, None
-        sp = self.sprites[index]
+        return self.decode_sprite(self.sprites[index])
+
+    def decode_sprite(self, sp):
+        """
+        Decodifica un sprite_dict (de self.sprites o de find_sprites) -> (PIL.Image, meta).
+        """
+        if Image is None:
+            raise RuntimeError("Pillow requerido para SFFv2")
         if sp['data_ofs'] is None or sp['length'] == 0:
             return None, None
 
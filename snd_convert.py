@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, print_function
+"""
+snd_convert.py — conversión de formato / remuestreo de SoundEntry (Python 2.7)
+
+MugenSND.to_pygame_sound exige que el mixer tenga exactamente la frecuencia,
+bits y canales del sonido. Aquí se convierte el PCM al formato activo:
+
+- 8 bits unsigned / 16 bits signed de entrada
+- remuestreo lineal (np.interp) a la frecuencia del mixer
+- mono <-> estéreo (duplicar / promediar)
+- salida en el tamaño de pygame: 8, -8, 16, -16, 32 (float32) o -32
+
+ConversionCache guarda el resultado por (group, number, formato_mixer) y
+puede convertir todo un .SND en un hilo de fondo al cargar el personaje:
+
+    cache = ConversionCache()
+    cache.prepare_async(snd)                 # usa pygame.mixer.get_init()
+    ...
+    snd.to_pygame_sound(0, 1, convert=True, cache=cache)
+
+Requiere NumPy.
+"""
+
+import threading
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except Exception:
+    _HAS_NUMPY = False
+
+try:
+    import pygame
+    _HAS_PYGAME = True
+except Exception:
+    _HAS_PYGAME = False
+
+# tamaño pygame -> dtype numpy (little-endian)
+_OUT_DTYPES = {
+    8: 'u1', -8: 'i1',
+    16: '<u2', -16: '<i2',
+    32: '<f4', -32: '<i4',
+}
+
+def _need_numpy():
+    if not _HAS_NUMPY:
+        raise RuntimeError("numpy no disponible")
+
+def mixer_format():
+    """(frecuencia, tamaño, canales) del mixer de pygame o None."""
+    if not _HAS_PYGAME:
+        return None
+    return pygame.mixer.get_init()
+
+def entry_format(entry):
+    """Formato pygame equivalente al SoundEntry (8 bits = unsigned, 16 = signed)."""
+    return (entry.sample_rate, -16 if entry.bits_per_sample == 16 else 8, entry.channels)
+
+# ----------------------------------------------------------------------------
+#  Conversión
+# ----------------------------------------------------------------------------
+
+def pcm_to_float(entry):
+    """PCM del entry -> ndarray float32 (frames, canales) en [-1, 1]."""
+    _need_numpy()
+    if entry.bits_per_sample == 16:
+        a = np.frombuffer(entry.pcm_bytes, dtype='<i2', count=len(entry.pcm_bytes) // 2)
+        a = a.astype(np.float32) * (1.0 / 32768.0)
+    elif entry.bits_per_sample == 8:
+        a = np.frombuffer(entry.pcm_bytes, dtype=np.uint8)
+        a = (a.astype(np.float32) - 128.0) * (1.0 / 128.0)
+    else:
+        raise ValueError("Bits no soportados: %r" % entry.bits_per_sample)
+    ch = max(1, int(entry.channels))
+    frames = a.shape[0] // ch
+    return a[:frames * ch].reshape(frames, ch)
+
+def resample(samples, src_rate, dst_rate):
+    """Remuestreo lineal de (frames, canales) de src_rate a dst_rate."""
+    _need_numpy()
+    if src_rate == dst_rate or samples.shape[0] == 0:
+        return samples
+    n_src = samples.shape[0]
+    n_dst = max(1, int(round(n_src * float(dst_rate) / src_rate)))
+    # posición de cada muestra destino en el eje de la fuente
+    x = np.arange(n_dst, dtype=np.float64) * (float(src_rate) / dst_rate)
+    xp = np.arange(n_src, dtype=np.float64)
+    out = np.empty((n_dst, samples.shape[1]), dtype=np.float32)
+    for c in range(samples.shape[1]):
+        out[:, c] = np.interp(x, xp, samples[:, c])
+    return out
+
+def remix(samples, channels):
+    """Ajusta la cantidad de canales: duplica (up-mix) o promedia (down-mix)."""
+    _need_numpy()
+    src = samples.shape[1]
+    channels = int(channels)
+    if src == channels:
+        return samples
+    if channels == 1:
+        return samples.mean(axis=1, dtype=np.float32).reshape(-1, 1)
+    if src == 1:
+        return np.repeat(samples, channels, axis=1)
+    # N -> M genérico: mezclar a mono y repartir
+    mono = samples.mean(axis=1, dtype=np.float32).reshape(-1, 1)
+    return np.repeat(mono, channels, axis=1)
+
+def float_to_pcm(samples, size):
+    """(frames, canales) float en [-1,1] -> bytes intercalados en el tamaño pygame 'size'."""
+    _need_numpy()
+    dt = _OUT_DTYPES.get(int(size))
+    if dt is None:
+        raise ValueError("Formato de mixer no soportado: %r" % (size,))
+    x = np.clip(samples, -1.0, 1.0)
+    if size == 32:
+        out = x.astype(dt)
+    elif size == 8:
+        out = np.round(x * 127.0 + 128.0).astype(dt)
+    elif size == -8:
+        out = np.round(x * 127.0).astype(dt)
+    elif size == 16:
+        out = np.round(x * 32767.0 + 32768.0).astype(dt)
+    elif size == -16:
+        out = np.round(x * 32767.0).astype(dt)
+    else:  # -32
+        out = np.round(x * 2147483647.0).astype(dt)
+    return out.tobytes()
+
+def convert_entry(entry, freq, size, channels):
+    """PCM del entry convertido al formato (freq, size, channels) de pygame.mixer."""
+    if entry_format(entry) == (freq, size, channels):
+        pcm = entry.pcm_bytes
+        return pcm.tobytes() if hasattr(pcm, 'tobytes') else bytes(pcm)
+    x = pcm_to_float(entry)
+    x = remix(x, channels)
+    x = resample(x, entry.sample_rate, freq)
+    return float_to_pcm(x, size)
+
+# ----------------------------------------------------------------------------
+#  Caché
+# ----------------------------------------------------------------------------
+
+class ConversionCache(object):
+    """
+    Caché (group, number, (freq, size, channels)) -> bytes convertidos.
+    Segura para usar desde el hilo de prepare_async y el hilo principal.
+    """
+    def __init__(self):
+        self._d = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def get(self, snd, group, number, fmt=None):
+        """PCM convertido (bytes) o None si el sonido no existe."""
+        fmt = tuple(fmt or mixer_format() or ())
+        if len(fmt) != 3:
+            raise RuntimeError("pygame.mixer no inicializado")
+        key = (int(group), int(number), fmt)
+        with self._lock:
+            data = self._d.get(key)
+        if data is not None:
+            return data
+        entry = snd.get_sound(group, number)
+        if entry is None:
+            return None
+        data = convert_entry(entry, *fmt)
+        with self._lock:
+            self._d.setdefault(key, data)
+        return data
+
+    def prepare(self, snd, keys=None, fmt=None):
+        """Convierte 'keys' (o todo el .SND) en el hilo actual."""
+        fmt = tuple(fmt or mixer_format() or ())
+        for g, n in (keys if keys is not None else snd.list_keys()):
+            self.get(snd, g, n, fmt)
+
+    def prepare_async(self, snd, keys=None, fmt=None):
+        """Como prepare() pero en un hilo daemon; devuelve el Thread."""
+        fmt = tuple(fmt or mixer_format() or ())
+        t = threading.Thread(target=self.prepare, args=(snd, keys, fmt))
+        t.daemon = True
+        t.start()
+        self._threads.append(t)
+        return t
+
+    def wait(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+    def clear(self):
+        with self._lock:
+            self._d.clear()
+
+    def __len__(self):
+        return len(self._d)
+
+_DEFAULT_CACHE = None
+
+def default_cache():
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = ConversionCache()
+    return _DEFAULT_CACHE
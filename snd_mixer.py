@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, print_function
+"""
+snd_mixer.py — mezclador de audio por software, determinista (Python 2.7)
+
+Sirve como servicio 'sound' de CNSAdapterPygame sin pygame.mixer:
+    .play(value, channel=0, volume=1.0, lowpriority=False, pan=0)
+    .stop(channel=None)
+    .pan(channel, pan)
+y mezcla en bloques fijos sincronizados con los ticks del intérprete:
+
+    mixer = SoftwareMixer(MugenSND("kfm.snd", lazy=True))
+    adapter = CNSAdapterPygame(entity, layers, sound=mixer)
+    for _ in range(99 * 60):
+        interp.tick()
+        mixer.tick()                      # un bloque de rate/60 muestras
+    mixer.write_wav("round.wav")
+
+Semántica de canales estilo M.U.G.E.N:
+- channel >= 0: un sonido nuevo reemplaza al que suena en ese canal,
+  salvo lowpriority=True con el canal ocupado (entonces no suena).
+- channel -1: voz libre (no se puede detener individualmente).
+- pan: -128..127 (izquierda..derecha); volume: multiplicador lineal.
+- value: (group, number) o "g, n"; prefijo 'F' = SND común (common=).
+
+Requiere NumPy (ver snd_convert).
+"""
+
+import sys, wave
+
+import snd_convert
+from snd_convert import pcm_to_float, remix, resample
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except Exception:
+    _HAS_NUMPY = False
+
+def parse_sound_value(value):
+    """
+    (group, number, common) desde el 'value' de PlaySnd.
+    Acepta (g, n), [g, n], "g,n", "Fg,n" / ("F5", 0). Devuelve None si no se entiende.
+    """
+    if value is None:
+        return None
+    common = False
+    if isinstance(value, (tuple, list)):
+        parts = list(value)
+    else:
+        parts = str(value).split(",")
+    if len(parts) < 2:
+        return None
+    g, n = parts[0], parts[1]
+    if not isinstance(g, (int, float)):
+        g = str(g).strip()
+        if g[:1] in ("F", "f"):
+            common = True
+            g = g[1:]
+        elif g[:1] in ("S", "s"):
+            g = g[1:]
+    try:
+        return int(float(g)), int(float(n)), common
+    except (TypeError, ValueError):
+        return None
+
+def pan_gains(pan):
+    """Ganancias (izq, der) para pan -128..127 (paneo lineal: el lado opuesto se atenúa)."""
+    p = max(-1.0, min(1.0, float(pan) / 128.0))
+    return (1.0 - p if p > 0 else 1.0), (1.0 + p if p < 0 else 1.0)
+
+class _Voice(object):
+    __slots__ = ('samples', 'pos', 'volume', 'gain_l', 'gain_r', 'channel')
+    def __init__(self, samples, channel, volume, pan):
+        self.samples = samples
+        self.pos = 0
+        self.channel = channel
+        self.volume = float(volume)
+        self.gain_l, self.gain_r = pan_gains(pan)
+
+class SoftwareMixer(object):
+    """
+    Mezclador estéreo float32. rate/ticks_per_sec no tienen que ser enteros
+    entre sí: el tamaño de bloque se reparte con acumulador fraccional.
+    record=True guarda todos los bloques para write_wav()/buffer().
+    """
+    def __init__(self, snd, rate=44100, ticks_per_sec=60, common=None,
+                 record=True, max_voices=64):
+        if not _HAS_NUMPY:
+            raise RuntimeError("numpy no disponible")
+        self.snd = snd
+        self.common = common
+        self.rate = int(rate)
+        self.ticks_per_sec = int(ticks_per_sec)
+        self.max_voices = int(max_voices)
+        self.record = bool(record)
+        self._voices = []
+        self._blocks = []
+        self._frac = 0
+        self._samples = {}   # (common, g, n) -> ndarray (frames, 2) al rate del mixer
+        self.ticks = 0
+
+    # ------------------------- datos -------------------------
+
+    def _get_samples(self, g, n, common):
+        key = (common, g, n)
+        s = self._samples.get(key)
+        if s is None:
+            src = self.common if common else self.snd
+            entry = src.get_sound(g, n) if src is not None else None
+            if entry is None:
+                return None
+            s = resample(remix(pcm_to_float(entry), 2), entry.sample_rate, self.rate)
+            s = np.ascontiguousarray(s, dtype=np.float32)
+            self._samples[key] = s
+        return s
+
+    def preload(self, keys=None, common=False):
+        """Convierte de antemano (evita el costo en el primer PlaySnd)."""
+        src = self.common if common else self.snd
+        for g, n in (keys if keys is not None else src.list_keys()):
+            self._get_samples(g, n, common)
+
+    # ------------------------- servicio 'sound' -------------------------
+
+    def play(self, value, channel=0, volume=1.0, lowpriority=False, pan=0):
+        key = parse_sound_value(value)
+        if key is None:
+            return False
+        samples = self._get_samples(*key)
+        if samples is None:
+            return False
+        channel = int(channel if channel is not None else -1)
+        if channel >= 0:
+            busy = [v for v in self._voices if v.channel == channel]
+            if busy and lowpriority:
+                return False
+            for v in busy:
+                self._voices.remove(v)
+        if len(self._voices) >= self.max_voices:
+            self._voices.pop(0)   # roba la voz más vieja
+        self._voices.append(_Voice(samples, channel, volume, pan))
+        return True
+
+    def stop(self, channel=None):
+        if channel is None or int(channel) < 0:
+            self._voices = []
+        else:
+            channel = int(channel)
+            self._voices = [v for v in self._voices if v.channel != channel]
+
+    def pan(self, channel, pan):
+        channel = int(channel)
+        for v in self._voices:
+            if v.channel == channel:
+                v.gain_l, v.gain_r = pan_gains(pan)
+
+    def is_playing(self, channel=None):
+        if channel is None:
+            return bool(self._voices)
+        return any(v.channel == int(channel) for v in self._voices)
+
+    # ------------------------- mezcla -------------------------
+
+    def block_size(self):
+        """Muestras del próximo bloque (sin avanzar)."""
+        return (self._frac + self.rate) // self.ticks_per_sec
+
+    def tick(self):
+        """Mezcla un tick; devuelve el bloque (frames, 2) float32."""
+        n = self.block_size()
+        self._frac = (self._frac + self.rate) % self.ticks_per_sec
+        out = np.zeros((n, 2), dtype=np.float32)
+        alive = []
+        for v in self._voices:
+            s = v.samples
+            take = min(n, s.shape[0] - v.pos)
+            if take > 0:
+                chunk = s[v.pos:v.pos + take]
+                out[:take, 0] += chunk[:, 0] * (v.volume * v.gain_l)
+                out[:take, 1] += chunk[:, 1] * (v.volume * v.gain_r)
+                v.pos += take
+            if v.pos < s.shape[0]:
+                alive.append(v)
+        self._voices = alive
+        if self.record:
+            self._blocks.append(out)
+        self.ticks += 1
+        return out
+
+    def run(self, ticks):
+        for _ in range(int(ticks)):
+            self.tick()
+
+    # ------------------------- salida -------------------------
+
+    def buffer(self, size=-16):
+        """Todo lo grabado como PCM intercalado en el tamaño pygame 'size'."""
+        if not self._blocks:
+            return b''
+        return snd_convert.float_to_pcm(np.concatenate(self._blocks), size)
+
+    def write_wav(self, path):
+        """Escribe lo grabado como WAV PCM 16 bits estéreo."""
+        wf = wave.open(path, 'wb')
+        try:
+            wf.setnchannels(2)
+            wf.setsampwidth(2)
+            wf.setframerate(self.rate)
+            wf.writeframes(self.buffer(-16))
+        finally:
+            wf.close()
+        return True
+
+    def clear_recording(self):
+        self._blocks = []
+
+# ----------------------------------------------------------------------------
+if __name__ == '__main__':
+    import time
+    from mugen_snd import MugenSND
+    if len(sys.argv) < 2:
+        print("Uso: python snd_mixer.py <archivo.snd> [salida.wav] [segundos]")
+        sys.exit(1)
+    _clock = getattr(time, "perf_counter", time.time)
+    secs = float(sys.argv[3]) if len(sys.argv) > 3 else 99.0
+    snd = MugenSND(sys.argv[1], lazy=True)
+    keys = snd.list_keys()
+    mixer = SoftwareMixer(snd)
+    t0 = _clock()
+    mixer.preload()
+    t1 = _clock()
+    ticks = int(secs * 60)
+    for t in range(ticks):
+        # disparo sintético: un sonido cada 7 ticks en 4 canales rotando
+        if keys and t % 7 == 0:
+            mixer.play(keys[(t // 7) % len(keys)], channel=(t // 7) % 4, pan=(t % 255) - 128)
+        mixer.tick()
+    t2 = _clock()
+    print("Sonidos: %d  preload: %.3f s" % (len(keys), t1 - t0))
+    print("Render de %.1f s de audio en %.3f s (%.1fx tiempo real)" % (
+        secs, t2 - t1, secs / max(1e-9, t2 - t1)))
+    if len(sys.argv) > 2:
+        mixer.write_wav(sys.argv[2])
+        print("WAV:", sys.argv[2])
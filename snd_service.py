@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, print_function
+"""
+snd_service.py — servicio 'sound' sobre pygame.mixer para CNSAdapterPygame (Python 2.7)
+
+- Caché de pygame.mixer.Sound por (common, group, number): precarga completa
+  al cargar el personaje (preload()) o perezosa con LRU (cache_size).
+- Pool fijo de canales pygame con semántica M.U.G.E.N:
+    channel >= 0 : canal lógico; un PlaySnd nuevo corta al anterior del mismo
+                   canal, salvo lowpriority=1 con el canal ocupado (se descarta).
+    channel -1   : cualquier voz libre.
+  Si el pool está lleno se roba la voz más vieja (voice stealing).
+- Métricas por tick: tiempo gastado dentro del servicio (creación/lookup de
+  Sound + asignación de canal), plays, hits/misses de caché, robos y descartes.
+
+    svc = PygameSoundService(MugenSND("kfm.snd", lazy=True), num_channels=16)
+    svc.preload()
+    adapter = CNSAdapterPygame(entity, layers, sound=svc)
+    ...
+    interp.tick(); svc.on_tick()
+    print(svc.metrics())
+"""
+
+import time
+from collections import OrderedDict
+
+from snd_mixer import parse_sound_value, pan_gains
+
+try:
+    import pygame
+    _HAS_PYGAME = True
+except Exception:
+    _HAS_PYGAME = False
+
+_clock = getattr(time, "perf_counter", time.time)
+
+class PygameSoundService(object):
+    def __init__(self, snd, common=None, num_channels=16, cache_size=128,
+                 conversion_cache=None):
+        """
+        snd: MugenSND del personaje; common: MugenSND común (prefijo 'F') o None.
+        num_channels: tamaño del pool (pygame.mixer.set_num_channels).
+        cache_size: máximo de Sound en la LRU (preload() la desactiva).
+        conversion_cache: snd_convert.ConversionCache si el mixer no coincide con el SND.
+        """
+        if not _HAS_PYGAME:
+            raise RuntimeError("pygame no disponible")
+        if not pygame.mixer.get_init():
+            raise RuntimeError("pygame.mixer no inicializado")
+        self.snd = snd
+        self.common = common
+        self.cache_size = cache_size
+        self.conversion_cache = conversion_cache
+        self._sounds = OrderedDict()         # (common, g, n) -> Sound
+        pygame.mixer.set_num_channels(int(num_channels))
+        self._pool = [pygame.mixer.Channel(i) for i in range(int(num_channels))]
+        self._slot_of = {}                   # canal lógico -> índice del pool
+        self._owner = [None] * len(self._pool)   # índice del pool -> canal lógico (o -1)
+        self._started = [0] * len(self._pool)    # orden de inicio (para robar la más vieja)
+        self._volume = [1.0] * len(self._pool)   # volumen del último play (para SndPan)
+        self._seq = 0
+        self._stats = dict(plays=0, hits=0, misses=0, steals=0, dropped=0)
+        self._tick_time = 0.0
+        self._ticks = 0
+        self._total_time = 0.0
+        self._max_tick = 0.0
+        self._last_tick = 0.0
+
+    # ------------------------- caché de Sound -------------------------
+
+    def _make_sound(self, common, g, n):
+        src = self.common if common else self.snd
+        if src is None or src.get_sound(g, n) is None:
+            return None
+        return src.to_pygame_sound(g, n, convert=True, cache=self.conversion_cache)
+
+    def _get_sound(self, common, g, n):
+        key = (common, g, n)
+        s = self._sounds.get(key)
+        if s is not None:
+            self._stats["hits"] += 1
+            del self._sounds[key]
+            self._sounds[key] = s
+            return s
+        self._stats["misses"] += 1
+        s = self._make_sound(common, g, n)
+        if s is None:
+            return None
+        self._sounds[key] = s
+        if self.cache_size is not None:
+            while len(self._sounds) > self.cache_size:
+                self._sounds.popitem(last=False)
+        return s
+
+    def preload(self, keys=None, common=False):
+        """Crea todos los Sound de antemano (y desactiva la expulsión LRU)."""
+        self.cache_size = None
+        src = self.common if common else self.snd
+        for g, n in (keys if keys is not None else src.list_keys()):
+            key = (common, g, n)
+            if key not in self._sounds:
+                s = self._make_sound(common, g, n)
+                if s is not None:
+                    self._sounds[key] = s
+
+    # ------------------------- pool de canales -------------------------
+
+    def _oldest(self, candidates):
+        return min(candidates, key=lambda i: self._started[i])
+
+    def _slot_for(self, channel, lowpriority):
+        """Índice del pool para el canal lógico (None = descartar el sonido)."""
+        if channel >= 0:
+            i = self._slot_of.get(channel)
+            if i is not None and self._owner[i] == channel:
+                if lowpriority and self._pool[i].get_busy():
+                    return None
+                return i
+        free = [i for i, ch in enumerate(self._pool) if not ch.get_busy()]
+        # preferir slots libres sin canal lógico asociado
+        unbound = [i for i in free if self._owner[i] is None or self._owner[i] < 0]
+        if unbound or free:
+            i = (unbound or free)[0]
+        else:
+            i = self._oldest(range(len(self._pool)))
+            self._stats["steals"] += 1
+        prev = self._owner[i]
+        if prev is not None and prev >= 0 and self._slot_of.get(prev) == i:
+            del self._slot_of[prev]
+        self._owner[i] = channel
+        if channel >= 0:
+            self._slot_of[channel] = i
+        return i
+
+    # ------------------------- servicio 'sound' -------------------------
+
+    def play(self, value, channel=0, volume=1.0, lowpriority=False, pan=0):
+        t0 = _clock()
+        try:
+            key = parse_sound_value(value)
+            if key is None:
+                return False
+            g, n, common = key
+            sound = self._get_sound(common, g, n)
+            if sound is None:
+                return False
+            channel = int(channel if channel is not None else -1)
+            i = self._slot_for(channel, lowpriority)
+            if i is None:
+                self._stats["dropped"] += 1
+                return False
+            ch = self._pool[i]
+            ch.play(sound)
+            gl, gr = pan_gains(pan)
+            v = self._volume[i] = max(0.0, min(1.0, float(volume)))
+            ch.set_volume(v * gl, v * gr)
+            self._seq += 1
+            self._started[i] = self._seq
+            self._stats["plays"] += 1
+            return True
+        finally:
+            self._tick_time += _clock() - t0
+
+    def stop(self, channel=None):
+        if channel is None or int(channel) < 0:
+            for ch in self._pool:
+                ch.stop()
+            return
+        i = self._slot_of.get(int(channel))
+        if i is not None:
+            self._pool[i].stop()
+
+    def pan(self, channel, pan):
+        i = self._slot_of.get(int(channel))
+        if i is None:
+            return
+        gl, gr = pan_gains(pan)
+        v = self._volume[i]
+        self._pool[i].set_volume(v * gl, v * gr)
+
+    # ------------------------- métricas -------------------------
+
+    def on_tick(self):
+        """Cierra el tick actual de métricas (llamar una vez por tick del intérprete)."""
+        dt = self._tick_time
+        self._tick_time = 0.0
+        self._ticks += 1
+        self._total_time += dt
+        self._last_tick = dt
+        if dt > self._max_tick:
+            self._max_tick = dt
+
+    def metrics(self):
+        m = dict(self._stats)
+        m.update(ticks=self._ticks,
+                 cached_sounds=len(self._sounds),
+                 last_tick_ms=self._last_tick * 1000.0,
+                 max_tick_ms=self._max_tick * 1000.0,
+                 avg_tick_ms=(self._total_time / self._ticks * 1000.0) if self._ticks else 0.0)
+        return m
+
+    def reset_metrics(self):
+        for k in self._stats:
+            self._stats[k] = 0
+        self._ticks = 0
+        self._total_time = self._max_tick = self._last_tick = 0.0
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""[Statedef]/[Movement] de un .cns real -> physics.Physics sobre el World."""
+
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mugen_cns.parser import parse_cns_text
+from mugen_cns.params import statedef_flags
+from mugen_cns.cns_interpreter import CNSInterpreter, BaseAdapter
+from mugen_cns.physics import Physics
+from mugen_cns.world import World
+
+CNS = """
+[Movement]
+yaccel = .5
+stand.friction = .8
+
+[Statedef 0]
+type = S
+physics = S
+anim = 0
+
+[State 0, 1]
+type = Null
+trigger1 = 1
+
+[Statedef 50]
+type    = A   ; comentario
+physics = A
+anim = 41
+ctrl = 0
+"""
+
+class _Rt(object):
+    # lo que World/CNSInterpreter leen del runtime
+    def __init__(self, ast):
+        self.ast = ast
+
+class StatedefPhysicsTest(unittest.TestCase):
+    def setUp(self):
+        self.ast = parse_cns_text(CNS)
+
+    def test_values_end_at_newline(self):
+        self.assertEqual(statedef_flags(self.ast.statedefs[0]), {"type": "s", "physics": "s"})
+        self.assertEqual(statedef_flags(self.ast.statedefs[50]), {"type": "a", "physics": "a"})
+        self.assertEqual(self.ast.states[0][0].ctype, "Null")
+
+    def _world(self, stateno, use_numpy):
+        plan = [{"stateno": st, "statedef": statedef_flags(sd),
+                 "controllers": [{"name": "Null", "params": {}, "raw": None}]}
+                for st, sd in self.ast.statedefs.items()]
+        it = CNSInterpreter(_Rt(self.ast), BaseAdapter())
+        it.load_plan(plan)
+        it.change_state(stateno)
+        world = World(physics=Physics(ground_y=0.0, use_numpy=use_numpy))
+        world.add(it)
+        return world, it
+
+    def _check_air(self, use_numpy):
+        world, it = self._world(50, use_numpy)
+        it.ctx["pos"][1] = -100.0
+        it.ctx["vel"][0] = 2.0
+        world.tick()
+        self.assertAlmostEqual(it.ctx["vel"][1], 0.5)      # yaccel del [Movement]
+        self.assertAlmostEqual(it.ctx["vel"][0], 2.0)      # sin fricción en el aire
+        world.tick()
+        self.assertAlmostEqual(it.ctx["pos"][1], -99.5)
+
+    def _check_stand(self, use_numpy):
+        world, it = self._world(0, use_numpy)
+        it.ctx["vel"][0] = 10.0
+        it.ctx["vel"][1] = 3.0
+        world.tick()
+        self.assertAlmostEqual(it.ctx["vel"][0], 8.0)      # stand.friction
+        self.assertEqual(it.ctx["pos"][1], 0.0)            # suelo
+        self.assertEqual(it.ctx["vel"][1], 0.0)
+
+    def test_air_state_gets_gravity(self):
+        self._check_air(False)
+
+    def test_stand_state_gets_friction_and_ground(self):
+        self._check_stand(False)
+
+    def test_numpy_step_matches(self):
+        if not Physics(use_numpy=True).use_numpy:
+            self.skipTest("NumPy no instalado")
+        self._check_air(True)
+        self._check_stand(True)
+
+if __name__ == '__main__':
+    unittest.main()
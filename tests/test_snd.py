@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""mugen_snd.MugenSND (recuperación con la cabecera dañada) y PlaySnd de un CNS hasta el mixer."""
+
+import os, sys, struct, shutil, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mugen_snd import MugenSND, ELECBYTE_SIGNATURE
+from snd_mixer import SoftwareMixer, _HAS_NUMPY
+from mugen_cns.headless import load_character, new_match, run_match
+
+KEYS = [(1, 0), (5, 3), (7, 2)]
+
+def _wav(n):
+    # PCM 8 bits mono; datos no nulos para que no parezcan relleno
+    pcm = bytes(bytearray((0x10 + i) & 0xFF for i in range(n)))
+    fmt = struct.pack('<HHIIHH', 1, 1, 11025, 11025, 1, 8)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', n) + pcm
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+def _snd(pad=0, first_off=512):
+    # pad=0: subheader de 16 bytes + WAV (estándar); pad=12: WAV a +28 (Ikemen)
+    out = bytearray(ELECBYTE_SIGNATURE + struct.pack('<HHII', 0, 1, len(KEYS), first_off))
+    out += b'\0' * (512 - len(out))
+    wavs = [_wav(n) for n in (40, 72, 24)]
+    for i, (key, wav) in enumerate(zip(KEYS, wavs)):
+        sub = len(out)
+        nxt = 0 if i == len(KEYS) - 1 else sub + 16 + pad + len(wav)
+        out += struct.pack('<IIii', nxt, len(wav), key[0], key[1]) + b'\0' * pad + wav
+    return bytes(out)
+
+class RecoverTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _load(self, data):
+        path = os.path.join(self.tmp, 'x.snd')
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        return MugenSND(path)
+
+    def test_standard_layout_recovered(self):
+        snd = self._load(_snd(first_off=0))
+        self.assertEqual(snd.list_keys(), KEYS)
+        self.assertEqual(snd.recovery["recovered"], 3)
+        self.assertEqual(len(snd.get_sound(7, 2).pcm_bytes), 24)
+
+    def test_ikemen_layout_recovered(self):
+        snd = self._load(_snd(pad=12, first_off=0))
+        self.assertEqual(snd.list_keys(), KEYS)
+
+PLAYSND_CNS = """
+[Statedef 0]
+type = S
+
+[State 0, snd]
+type = PlaySnd
+trigger1 = 1
+value = 5, 3
+channel = 0
+"""
+
+class PlaySndTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        path = os.path.join(self.tmp, 'p.cns')
+        with open(path, 'w') as fh:
+            fh.write(PLAYSND_CNS)
+        self.char = load_character([path], cache_dir=os.path.join(self.tmp, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_value_keeps_both_numbers(self):
+        world, players = new_match(self.char, self.char)
+        run_match(world, players, 1)
+        self.assertEqual(players[0].adapter.sound_events, [(0, 'play', (5, 3), 0)])
+
+    def test_playsnd_reaches_mixer(self):
+        if not _HAS_NUMPY:
+            self.skipTest("NumPy no instalado")
+        path = os.path.join(self.tmp, 'x.snd')
+        with open(path, 'wb') as fh:
+            fh.write(_snd())
+        mixer = SoftwareMixer(MugenSND(path))
+        world, players = new_match(self.char, self.char, sound=mixer)
+        run_match(world, players, 1)
+        self.assertTrue(mixer.is_playing(0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+"""Fases de world.World frente a CNSInterpreter.tick."""
+
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mugen_cns.cns_interpreter import CNSInterpreter, BaseAdapter
+from mugen_cns.world import World
+
+def _ctrl(name, **params):
+    # controller ya normalizado sin AST: corre siempre
+    return {"name": name, "params": params, "raw": None}
+
+class _Recorder(BaseAdapter):
+    def __init__(self):
+        self.ran = []
+
+    def ctrl_changestate(self, params, ctx):
+        self.request_change_state(int(params["value"]))
+
+    def ctrl_null(self, params, ctx):
+        self.ran.append(params.get("tag"))
+
+class NegativeStatesTest(unittest.TestCase):
+    def _interp(self, negative=True):
+        plan = [
+            {"stateno": 0, "controllers": [_ctrl("Null", tag=0)]},
+            {"stateno": 200, "controllers": [_ctrl("Null", tag=200)]},
+        ]
+        if negative:
+            plan += [
+                {"stateno": -3, "controllers": [_ctrl("ChangeState", value=200)]},
+                {"stateno": -2, "controllers": [_ctrl("Null", tag=-2)]},
+                {"stateno": -1, "controllers": [_ctrl("Null", tag=-1)]},
+            ]
+        else:
+            plan[0]["controllers"].insert(0, _ctrl("ChangeState", value=200))
+        it = CNSInterpreter(None, _Recorder())
+        it.load_plan(plan)
+        return it
+
+    def test_changestate_in_negative_state_cuts_the_frame(self):
+        world = World()
+        it = self._interp()
+        world.add(it)
+        world.tick()
+        self.assertEqual(it.current_state_no, 200)
+        self.assertEqual(it.adapter.ran, [])     # ni -2, ni -1, ni el state actual
+        self.assertEqual(it.state_time, 0)
+        world.tick()                             # -3 vuelve a cambiar a 200
+        self.assertEqual(it.adapter.ran, [])
+
+    def test_negative_cut_matches_interpreter_tick(self):
+        # el mismo ChangeState en el state actual, con CNSInterpreter.tick
+        solo = self._interp(negative=False)
+        solo.tick()
+        world = World()
+        it = self._interp()
+        world.add(it)
+        world.tick()
+        self.assertEqual((it.current_state_no, it.state_time, it.adapter.ran),
+                         (solo.current_state_no, solo.state_time, solo.adapter.ran))
+
+if __name__ == '__main__':
+    unittest.main()